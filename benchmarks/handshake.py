@@ -0,0 +1,161 @@
+"""
+Full DTLS handshakes per second over an in-memory transport.
+
+    PYTHONPATH=src python -m benchmarks.handshake [--count 200] [--cipher NAME ...] [--curve NAME ...]
+        [--interpreted] [--profile [N]] [--json results.json] [--compare baseline.json]
+
+Every cipher suite and curve the connection manager supports is measured unless narrowed down with
+--cipher/--curve. --interpreted disables compilation of the construct parsers, --profile prints the
+N most expensive functions by cumulative time. --json writes the results, --compare prints the change
+against an earlier result file.
+"""
+import argparse
+import cProfile
+import json
+import platform
+import pstats
+import time
+
+from aio_dtls import ConnectionManager, DtlsSocket
+from aio_dtls.connection_manager import CipherSuites, EllipticCurves
+from aio_dtls.const import handshake as const_handshake
+from aio_dtls.constructs.compiler import CompiledOnce
+from aio_dtls.dtls.protocol import DTLSProtocol
+
+SERVER_ADDRESS = ('10.0.0.1', 5684)
+PSK = b'benchmark'
+IDENTITY_HINT = b'benchmark'
+
+
+class LoopbackSocket:
+    def __init__(self):
+        self.sending_data = []
+
+    def sendto(self, data, address):
+        self.sending_data.append((data, address))
+
+
+class AppProtocol:
+    def __init__(self, server=None, endpoint=None):
+        self.last_data = None
+        self.last_error = None
+
+    def datagram_received(self, data, address):
+        self.last_data = data
+
+    def error_received(self, exc, address=None):
+        self.last_error = exc
+
+
+class Endpoint:
+    def __init__(self, address, *, sock=None, app_protocol=AppProtocol, **kwargs):
+        self.address = address
+        self._sock = DtlsSocket(LoopbackSocket() if sock is None else sock, endpoint=self,
+                                connection_manager=ConnectionManager(**kwargs))
+        self.protocol = DTLSProtocol(None, self._sock.connection_manager, self, app_protocol)
+
+    def raw_sendto(self, data, address):
+        self._sock.raw_sendto(data, address)
+
+
+def pump(endpoints):
+    moved = True
+    while moved:
+        moved = False
+        for endpoint in endpoints.values():
+            queue = endpoint._sock._sock.sending_data
+            while queue:
+                data, address = queue.pop(0)
+                endpoints[address].protocol.datagram_received(data, endpoint.address)
+                moved = True
+
+
+def handshake(server, client_address, cipher, curve):
+    client = Endpoint(client_address, ciphers=[cipher], elliptic_curves=[curve], psk=PSK)
+    endpoints = {SERVER_ADDRESS: server, client_address: client}
+    client._sock.sendto(b'ping', SERVER_ADDRESS, psk=PSK, identity_hint=IDENTITY_HINT)
+    pump(endpoints)
+    connection = client._sock.connection_manager.get_connection(SERVER_ADDRESS)
+    if connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER \
+            or server.protocol.app_protocol.last_data != b'ping':
+        raise RuntimeError(f'handshake {cipher} {curve} failed {server.protocol.app_protocol.last_error or ""}')
+    server.protocol.app_protocol.last_data = None
+    server_manager = server._sock.connection_manager
+    server_manager.close_connection(server_manager.get_connection(client_address))
+
+
+def measure(cipher, curve, count, profiler=None):
+    server = Endpoint(SERVER_ADDRESS, secret='benchmark', psk=PSK, identity_hint=IDENTITY_HINT)
+    result = {'cipher': cipher, 'curve': curve}
+    try:
+        handshake(server, ('10.0.1.0', 1), cipher, curve)  # warm up, compiles the parsers
+        if profiler is not None:
+            profiler.enable()
+        begin = time.perf_counter()
+        for i in range(count):
+            handshake(server, ('10.0.1.1', 1024 + i), cipher, curve)
+        elapsed = time.perf_counter() - begin
+    except Exception as err:
+        result['error'] = f'{type(err).__name__}: {err}'
+        return result
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    result['handshakes_per_sec'] = round(count / elapsed, 1)
+    # session resumption is not implemented, every reconnect is a full handshake
+    result['resumed_per_sec'] = None
+    return result
+
+
+def compare(results, baseline_file):
+    with open(baseline_file) as file:
+        baseline = {(item['cipher'], item['curve']): item for item in json.load(file)['results']}
+    for result in results:
+        before = baseline.get((result['cipher'], result['curve']), {}).get('handshakes_per_sec')
+        after = result.get('handshakes_per_sec')
+        if before and after:
+            print(f'{result["cipher"]} {result["curve"]}: {before} -> {after} ({(after / before - 1) * 100:+.1f}%)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--cipher', action='append', help='default: all supported suites')
+    parser.add_argument('--curve', action='append', help='default: all supported curves')
+    parser.add_argument('--interpreted', action='store_true', help='do not compile construct parsers')
+    parser.add_argument('--profile', type=int, nargs='?', const=25,
+                        help='print top N functions of cProfile, slows the run down')
+    parser.add_argument('--json', help='write results to the file')
+    parser.add_argument('--compare', help='result file of an earlier run')
+    args = parser.parse_args()
+
+    CompiledOnce.enabled = not args.interpreted
+    mode = 'interpreted' if args.interpreted else 'compiled'
+    profiler = cProfile.Profile() if args.profile else None
+    results = []
+    for cipher in args.cipher or CipherSuites.supported:
+        for curve in args.curve or EllipticCurves.supported:
+            result = measure(cipher, curve, args.count, profiler)
+            results.append(result)
+            if 'error' in result:
+                print(f'{cipher} {curve} {mode}: {result["error"]}')
+            else:
+                print(f'{cipher} {curve} {mode}: {result["handshakes_per_sec"]} handshakes/sec')
+
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(args.profile)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({
+                'benchmark': 'handshake',
+                'python': platform.python_version(),
+                'mode': mode,
+                'count': args.count,
+                'results': results,
+            }, file, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
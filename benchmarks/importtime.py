@@ -0,0 +1,51 @@
+"""
+Import cost of the package measured with `python -X importtime`.
+
+    PYTHONPATH=src python -m benchmarks.importtime [--module aio_dtls.dtls.socket] [--runs 10] [--top 10]
+
+Every run is a fresh interpreter, the median cumulative time of the module is reported
+together with the aio_dtls modules having the largest self time.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+def import_times(module):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=os.environ, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_time), int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='aio_dtls.dtls.socket')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    total = statistics.median(run[args.module][1] for run in runs)
+    print(f'import {args.module}: {total / 1000:.1f} ms (median of {args.runs})')
+
+    self_times = {}
+    for run in runs:
+        for name, (self_time, _) in run.items():
+            if name.startswith('aio_dtls'):
+                self_times.setdefault(name, []).append(self_time)
+    top = sorted(self_times.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:args.top]
+    for name, values in top:
+        print(f'  {statistics.median(values) / 1000:7.2f} ms  {name}')
+    print(f'modules loaded: {len(runs[0])}')
+
+
+if __name__ == '__main__':
+    main()
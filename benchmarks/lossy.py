@@ -0,0 +1,158 @@
+"""
+Handshake completion time and app-data goodput over a simulated lossy network.
+
+    PYTHONPATH=src python -m benchmarks.lossy [--seed 0] [--loss 0.05] [--duplicate 0] [--reorder 0]
+        [--delay 0.05] [--jitter 0] [--mtu N] [--count 200] [--retry-timeout 1.0] [--retries 5]
+        [--messages 100] [--size 512] [--json results.json]
+
+Times are virtual seconds of benchmarks.network, the same seed gives the same result. The DTLS
+stack does not retransmit flights, a client that has not finished within --retry-timeout drops
+the connection and starts the handshake again, at most --retries times. Goodput is measured on
+established sessions sending --messages payloads of --size bytes back to back.
+"""
+import argparse
+import json
+import statistics
+
+from aio_dtls.const import handshake as const_handshake
+from .handshake import Endpoint, SERVER_ADDRESS
+from .network import SimulatedNetwork
+
+CIPHER = 'TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'
+
+
+class AppProtocol:
+    """remembers the virtual time payloads arrive"""
+
+    def __init__(self, server=None, endpoint=None):
+        self.network = endpoint.network
+        self.received = {}
+        self.received_bytes = 0
+        self.last_time = None
+
+    def datagram_received(self, data, address):
+        self.received.setdefault(address, self.network.now)
+        self.received_bytes += len(data)
+        self.last_time = self.network.now
+
+    def error_received(self, exc, address=None):
+        pass
+
+
+class SimulatedEndpoint(Endpoint):
+    def __init__(self, network: SimulatedNetwork, address, **kwargs):
+        self.network = network
+        super().__init__(address, sock=network.socket(address), app_protocol=AppProtocol, **kwargs)
+        network.attach(address, self.protocol.datagram_received)
+
+
+def handshake(network, server, client_address, retry_timeout, retries):
+    """virtual seconds until the server got the first payload and the number of restarts, None if it never did"""
+    client = SimulatedEndpoint(network, client_address, ciphers=[CIPHER])
+    begin = network.now
+    received = server.protocol.app_protocol.received
+    for attempt in range(retries + 1):
+        client._sock.sendto(b'ping', SERVER_ADDRESS)
+        if network.run(until=network.now + retry_timeout, stop=lambda: client_address in received):
+            return network.now - begin, attempt, client
+        client._sock.connection_manager.close_connection(
+            client._sock.connection_manager.get_connection(SERVER_ADDRESS))
+    return None, retries, client
+
+
+def goodput(network, server, client, messages, size):
+    """payload bytes per virtual second and delivered share of messages sent back to back"""
+    app_protocol = server.protocol.app_protocol
+    connection = client._sock.connection_manager.get_connection(SERVER_ADDRESS)
+    if connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
+        return None
+    received_before = app_protocol.received_bytes
+    begin = network.now
+    payload = bytes(size)
+    for _ in range(messages):
+        client._sock.sendto(payload, SERVER_ADDRESS)
+    network.run()
+    received = app_protocol.received_bytes - received_before
+    elapsed = (app_protocol.last_time or begin) - begin
+    return {
+        'bytes_per_sec': round(received / elapsed) if elapsed > 0 else None,
+        'delivered': round(received / (messages * size), 3),
+    }
+
+
+def percentile(values, share):
+    return round(sorted(values)[min(len(values) - 1, int(len(values) * share))], 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--loss', type=float, default=0.05)
+    parser.add_argument('--duplicate', type=float, default=0.0)
+    parser.add_argument('--reorder', type=float, default=0.0)
+    parser.add_argument('--delay', type=float, default=0.05, help='one-way delay, seconds')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--mtu', type=int)
+    parser.add_argument('--count', type=int, default=200, help='handshakes')
+    parser.add_argument('--retry-timeout', type=float, default=1.0)
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--json', help='write results to the file')
+    args = parser.parse_args()
+
+    network = SimulatedNetwork(seed=args.seed, loss=args.loss, duplicate=args.duplicate, reorder=args.reorder,
+                               delay=args.delay, jitter=args.jitter, mtu=args.mtu)
+    server = SimulatedEndpoint(network, SERVER_ADDRESS, secret='benchmark')
+    times, restarts, goodputs = [], [], []
+    failed = 0
+    for i in range(args.count):
+        elapsed, attempts, client = handshake(
+            network, server, ('10.0.1.1', 1024 + i), args.retry_timeout, args.retries)
+        restarts.append(attempts)
+        if elapsed is None:
+            failed += 1
+        else:
+            times.append(elapsed)
+            if args.messages:
+                result = goodput(network, server, client, args.messages, args.size)
+                if result is not None:
+                    goodputs.append(result)
+        network.detach(client.address)
+
+    summary = {
+        'network': {name: getattr(args, name) for name in ('seed', 'loss', 'duplicate', 'reorder', 'delay',
+                                                           'jitter', 'mtu')},
+        'handshakes': args.count,
+        'failed': failed,
+        'restarts': sum(restarts),
+        'datagrams': network.stats,
+    }
+    if times:
+        summary['completion'] = {
+            'p50': percentile(times, 0.5), 'p90': percentile(times, 0.9), 'p99': percentile(times, 0.99),
+            'max': round(max(times), 4), 'mean': round(statistics.mean(times), 4),
+        }
+    if goodputs:
+        rates = [item['bytes_per_sec'] for item in goodputs if item['bytes_per_sec']]
+        summary['goodput'] = {
+            'bytes_per_sec_median': round(statistics.median(rates)) if rates else None,
+            'delivered_mean': round(statistics.mean(item['delivered'] for item in goodputs), 3),
+        }
+
+    print(f'handshakes {args.count}, failed {failed}, restarts {summary["restarts"]}')
+    if times:
+        completion = summary['completion']
+        print(f'completion s: p50 {completion["p50"]} p90 {completion["p90"]} p99 {completion["p99"]} '
+              f'max {completion["max"]}')
+    if goodputs:
+        print(f'goodput: {summary["goodput"]["bytes_per_sec_median"]} B/s, '
+              f'delivered {summary["goodput"]["delivered_mean"] * 100:.1f}%')
+    print('datagrams:', ', '.join(f'{name} {value}' for name, value in network.stats.items()))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'benchmark': 'lossy', **summary}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Memory held by the ConnectionManager per established and per half-open DTLS session.
+
+    PYTHONPATH=src python -m benchmarks.memory [--sessions 10000 --sessions 100000] [--json results.json]
+
+Sessions are cloned from a real server-side connection: established ones after a full ECDH_anon
+handshake, half-open ones after the ClientHello with cookie was answered. Every clone gets its own
+randoms, master secret, EC keys, derived keys and cipher/MAC contexts. Python memory is measured
+with tracemalloc and broken down by sub-object. Process RSS is measured without tracing in a fresh
+interpreter per run and includes the OpenSSL contexts tracemalloc does not see. 1M sessions need
+several GB.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import secrets
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from aio_dtls import Connection, ConnectionManager
+from aio_dtls.connection_manager.connection import HandshakeParams, SecurityParameters
+from aio_dtls.const import handshake as const_handshake
+from aio_dtls.dtls.helper import Helper
+from .handshake import Endpoint, SERVER_ADDRESS, pump
+
+CIPHER = 'TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'
+CLIENT_ADDRESS = ('10.0.1.1', 1024)
+PARTS = ('Connection', 'SecurityParameters', 'HandshakeParams', 'keys', 'derived keys', 'cipher contexts',
+         'manager')
+DERIVED_KEYS = ('client_write_MAC_key', 'server_write_MAC_key', 'client_write_encryption_key',
+                'server_write_encryption_key', 'client_write_iv', 'server_write_iv', 'fixed_iv_block')
+
+
+def templates():
+    """server connections of a finished handshake and of one waiting for the ClientKeyExchange"""
+    server = Endpoint(SERVER_ADDRESS, secret='benchmark')
+    client = Endpoint(CLIENT_ADDRESS, ciphers=[CIPHER])
+    client._sock.sendto(b'ping', SERVER_ADDRESS)
+    client_queue = client._sock._sock.sending_data
+    server_queue = server._sock._sock.sending_data
+    server.protocol.datagram_received(client_queue.pop(0)[0], CLIENT_ADDRESS)  # ClientHello
+    client.protocol.datagram_received(server_queue.pop(0)[0], SERVER_ADDRESS)  # HelloVerifyRequest
+    server.protocol.datagram_received(client_queue.pop(0)[0], CLIENT_ADDRESS)  # ClientHello with cookie
+    half_open = server._sock.connection_manager.connections[CLIENT_ADDRESS]
+    half_open_copy = Connection(CLIENT_ADDRESS)
+    copy_state(half_open, half_open_copy)
+    half_open_copy.security_params.cipher = half_open.cipher
+    half_open_copy.handshake_params.handshake_messages = list(half_open.handshake_params.handshake_messages)
+    pump({SERVER_ADDRESS: server, CLIENT_ADDRESS: client})
+    established = server._sock.connection_manager.connections[CLIENT_ADDRESS]
+    if established.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
+        raise RuntimeError('handshake failed')
+    return established, half_open_copy
+
+
+def copy_state(source: Connection, target: Connection):
+    for name in ('ssl_version', 'ec', 'ec_point_format', 'next_receive_seq', 'next_receive_epoch', 'message_seq',
+                 'epoch'):
+        setattr(target, name, getattr(source, name))
+    target.state.value = source.state.value
+    target.state.sequence_number = dict(source.state.sequence_number)
+
+
+class Breakdown:
+    """tracemalloc delta of the code between two add() calls, summed by part"""
+
+    def __init__(self):
+        self.bytes = dict.fromkeys(PARTS, 0)
+        self._mark = 0
+
+    def start(self):
+        self._mark = tracemalloc.get_traced_memory()[0]
+
+    def add(self, part):
+        now = tracemalloc.get_traced_memory()[0]
+        self.bytes[part] += now - self._mark
+        self._mark = now
+
+    def move(self, part, size):
+        """count size of the next add() as part"""
+        self.bytes[part] += size
+        self._mark += size
+
+
+class NoBreakdown:
+    def start(self):
+        pass
+
+    def add(self, part):
+        pass
+
+    def move(self, part, size):
+        pass
+
+
+def clone(template: Connection, address: tuple, connection_manager: ConnectionManager, breakdown, established: bool):
+    breakdown.start()
+    security_params = SecurityParameters()
+    breakdown.add('SecurityParameters')
+    handshake_params = HandshakeParams()
+    breakdown.add('HandshakeParams')
+    connection = Connection(address)
+    connection.security_params = security_params
+    connection.handshake_params = handshake_params
+    copy_state(template, connection)
+    connection.uid = secrets.token_bytes(32)
+    connection.begin = datetime.datetime.now()
+    breakdown.add('Connection')
+
+    template_params = template.security_params
+    security_params.entity = template_params.entity
+    security_params.cipher = template_params.cipher
+    security_params.client_random = secrets.token_bytes(32)
+    security_params.server_random = secrets.token_bytes(32)
+    if established:
+        security_params.master_secret = secrets.token_bytes(48)
+    breakdown.add('SecurityParameters')
+
+    handshake_params.extended_master_secret = template.handshake_params.extended_master_secret
+    handshake_params.handshake_messages = [
+        bytes(bytearray(message)) for message in template.handshake_params.handshake_messages]
+    handshake_params.handshake_hash = bytes(bytearray(template.handshake_params.handshake_hash))
+    breakdown.add('HandshakeParams')
+
+    connection.server_private_key = ec.generate_private_key(ec.SECP256R1())
+    if established:
+        connection.client_public_key = ec.EllipticCurvePublicKey.from_encoded_point(
+            ec.SECP256R1(), template.client_public_key.public_bytes(
+                serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint))
+    breakdown.add('keys')
+
+    if established:
+        Helper.calc_pending_states(connection)
+        breakdown.move('derived keys', sum(sys.getsizeof(getattr(connection, name)) for name in DERIVED_KEYS))
+        breakdown.add('cipher contexts')
+
+    connection_manager.connections[connection.id] = connection
+    breakdown.add('manager')
+
+
+def rss():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * 4096
+    except OSError:
+        return None
+
+
+def addresses(count):
+    return [(f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}', 5684) for i in range(count)]
+
+
+def measure_rss(template, count, established):
+    """rss growth per session and sessions created per second, run in a fresh interpreter"""
+    connection_manager = ConnectionManager(secret='benchmark')
+    peers = addresses(count)
+    gc.collect()
+    before = rss()
+    begin = time.perf_counter()
+    for address in peers:
+        clone(template, address, connection_manager, NoBreakdown(), established)
+    elapsed = time.perf_counter() - begin
+    gc.collect()
+    after = rss()
+    return {
+        'rss_bytes_per_session': round((after - before) / count) if before is not None else None,
+        'sessions_per_sec': round(count / elapsed),
+    }
+
+
+def run_rss(count, established):
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.memory', '--rss', str(count)] + ([] if established else ['--half-open']),
+        capture_output=True, text=True, check=True, env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)})
+    return json.loads(result.stdout)
+
+
+def measure(template, count, established):
+    kind = 'established' if established else 'half-open'
+    connection_manager = ConnectionManager(secret='benchmark')
+    breakdown = Breakdown()
+    tracemalloc.start()
+    for address in addresses(count):
+        clone(template, address, connection_manager, breakdown, established)
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del connection_manager
+    gc.collect()
+
+    return {
+        'kind': kind,
+        'sessions': count,
+        'python_bytes_per_session': round(traced / count),
+        **run_rss(count, established),
+        'breakdown': {part: round(value / count) for part, value in breakdown.bytes.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, action='append', help='default: 10000 and 100000')
+    parser.add_argument('--json', help='write results to the file')
+    parser.add_argument('--rss', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--half-open', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    established, half_open = templates()
+    if args.rss:
+        print(json.dumps(measure_rss(half_open if args.half_open else established, args.rss, not args.half_open)))
+        return
+    results = []
+    for count in args.sessions or [10000, 100000]:
+        for template, is_established in ((established, True), (half_open, False)):
+            result = measure(template, count, is_established)
+            results.append(result)
+            print(f'{result["kind"]} x{count}: {result["python_bytes_per_session"]} B python, '
+                  f'{result["rss_bytes_per_session"]} B rss per session')
+            for part, value in result['breakdown'].items():
+                if value:
+                    print(f'  {part:20} {value:>7} B')
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({
+                'benchmark': 'memory',
+                'python': platform.python_version(),
+                'cipher': CIPHER,
+                'results': results,
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Deterministic in-memory datagram network with loss, duplication, reordering, delay and MTU.
+
+Time is virtual: datagrams are events on a heap processed by run(), nothing sleeps. All random
+decisions come from one seeded random.Random, the same seed and traffic give the same run.
+"""
+import heapq
+import itertools
+import logging
+import random
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedSocket:
+    """stands in for the UDP socket of a DtlsSocket"""
+
+    def __init__(self, network: 'SimulatedNetwork', address: tuple):
+        self.network = network
+        self.address = address
+
+    def sendto(self, data, address):
+        self.network.send(self.address, address, bytes(data))
+
+    def close(self):
+        self.network.detach(self.address)
+
+
+class SimulatedNetwork:
+    def __init__(self, *, seed: int = 0, loss: float = 0.0, duplicate: float = 0.0, reorder: float = 0.0,
+                 delay: float = 0.01, jitter: float = 0.0, mtu: Optional[int] = None):
+        """
+        :param loss: probability a datagram is dropped
+        :param duplicate: probability a datagram is delivered twice
+        :param reorder: probability a datagram is held back by another delay, overtaken by later ones
+        :param delay: one-way delay in seconds
+        :param jitter: uniform extra delay up to this many seconds
+        :param mtu: datagrams larger than this are dropped, as with DF set
+        """
+        self.random = random.Random(seed)
+        self.loss = loss
+        self.duplicate = duplicate
+        self.reorder = reorder
+        self.delay = delay
+        self.jitter = jitter
+        self.mtu = mtu
+        self.now = 0.0
+        self._events = []
+        self._sequence = itertools.count()
+        self._receivers: Dict[tuple, Callable[[bytes, tuple], None]] = {}
+        self.stats = dict.fromkeys(('sent', 'delivered', 'lost', 'duplicated', 'reordered', 'oversize',
+                                    'unreachable', 'errors'), 0)
+
+    def socket(self, address: tuple) -> SimulatedSocket:
+        return SimulatedSocket(self, address)
+
+    def attach(self, address: tuple, receiver: Callable[[bytes, tuple], None]):
+        """receiver is called as receiver(data, source_address), e.g. DTLSProtocol.datagram_received"""
+        self._receivers[address] = receiver
+
+    def detach(self, address: tuple):
+        self._receivers.pop(address, None)
+
+    def call_at(self, when: float, callback: Callable, *args):
+        heapq.heappush(self._events, (when, next(self._sequence), callback, args))
+
+    def call_later(self, delay: float, callback: Callable, *args):
+        self.call_at(self.now + delay, callback, *args)
+
+    def send(self, source: tuple, destination: tuple, data: bytes):
+        stats = self.stats
+        stats['sent'] += 1
+        if self.mtu is not None and len(data) > self.mtu:
+            stats['oversize'] += 1
+            return
+        rnd = self.random.random
+        if rnd() < self.loss:
+            stats['lost'] += 1
+            return
+        copies = 1
+        if rnd() < self.duplicate:
+            stats['duplicated'] += 1
+            copies = 2
+        for _ in range(copies):
+            delay = self.delay + rnd() * self.jitter
+            if rnd() < self.reorder:
+                stats['reordered'] += 1
+                delay += self.delay + self.jitter
+            self.call_later(delay, self._deliver, source, destination, data)
+
+    def _deliver(self, source: tuple, destination: tuple, data: bytes):
+        receiver = self._receivers.get(destination)
+        if receiver is None:
+            self.stats['unreachable'] += 1
+            return
+        self.stats['delivered'] += 1
+        try:
+            receiver(data, source)
+        except Exception as err:
+            # asyncio logs exceptions of datagram_received and keeps the endpoint running, so does the simulator
+            self.stats['errors'] += 1
+            logger.warning(f'datagram from {source} to {destination}: {type(err).__name__} {err}')
+
+    def run(self, until: Optional[float] = None, stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Process events in time order up to the virtual time until, or until stop() returns True.
+        Returns True when stopped by stop().
+        """
+        events = self._events
+        while True:
+            if stop is not None and stop():
+                return True
+            if not events or (until is not None and events[0][0] > until):
+                break
+            when, _, callback, args = heapq.heappop(events)
+            self.now = when
+            callback(*args)
+        if until is not None:
+            self.now = max(self.now, until)
+        return False
@@ -0,0 +1,127 @@
+"""
+Cost of application data on an established DTLS session, from encryption to app delivery.
+
+    PYTHONPATH=src python -m benchmarks.record [--count 2000] [--size 16 ...] [--cipher NAME ...]
+        [--json results.json]
+
+Every record goes through Helper.build_application_record, send_records, RawDatagram.parse,
+decrypt_ciphertext_fragment and the app protocol of the receiving side. Reported per payload size:
+records/sec, MB/sec, p50/p99 latency of one record and, from a separate tracemalloc pass, memory blocks
+left allocated per record (should stay near zero) and the peak of memory allocated while handling one record.
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+from aio_dtls.connection_manager import CipherSuites
+from aio_dtls.const import handshake as const_handshake
+from aio_dtls.dtls.helper import Helper
+from .handshake import Endpoint, IDENTITY_HINT, PSK, SERVER_ADDRESS, pump
+
+CLIENT_ADDRESS = ('10.0.1.1', 1024)
+SIZES = [16, 64, 256, 1024, 4096, 16384]
+
+
+def establish(cipher):
+    """client and server endpoints with a finished handshake"""
+    server = Endpoint(SERVER_ADDRESS, secret='benchmark', psk=PSK, identity_hint=IDENTITY_HINT)
+    client = Endpoint(CLIENT_ADDRESS, ciphers=[cipher], psk=PSK)
+    client._sock.sendto(b'ping', SERVER_ADDRESS, psk=PSK, identity_hint=IDENTITY_HINT)
+    pump({SERVER_ADDRESS: server, CLIENT_ADDRESS: client})
+    connection = client._sock.connection_manager.get_connection(SERVER_ADDRESS)
+    if connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
+        raise RuntimeError(f'handshake {cipher} failed {server.protocol.app_protocol.last_error or ""}')
+    return client, server, connection
+
+
+def measure(client, server, connection, size, count):
+    payload = bytes(size)
+    outgoing = client._sock._sock.sending_data
+    receive = server.protocol.datagram_received
+    trace = client._sock.connection_manager.trace
+    writer = client._sock.raw_sendto
+    latencies = []
+    begin = time.perf_counter()
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        Helper.send_records(connection, Helper.build_application_record(connection, [payload]), writer, trace)
+        receive(outgoing.pop()[0], CLIENT_ADDRESS)
+        latencies.append(time.perf_counter_ns() - start)
+    elapsed = time.perf_counter() - begin
+    if server.protocol.app_protocol.last_data != payload:
+        raise RuntimeError(f'{size} bytes payload not delivered')
+
+    traced_count = min(count, 200)
+    peak = 0
+    tracemalloc.start()
+    gc.collect()  # parsed contexts are cyclic, count what survives a collection only
+    before = tracemalloc.take_snapshot()
+    for _ in range(traced_count):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        Helper.send_records(connection, Helper.build_application_record(connection, [payload]), writer, trace)
+        receive(outgoing.pop()[0], CLIENT_ADDRESS)
+        peak += tracemalloc.get_traced_memory()[1] - current
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # the first snapshot is allocated while tracing, leave tracemalloc itself out of the diff
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    retained = sum(stat.count_diff for stat in after.filter_traces(ignore).compare_to(
+        before.filter_traces(ignore), 'filename'))
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'size': size,
+        'records_per_sec': round(count / elapsed, 1),
+        'mb_per_sec': round(count * size / elapsed / 1e6, 2),
+        'p50_us': round(percentiles[49] / 1000, 1),
+        'p99_us': round(percentiles[98] / 1000, 1),
+        'retained_blocks_per_record': round(retained / traced_count, 2),
+        'peak_bytes_per_record': round(peak / traced_count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--size', type=int, action='append', help=f'payload bytes, default: {SIZES}')
+    parser.add_argument('--cipher', action='append', help='default: all supported suites')
+    parser.add_argument('--json', help='write results to the file')
+    args = parser.parse_args()
+
+    results = []
+    for cipher in args.cipher or CipherSuites.supported:
+        try:
+            client, server, connection = establish(cipher)
+        except Exception as err:
+            results.append({'cipher': cipher, 'error': f'{type(err).__name__}: {err}'})
+            print(f'{cipher}: {results[-1]["error"]}')
+            continue
+        print(cipher)
+        print(f'{"size":>6} {"records/s":>10} {"MB/s":>8} {"p50 us":>8} {"p99 us":>8} {"blocks":>7} '
+              f'{"peak B":>8}')
+        for size in args.size or SIZES:
+            measure(client, server, connection, size, min(args.count, 100))  # warm up
+            result = measure(client, server, connection, size, args.count)
+            results.append({'cipher': cipher, **result})
+            print(f'{size:>6} {result["records_per_sec"]:>10} {result["mb_per_sec"]:>8} {result["p50_us"]:>8} '
+                  f'{result["p99_us"]:>8} {result["retained_blocks_per_record"]:>7} '
+                  f'{result["peak_bytes_per_record"]:>8}')
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({
+                'benchmark': 'record',
+                'python': platform.python_version(),
+                'count': args.count,
+                'results': results,
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
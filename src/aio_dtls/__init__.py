@@ -1,6 +1,30 @@
-from .connection_manager.connection_manager import ConnectionManager, Connection
-from .const.cipher_suites import CipherSuites
-from .dtls.socket import DtlsSocket
-from .tls.socket import TlsSocket
+import importlib
+
+# public names are imported on first access, so importing a submodule does not load the whole package
+_exports = {
+    'ConnectionManager': '.connection_manager.connection_manager',
+    'Connection': '.connection_manager.connection_manager',
+    'CipherSuites': '.const.cipher_suites',
+    'DtlsSocket': '.dtls.socket',
+    'DtlsSession': '.dtls.socket',
+    'ClientSessionPool': '.dtls.session_pool',
+    'TlsSocket': '.tls.socket',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_exports])
 
 # __version__ = '0.0.1'
@@ -3,10 +3,10 @@ from ..const import tls
 
 class CompressionMethods:
     def __init__(self, compression_methods=None):
-        pass
+        self.max = self._max()
 
-    @property
-    def max(self):
+    @staticmethod
+    def _max():
         return [
             tls.CompressionMethod.NULL.value
         ]
@@ -1,6 +1,6 @@
 import logging
 from enum import Enum
-from typing import Tuple
+from typing import Optional, Tuple
 
 from cryptography.hazmat.primitives import hashes
 
@@ -133,6 +133,7 @@ class Connection:
         self.fixed_iv_block = None
 
         self.address = address
+        self.id = self.get_id(address)
 
         self.mac = None
         self.cookie = None
@@ -157,14 +158,36 @@ class Connection:
 
         self.flight_buffer = []
         self.new_connection = None
-
-    @property
-    def id(self):
-        return self.get_id(self.address)
+        # future of a client handshake awaited by DtlsSocket.connect()
+        self.handshake_waiter = None
+        # DtlsSocket.connect() callers currently awaiting handshake_waiter
+        self.handshake_joiners = 0
+        # Finished verified, see ConnectionManager.handshake_completed
+        self.established = False
+        self.handshake_started_ns = 0
+        # description name of the last alert sent or received, reported by the handshake_failed event
+        self.alert = None
+        # datagram bytes including record headers, see ConnectionManager.connection_snapshot
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        # handshake stage timings while metrics are enabled, see ConnectionManager.timed
+        self.timeline = None
 
     @staticmethod
-    def get_id(address):
-        return f'{address[0]}:{address[1]}'
+    def get_id(address) -> Tuple[str, int]:
+        # asyncio reports IPv6 peers as (host, port, flowinfo, scope_id), the key is always (host, port)
+        if len(address) == 2 and isinstance(address, tuple):
+            return address
+        return address[0], address[1]
+
+    def handshake_done(self, exception: Optional[Exception] = None):
+        waiter = self.handshake_waiter
+        if waiter is None or waiter.done():
+            return
+        if exception is None:
+            waiter.set_result(self)
+        else:
+            waiter.set_exception(exception)
 
     def __bool__(self):
         return self.security_params.entity is not None
@@ -201,10 +224,13 @@ class Connection:
         #         for msg in self.handshake_params.handshake_messages:
         #             digest.update(msg)
         #         self.handshake_params.handshake_hash = digest.finalize()
+        debug = logger.isEnabledFor(logging.DEBUG)
         if clear:
             self.handshake_params.handshake_messages = []
-            logger.debug(f'clear handshake hash')
-        logger.debug(f'update handshake {name} buf ({len(message)}) {message.hex(" ")}')
+            if debug:
+                logger.debug(f'clear handshake hash')
+        if debug:
+            logger.debug(f'update handshake {name} buf ({len(message)}) {message.hex(" ")}')
         self.handshake_params.handshake_messages.append(message)
 
         hash_func = hashes.SHA256  # self.hash_func
@@ -215,8 +241,10 @@ class Connection:
                 digest.update(msg)
             _hash = digest.finalize()
             self.handshake_params.handshake_hash = _hash
-            logger.debug(
-                f'update handshake {name} hash {len(self.handshake_params.handshake_messages)}({len(_hash)}) {_hash.hex(" ")}')
+            if debug:
+                logger.debug(
+                    f'update handshake {name} hash {len(self.handshake_params.handshake_messages)}({len(_hash)}) '
+                    f'{_hash.hex(" ")}')
 
     def get_sequence_number(self, epoch=None):
         epoch = str(self.epoch) if epoch is None else str(epoch)
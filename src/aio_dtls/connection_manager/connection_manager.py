@@ -1,9 +1,13 @@
+import asyncio
 import hashlib
 import hmac
+import logging
 import secrets
 import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Optional
+from typing import Callable, List, Optional
 from uuid import uuid4
 
 from . import ECPointFormats, SSlVersions, EllipticCurves, CompressionMethods, CipherSuites, SignatureScheme
@@ -11,6 +15,14 @@ from .connection import Connection
 from ..const import handshake as const_handshake
 from ..const import tls as const_tls
 from ..constructs.tls import Random
+from ..events import (LifecycleEvent, EVENTS, HANDSHAKE_STARTED, HANDSHAKE_COMPLETED, HANDSHAKE_FAILED,
+                      CONNECTION_CLOSED, CONNECTION_EVICTED)
+from ..exceptions import LimitExceeded
+from ..metrics import Metrics, NULL_METRICS, NULL_TIMER, Timeline
+from ..rate_limit import HandshakeRateLimiter
+from ..trace import TraceBuffer
+
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
@@ -20,6 +32,16 @@ class ConnectionManager:
                  elliptic_curves: Optional[list] = None,
                  identity_hint: Optional[str] = None,
                  psk: Optional[str] = None,
+                 trace: Optional[TraceBuffer] = None,
+                 metrics: Optional[Metrics] = None,
+                 slow_handshake_us: Optional[int] = None,
+                 handshake_rate_limit: Optional[HandshakeRateLimiter] = None,
+                 max_half_open: Optional[int] = None,
+                 half_open_timeout: float = 60.0,
+                 max_records_per_datagram: int = 32,
+                 max_extensions: int = 32,
+                 max_extension_length: int = 2048,
+                 max_unverified_amplification: float = 1.0,
                  **kwargs):
 
         self.unittest_mode = unittest_mode
@@ -34,21 +56,55 @@ class ConnectionManager:
         self.private_key = None
         self.identity_hint = identity_hint
         self.psk = psk
+        # incremented on every close, lets protocols invalidate their cached lookups
+        self.generation = 0
+        # optional per-record event log, see TraceBuffer
+        self.trace = trace
+        # counters and histograms, a no-op unless given, see CollectingMetrics
+        self.metrics = NULL_METRICS if metrics is None else metrics
+        if self.metrics.enabled:
+            self.metrics.gauge('connections_established', lambda: self.count_connections(True))
+            self.metrics.gauge('connections_half_open', lambda: self.count_connections(False))
+        # timelines of the last handshakes slower than slow_handshake_us, needs metrics
+        self.slow_handshake_us = slow_handshake_us
+        self.slow_handshakes = deque(maxlen=32)
+        # token buckets checked for every ClientHello before it is parsed, DTLS only
+        self.handshake_rate_limit = handshake_rate_limit
+        # DoS limits, a message over a limit is dropped and counted as limits_exceeded{limit=...}
+        # server connections waiting for the ClientKeyExchange or Finished, no limit if None
+        self.max_half_open = max_half_open
+        # seconds after which a half-open connection gives its slot to a new one, checked at max_half_open
+        self.half_open_timeout = half_open_timeout
+        self.max_records_per_datagram = max_records_per_datagram
+        # ClientHello extensions, checked on the raw message before it is parsed
+        self.max_extensions = max_extensions
+        self.max_extension_length = max_extension_length
+        # answer bytes per request byte to a peer whose cookie is not verified yet, e.g. HelloVerifyRequest
+        self.max_unverified_amplification = max_unverified_amplification
+        # established connections in the table, the rest are half-open
+        self.established_count = sum(1 for connection in self.connections.values() if connection.established)
+        # server connections registered by add_half_open() until established or closed, oldest first
+        self._half_open: 'OrderedDict[tuple, Connection]' = OrderedDict()
+        # lifecycle event name -> callbacks, see subscribe()
+        self._subscribers = {}
+        # serialized server handshake messages keyed by their constant fields, see EcdhAnon
+        self.handshake_templates = {}
 
     def get_connection(self, address, **kwargs):
-        try:
-            connection = self.connections[Connection.get_id(address)]
-            if kwargs:
-                connection.user_props = kwargs
-            return connection
-        except KeyError:
+        connection = self.connections.get(Connection.get_id(address))
+        if connection is None:
             return Connection(address, **kwargs)
+        if kwargs:
+            connection.user_props = kwargs
+        return connection
 
     def new_client_connection(self, connection: Connection):
         connection.ssl_version = self.ssl_versions.default
         connection.state.value = const_handshake.ConnectionState.HELLO_REQUEST
         connection.security_params.entity = const_tls.ConnectionEnd.client
+        self.generation += 1
         self.connections[connection.id] = connection
+        self.handshake_started(connection)
 
     def new_server_connection(self, connection: Connection, record):
         connection.security_params.entity = const_tls.ConnectionEnd.server
@@ -56,6 +112,183 @@ class ConnectionManager:
         connection.uid = secrets.token_bytes(32)
         connection.begin = datetime.now()
         connection.ssl_version = self.ssl_versions.default
+        self.handshake_started(connection)
+
+    def subscribe(self, event: str, callback: Callable[[LifecycleEvent], None]):
+        """Call callback(LifecycleEvent) on every event of the name, see aio_dtls.events"""
+        if event not in EVENTS:
+            raise ValueError(f'unknown event {event}, expected one of {EVENTS}')
+        self._subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event: str, callback: Callable[[LifecycleEvent], None]):
+        callbacks = self._subscribers.get(event)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._subscribers[event]
+
+    def emit(self, event: str, connection: Connection, **kwargs):
+        callbacks = self._subscribers.get(event)
+        if not callbacks:
+            return
+        cipher = connection.cipher
+        entity = connection.security_params.entity
+        lifecycle_event = LifecycleEvent(event, time.monotonic_ns(), connection.address,
+                                         None if entity is None else entity.name,
+                                         None if cipher is None else cipher.name, **kwargs)
+        for callback in list(callbacks):
+            try:
+                callback(lifecycle_event)
+            except Exception as err:
+                logger.exception(f'{event} subscriber {callback!r} failed: {err}')
+
+    def handshake_started(self, connection: Connection):
+        if connection.handshake_started_ns:
+            # retransmitted ClientHello, the handshake is timed from the first one
+            return
+        connection.handshake_started_ns = time.monotonic_ns()
+        if self.metrics.enabled:
+            if connection.timeline is None:
+                connection.timeline = Timeline()
+            self.metrics.inc('handshakes_started', label=('role', connection.security_params.entity.name))
+        if HANDSHAKE_STARTED in self._subscribers:
+            self.emit(HANDSHAKE_STARTED, connection)
+
+    def handshake_completed(self, connection: Connection):
+        if not connection.established:
+            connection.established = True
+            if self.connections.get(connection.id) is connection:
+                self.established_count += 1
+            if self._half_open.get(connection.id) is connection:
+                del self._half_open[connection.id]
+        if self.metrics.enabled:
+            role = ('role', connection.security_params.entity.name)
+            self.metrics.inc('handshakes_completed', label=role)
+            if connection.handshake_started_ns:
+                duration = (time.monotonic_ns() - connection.handshake_started_ns) // 1000
+                self.metrics.observe('handshake_duration_us', duration, label=role)
+                if self.slow_handshake_us is not None and duration >= self.slow_handshake_us \
+                        and connection.timeline is not None:
+                    self.slow_handshakes.append((connection.address, connection.cipher.name, connection.timeline))
+            if connection.timeline is not None:
+                cipher = ('cipher', connection.cipher.name)
+                for stage, spent in connection.timeline.durations().items():
+                    self.metrics.observe(f'handshake_{stage}_us', spent // 1000, label=cipher)
+        if HANDSHAKE_COMPLETED in self._subscribers:
+            self.emit(HANDSHAKE_COMPLETED, connection, resumed=False,
+                      duration_us=(time.monotonic_ns() - connection.handshake_started_ns) // 1000)
+
+    def connection_evicted(self, connection: Connection, reason: str):
+        """The owner of the connection drops it, e.g. ClientSessionPool over max_size, close_connection follows"""
+        if self.metrics.enabled:
+            self.metrics.inc('connections_evicted', label=('reason', reason))
+        if CONNECTION_EVICTED in self._subscribers:
+            self.emit(CONNECTION_EVICTED, connection, reason=reason)
+
+    def timed(self, connection: Connection, stage: str):
+        """
+        Context manager adding the time of its block to connection.timeline as stage,
+        the histograms handshake_<stage>_us by cipher suite are updated when the handshake completes
+        """
+        if not self.metrics.enabled:
+            return NULL_TIMER
+        timeline = connection.timeline
+        if timeline is None:
+            timeline = connection.timeline = Timeline()
+        return timeline.stage(stage)
+
+    def add_half_open(self, connection: Connection):
+        """Register a server connection whose cookie is verified, LimitExceeded over max_half_open"""
+        half_open = self._half_open
+        if self.max_half_open is not None and len(half_open) >= self.max_half_open:
+            self.expire_half_open()
+            if len(half_open) >= self.max_half_open:
+                raise LimitExceeded('half_open', f'{self.max_half_open} connections')
+        self.connections[connection.id] = connection
+        half_open[connection.id] = connection
+
+    def expire_half_open(self):
+        """Close server connections whose handshake started more than half_open_timeout seconds ago"""
+        deadline = time.monotonic_ns() - int(self.half_open_timeout * 1e9)
+        half_open = self._half_open
+        while half_open:
+            connection = next(iter(half_open.values()))
+            if connection.handshake_started_ns > deadline:
+                break
+            self.connection_evicted(connection, 'half_open_timeout')
+            self.close_connection(connection)
+
+    def count_connections(self, established: bool) -> int:
+        return self.established_count if established else len(self.connections) - self.established_count
+
+    def limit_exceeded(self, limit: str):
+        self.metrics.inc('limits_exceeded', label=('limit', limit))
+
+    @staticmethod
+    def connection_snapshot(connection: Connection, now_ns: Optional[int] = None) -> dict:
+        """Plain values describing the connection, safe to log or serialize"""
+        state = connection.state.value
+        entity = connection.security_params.entity
+        cipher = connection.cipher
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        started = connection.handshake_started_ns
+        return {
+            'address': connection.address,
+            'role': None if entity is None else entity.name,
+            'state': None if state is None else state.name,
+            'established': connection.established,
+            'age_s': round((now_ns - started) / 1e9, 3) if started else None,
+            'suite': None if cipher is None else cipher.name,
+            'epoch': connection.epoch,
+            'receive_epoch': connection.next_receive_epoch,
+            'bytes_received': connection.bytes_received,
+            'bytes_sent': connection.bytes_sent,
+            'pending_flight': len(connection.flight_buffer),
+            'alert': connection.alert,
+        }
+
+    async def snapshots(self, predicate: Optional[Callable[[Connection], bool]] = None,
+                        chunk_size: int = 512) -> List[dict]:
+        """
+        connection_snapshot() of every connection, or of those predicate accepts.
+        Yields to the event loop after every chunk_size connections so long tables do not stall it,
+        connections closed meanwhile are skipped.
+        """
+        result = []
+        now_ns = time.monotonic_ns()
+        connections = list(self.connections.values())
+        for start in range(0, len(connections), chunk_size):
+            for connection in connections[start:start + chunk_size]:
+                if self.connections.get(connection.id) is not connection:
+                    continue
+                if predicate is None or predicate(connection):
+                    result.append(self.connection_snapshot(connection, now_ns))
+            await asyncio.sleep(0)
+        return result
+
+    async def summary(self, chunk_size: int = 512, age_buckets=(1, 10, 60, 600, 3600)) -> dict:
+        """Connection counts by state, by cipher suite and by age in seconds, iterated like snapshots()"""
+        by_state, by_suite = {}, {}
+        by_age = dict.fromkeys([f'<={bound}' for bound in age_buckets] + [f'>{age_buckets[-1]}'], 0)
+        labels = list(by_age)
+        total = 0
+        now_ns = time.monotonic_ns()
+        connections = list(self.connections.values())
+        for start in range(0, len(connections), chunk_size):
+            for connection in connections[start:start + chunk_size]:
+                if self.connections.get(connection.id) is not connection:
+                    continue
+                total += 1
+                state = connection.state.value
+                state = None if state is None else state.name
+                by_state[state] = by_state.get(state, 0) + 1
+                suite = None if connection.cipher is None else connection.cipher.name
+                by_suite[suite] = by_suite.get(suite, 0) + 1
+                if connection.handshake_started_ns:
+                    age = (now_ns - connection.handshake_started_ns) / 1e9
+                    by_age[labels[bisect_left(age_buckets, age)]] += 1
+            await asyncio.sleep(0)
+        return {'connections': total, 'by_state': by_state, 'by_suite': by_suite, 'by_age_s': by_age}
 
     def get_cookie(self, connection: Connection):
         if self.unittest_mode:
@@ -82,7 +315,24 @@ class ConnectionManager:
         return ec.generate_private_key(elliptic_curve)
 
     def close_connection(self, connection):
+        self.generation += 1
+        self._half_open.pop(connection.id, None)
         try:
-            del self.connections[connection.id]
+            removed = self.connections.pop(connection.id)
         except KeyError:
             pass
+        else:
+            if removed.established:
+                self.established_count -= 1
+            if self.metrics.enabled:
+                self.metrics.inc('connections_closed')
+                if not connection.established:
+                    self.metrics.inc('handshakes_failed')
+            if self._subscribers:
+                if not connection.established:
+                    state = connection.state.value
+                    self.emit(HANDSHAKE_FAILED, connection, alert=connection.alert,
+                              stage=None if state is None else state.name)
+                self.emit(CONNECTION_CLOSED, connection,
+                          duration_us=(time.monotonic_ns() - connection.handshake_started_ns) // 1000)
+        connection.handshake_done(ConnectionError(f'connection {connection.id} closed'))
@@ -3,10 +3,10 @@ from ..const import tls
 
 class ECPointFormats:
     def __init__(self, ec_point_formats=None):
-        pass
+        self.max = self._max()
 
-    @property
-    def max(self):
+    @staticmethod
+    def _max():
         return {"ec_point_format_list": [
             tls.ECPointFormat.uncompressed.value
         ]}
@@ -1,6 +1,6 @@
 import logging
 from enum import Enum
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +12,35 @@ class Default(Enum):
 class EnumProps:
     supported = []
     EnumClass = Default
+    negotiated_cache_size = 1024
+    instances_cache_size = 64
+    _instances: Dict[tuple, 'EnumProps'] = {}
 
     def __init__(self, wish_list=None, **kwargs):
         self._available: List[Tuple[str, int]] = self._init_from_list(wish_list, **kwargs)
-        pass
+        self._available_values = tuple(hash(item[1]) for item in self._available)
+        # wire value -> position in _available, lower is preferred
+        self._priority: Dict[int, int] = {value: i for i, value in enumerate(self._available_values)}
+        self._names: Dict[str, int] = {item[0]: hash(item[1]) for item in self._available}
+        # client offer fingerprint -> negotiated member
+        self._negotiated: Dict[tuple, Optional[Enum]] = {}
+
+    @classmethod
+    def cached(cls, wish_list=None, **kwargs) -> 'EnumProps':
+        """
+        Shared instance for a wish list, for per-connection settings that repeat.
+
+        Options are keyed only by whether they are set, _it_suitable must not depend on more,
+        so secrets like the PSK are not kept alive by the cache.
+        """
+        options = tuple(sorted((name, bool(value)) for name, value in kwargs.items()))
+        key = (cls, None if wish_list is None else tuple(wish_list), options)
+        instance = cls._instances.get(key)
+        if instance is None:
+            if len(cls._instances) >= cls.instances_cache_size:
+                cls._instances.clear()
+            instance = cls._instances[key] = cls(wish_list, **dict(options))
+        return instance
 
     @property
     def available(self):
@@ -26,8 +51,8 @@ class EnumProps:
         return self.EnumClass[self.supported[0]]
 
     @property
-    def available_values(self):
-        return [hash(item[1]) for item in self._available]
+    def available_values(self) -> Tuple[int, ...]:
+        return self._available_values
 
     @staticmethod
     def _it_suitable(value, **kwargs):
@@ -47,10 +72,29 @@ class EnumProps:
         _result = sorted(_result, key=lambda x: hash(x[1]), reverse=True)
         return _result
 
+    def _offer_value(self, item):
+        # parsed offers hold EnumIntegerString for known values and int for unknown ones
+        value = getattr(item, 'intvalue', item)
+        if isinstance(value, str):
+            return self._names.get(value)
+        return value
+
     def get_best(self, client_offer: list):
-        _client_offer = [str(item) for item in client_offer]
-        logger.debug(f'{self.__class__.__name__} selecting from {_client_offer}')
-        for elem in self._available:
-            if elem[0] in client_offer:
-                logger.debug(f'{self.__class__.__name__} selected {elem[0]}')
-                return self.EnumClass[elem[0]]
+        fingerprint = tuple([self._offer_value(item) for item in client_offer])
+        try:
+            return self._negotiated[fingerprint]
+        except KeyError:
+            pass
+        priority = self._priority
+        best = None
+        for value in fingerprint:
+            position = priority.get(value)
+            if position is not None and (best is None or position < best):
+                best = position
+        result = None if best is None else self.EnumClass[self._available[best][0]]
+        if len(self._negotiated) >= self.negotiated_cache_size:
+            self._negotiated.clear()
+        self._negotiated[fingerprint] = result
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'{self.__class__.__name__} selected {result} from {list(client_offer)}')
+        return result
@@ -3,10 +3,10 @@ from ..const import tls
 
 class SignatureScheme:
     def __init__(self, signature_hash_algorithms=None):
-        pass
+        self.max = self._max()
 
-    @property
-    def max(self):
+    @staticmethod
+    def _max():
         return [
             {
                 "hash": tls.HashAlgorithm.SHA512.value,
@@ -8,7 +8,6 @@ from enum import Enum
 
 from cryptography.hazmat.primitives import hashes
 
-from ..cipher import cipher
 from ..exceptions import UnsupportedCipher
 
 
@@ -71,23 +70,25 @@ class MACAlgorithm(Enum):
 
 
 class CipherSuite:
+    # resolved from the suite name on first access, see init_from_name
+    _metadata = ('protocol', 'authentication_mechanism', 'encryption_type', 'hash_function', 'digest_size',
+                 'key_length', 'iv_length', 'key_exchange', 'cipher', 'mac')
+
     def __init__(self, value):
         self.value = value
         self.name = None
-        self.protocol = None
-        self.authentication_mechanism = None
-
-        self.encryption_type = None
-        self.hash_function = None
-        self.digest_size = None
-        self.key_length = None
-        self.iv_length = None
 
-        self.key_exchange = None
-        self.cipher = None
-        self.mac = None
+    def __getattr__(self, item):
+        if item not in self._metadata:
+            raise AttributeError(item)
+        for name in self._metadata:
+            setattr(self, name, None)
+        if self.name is not None:
+            self.init_from_name(self.name)
+        return getattr(self, item)
 
     def init_from_name(self, name):
+        from ..cipher import cipher
         try:
             self.name = name
             _tmp = name.split('_WITH_')
@@ -462,8 +463,7 @@ class CipherSuites(Enum):
     TLS_ECDH_anon_WITH_AES_128_CBC_SHA256 = CipherSuite(0xFF00)
 
     def __init__(self, value):
-        value.init_from_name(self.name)
-        pass
+        value.name = self.name
 
     def __hash__(self) -> int:
         return hash(self.value)
@@ -0,0 +1,65 @@
+import logging
+
+from construct import Subconstruct
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledOnce(Subconstruct):
+    """
+    Wraps a construct and compiles it on first use.
+
+    Top-level parse/build and parsing as a part of an interpreted parent (GreedyRange is never compiled by
+    construct) go through the compiled form. When the parent itself is compiled the wrapped construct is
+    inlined into it. Constructs that construct can not compile stay interpreted.
+    """
+    enabled = True
+
+    def __init__(self, subcon):
+        super().__init__(subcon)
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.subcon
+            if self.enabled:
+                try:
+                    compiled = self.subcon.compile()
+                except Exception as err:
+                    logger.debug(f'construct {self.subcon} stays interpreted: {err}')
+            self._compiled = compiled
+        return compiled
+
+    def parse(self, data, **contextkw):
+        return self.compiled.parse(data, **contextkw)
+
+    def build(self, obj, **contextkw):
+        return self.compiled.build(obj, **contextkw)
+
+    def _parse(self, stream, context, path):
+        return self.compiled._parsereport(stream, context, path)
+
+    def _build(self, obj, stream, context, path):
+        return self.compiled._build(obj, stream, context, path)
+
+    def _emitparse(self, code):
+        return self.subcon._compileparse(code)
+
+    def _emitbuild(self, code):
+        return self.subcon._compilebuild(code)
+
+
+def enum_cases(cases: dict) -> dict:
+    """
+    Switch cases for an Enum key, usable with a plain `this` key expression.
+
+    Parsed Enum fields hold the member name and built ones hold the integer value, so each case is
+    registered under both. Unlike a lambda key the expression can be compiled.
+    """
+    result = {}
+    for member, subcon in cases.items():
+        result[member.value] = subcon
+        result[member.name] = subcon
+    return result
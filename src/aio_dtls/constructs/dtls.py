@@ -1,9 +1,10 @@
 from collections import namedtuple
 
 from construct import Struct, Int8ub, Int16ub, Int24ub, BytesInteger, Bytes, Enum, Byte, Switch, Prefixed, \
-    GreedyBytes, IfThenElse, GreedyRange, Default
+    GreedyBytes, IfThenElse, GreedyRange, Default, this
 
 from . import tls
+from .compiler import CompiledOnce, enum_cases
 from .helper import Extensions
 from ..const import tls as const_tls, dtls as const_dtls
 
@@ -13,7 +14,7 @@ Cookie = Prefixed(Int8ub, Default(GreedyBytes, b''))
 
 ProtocolVersion = Enum(Int16ub, const_dtls.ProtocolVersion)
 
-ClientHello = Struct(
+ClientHello = CompiledOnce(Struct(
     client_version=ProtocolVersion,
     random=Bytes(32),  # Random,
     session_id=tls.SessionID,
@@ -21,58 +22,58 @@ ClientHello = Struct(
     cipher_suites=tls.CipherSuites,
     compression_methods=tls.CompressionMethods,
     extension=Extensions,
-)
+))
 
-HelloVerifyRequest = Struct(
+HelloVerifyRequest = CompiledOnce(Struct(
     server_version=ProtocolVersion,
     cookie=Cookie,
-)
+))
 
-Handshake = Struct(
+Handshake = CompiledOnce(Struct(
     handshake_type=Enum(Byte, const_tls.HandshakeType),
     length=Int24ub,
     message_sequence=Int16ub,
     fragment_offset=Default(Int24ub, 0),
-    fragment_length=Default(Int24ub, lambda ctx: ctx.length),
+    fragment_length=Default(Int24ub, this.length),
     fragment=IfThenElse(
-        lambda ctx: ctx.length == ctx.fragment_length,
-        Switch(lambda ctx: int(ctx.handshake_type), {
-            const_tls.HandshakeType.CLIENT_HELLO.value: ClientHello,
-            const_tls.HandshakeType.HELLO_VERIFY_REQUEST.value: HelloVerifyRequest,
-            const_tls.HandshakeType.SERVER_HELLO.value: tls.ServerHello,
-            const_tls.HandshakeType.CERTIFICATE.value: tls.Certificate,
-            const_tls.HandshakeType.SERVER_HELLO_DONE.value: tls.ServerHelloDone,
-            const_tls.HandshakeType.FINISHED.value: tls.Finished
-        }, default=Bytes(lambda ctx: ctx.fragment_length)),
-        Bytes(lambda ctx: ctx.fragment_length)
+        this.length == this.fragment_length,
+        Switch(this.handshake_type, enum_cases({
+            const_tls.HandshakeType.CLIENT_HELLO: ClientHello,
+            const_tls.HandshakeType.HELLO_VERIFY_REQUEST: HelloVerifyRequest,
+            const_tls.HandshakeType.SERVER_HELLO: tls.ServerHello,
+            const_tls.HandshakeType.CERTIFICATE: tls.Certificate,
+            const_tls.HandshakeType.SERVER_HELLO_DONE: tls.ServerHelloDone,
+            const_tls.HandshakeType.FINISHED: tls.Finished
+        }), default=Bytes(this.fragment_length)),
+        Bytes(this.fragment_length)
     )
-)
+))
 
-RawHandshake = Struct(
+RawHandshake = CompiledOnce(Struct(
     handshake_type=Enum(Byte, const_tls.HandshakeType),
     length=Int24ub,
     message_seq=Int16ub,
     fragment_offset=Int24ub,
     fragment_length=Int24ub,
-    fragment=Bytes(lambda ctx: ctx.fragment_length)
-)
+    fragment=Bytes(this.fragment_length)
+))
 
-Plaintext = Struct(
+Plaintext = CompiledOnce(Struct(
     type=tls.ContentType,
     version=ProtocolVersion,
     epoch=Int16ub,
     sequence_number=BytesInteger(6),
     fragment=Prefixed(
         Int16ub,
-        Switch(lambda ctx: ctx.type.intvalue, {
-            const_tls.ContentType.CHANGE_CIPHER_SPEC.value: GreedyBytes,
-            const_tls.ContentType.ALERT.value: tls.Alert,
-            const_tls.ContentType.HANDSHAKE.value: Handshake,
-            const_tls.ContentType.APPLICATION_DATA.value: GreedyBytes
-        }, default=GreedyBytes))
-)
+        Switch(this.type, enum_cases({
+            const_tls.ContentType.CHANGE_CIPHER_SPEC: GreedyBytes,
+            const_tls.ContentType.ALERT: tls.Alert,
+            const_tls.ContentType.HANDSHAKE: Handshake,
+            const_tls.ContentType.APPLICATION_DATA: GreedyBytes
+        }), default=GreedyBytes))
+))
 
-RawPlaintext = Struct(
+RawPlaintext = CompiledOnce(Struct(
     type=tls.ContentType,
     version=ProtocolVersion,
     epoch=Int16ub,
@@ -81,14 +82,14 @@ RawPlaintext = Struct(
         Int16ub,
         GreedyBytes
     )
-)
+))
 
 RawDatagram = GreedyRange(RawPlaintext)
 Datagram = GreedyRange(Plaintext)
 
 AnswerRecord = namedtuple('AnswerRecord', ('content_type', 'epoch', 'fragment'))
 
-TLSCompressed = Struct(
+TLSCompressed = CompiledOnce(Struct(
     type=tls.ContentType,
     version=ProtocolVersion,
     epoch=Int16ub,
@@ -97,17 +98,17 @@ TLSCompressed = Struct(
         Int16ub,
         GreedyBytes
     )
-)
+))
 
-TLSCiphertext = Struct(
+TLSCiphertext = CompiledOnce(Struct(
     type=tls.ContentType,
     version=ProtocolVersion,
     epoch=Int16ub,
     sequence_number=BytesInteger(6),
     fragment=Prefixed(
         Int16ub,
-        Switch(lambda ctx: ctx._params.security_parameters.cipher_type, {
+        Switch(this._params.security_parameters.cipher_type, {
             'block': tls.GenericBlockCipher,
             # const_tls.CipherType.aead: GenericAEADCipher
         }, default=GreedyBytes))
-)
+))
@@ -1,5 +1,7 @@
 from construct import Prefixed, GreedyBytes, GreedyRange
-from construct import Struct, Int8ub, Int16ub, Bytes, Enum, Switch
+from construct import Struct, Int8ub, Int16ub, Bytes, Enum, Switch, this
+
+from .compiler import CompiledOnce, enum_cases
 
 # from dtls.constructs_core import PrefixedBytes
 from ..const import tls
@@ -9,13 +11,13 @@ from ..const import tls
 ServerName = Enum(Int8ub, tls.NameType)
 ServerNameList = GreedyRange(ServerName)
 
-SignatureAndHashAlgorithm = Struct(
+SignatureAndHashAlgorithm = CompiledOnce(Struct(
     "hash" / Enum(Int8ub, tls.HashAlgorithm),
     "signature" / Enum(Int8ub, tls.SignatureAlgorithm),
-)
+))
 # SignatureAndHashAlgorithm = GreedyBytes
 
-SupportedSignatureAlgorithms = Prefixed(Int16ub, GreedyRange(SignatureAndHashAlgorithm))
+SupportedSignatureAlgorithms = CompiledOnce(Prefixed(Int16ub, GreedyRange(SignatureAndHashAlgorithm)))
 
 MaxFragmentLength = Enum(Int8ub, tls.MaxFragmentLength)
 ClientCertificateURL = Struct(
@@ -28,15 +30,15 @@ SHA1Hash = Bytes(20)
 
 NamedCurve = Enum(Int16ub, tls.NamedCurve)
 
-EllipticCurveList = Struct(
+EllipticCurveList = CompiledOnce(Struct(
     "elliptic_curve_list" / Prefixed(Int16ub, GreedyRange(NamedCurve))
-)
+))
 
 ECPointFormat = Enum(Int8ub, tls.ECPointFormat)
 
-ECPointFormatList = Struct(
+ECPointFormatList = CompiledOnce(Struct(
     "ec_point_format_list" / Prefixed(Int8ub, GreedyRange(ECPointFormat))
-)
+))
 
 # DistinguishedName = PrefixedBytes(
 #     SizeWithin(UBInt16("DistinguishedName_length"),
@@ -60,21 +62,21 @@ ECPointFormatList = Struct(
 # TrustedAuthorities = TLSPrefixedArray("trusted_authorities_list",
 #                                       TrustedAuthority)
 
-Extension = Struct(
+Extension = CompiledOnce(Struct(
     "type" / Enum(Int16ub, tls.ExtensionType),
     "data" / Prefixed(
         Int16ub,
-        Switch(lambda ctx: int(ctx.type), {
-            tls.ExtensionType.SERVER_NAME.value: ServerNameList,
-            tls.ExtensionType.SIGNATURE_ALGORITHMS.value: SupportedSignatureAlgorithms,
-            tls.ExtensionType.CLIENT_CERTIFICATE_URL.value: ClientCertificateURL,
-            tls.ExtensionType.MAX_FRAGMENT_LENGTH.value: MaxFragmentLength,
-            tls.ExtensionType.TRUNCATED_HMAC.value: TruncatedHMAC,
-            tls.ExtensionType.ELLIPTIC_CURVES.value: EllipticCurveList,
-            tls.ExtensionType.EC_POINT_FORMATS.value: ECPointFormatList
-            # enums.ExtensionType.TRUSTED_CA_KEYS.value: TrustedAuthorities,
-            # enums.ExtensionType.STATUS_REQUEST.value: CertificateStatusRequest,
-        }, default=GreedyBytes))
-)
+        Switch(this.type, enum_cases({
+            tls.ExtensionType.SERVER_NAME: ServerNameList,
+            tls.ExtensionType.SIGNATURE_ALGORITHMS: SupportedSignatureAlgorithms,
+            tls.ExtensionType.CLIENT_CERTIFICATE_URL: ClientCertificateURL,
+            tls.ExtensionType.MAX_FRAGMENT_LENGTH: MaxFragmentLength,
+            tls.ExtensionType.TRUNCATED_HMAC: TruncatedHMAC,
+            tls.ExtensionType.ELLIPTIC_CURVES: EllipticCurveList,
+            tls.ExtensionType.EC_POINT_FORMATS: ECPointFormatList
+            # enums.ExtensionType.TRUSTED_CA_KEYS: TrustedAuthorities,
+            # enums.ExtensionType.STATUS_REQUEST: CertificateStatusRequest,
+        }), default=GreedyBytes))
+))
 
-Extensions = Prefixed(Int16ub, GreedyRange(Extension))
+Extensions = CompiledOnce(Prefixed(Int16ub, GreedyRange(Extension)))
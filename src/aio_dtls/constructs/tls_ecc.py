@@ -1,72 +1,73 @@
 from construct import Prefixed, GreedyBytes, Default, Struct, Int8ub, Int16ub, Enum, Switch, this, Peek
 
+from .compiler import CompiledOnce, enum_cases
 from ..const import tls
 
-ServerDHParams = Struct(
+ServerDHParams = CompiledOnce(Struct(
     dh_p=Prefixed(Int16ub, GreedyBytes),
     dh_g=Prefixed(Int16ub, GreedyBytes),
     dh_Ys=Prefixed(Int16ub, GreedyBytes),
-)
+))
 
-ServerKeyExchangeDHAnon = Struct(
+ServerKeyExchangeDHAnon = CompiledOnce(Struct(
     param=ServerDHParams
-)
+))
 
 ExplicitPrime = Struct()
 ExplicitChar2 = Struct()
 
-NamedCurve = Struct(
+NamedCurve = CompiledOnce(Struct(
     curve_type=Enum(Int8ub, tls.ECCurveType),
     namedcurve=Enum(Int16ub, tls.NamedCurve)
-)
+))
 
-ECPoint = Struct(
+ECPoint = CompiledOnce(Struct(
     point=Prefixed(Int8ub, GreedyBytes)  # GreedyRange(Int8ub))
-)
+))
 
-ServerECDHParams = Struct(
+ServerECDHParams = CompiledOnce(Struct(
     curve_type=Peek(Enum(Int8ub, tls.ECCurveType)),
-    curve_params=Switch(lambda ctx: int(ctx.curve_type), {
-        tls.ECCurveType.named_curve.value: NamedCurve,
-        tls.ECCurveType.explicit_prime.value: ExplicitPrime,
-        tls.ECCurveType.explicit_char2.value: ExplicitChar2
-    }),
+    curve_params=Switch(this.curve_type, enum_cases({
+        tls.ECCurveType.named_curve: NamedCurve,
+        tls.ECCurveType.explicit_prime: ExplicitPrime,
+        tls.ECCurveType.explicit_char2: ExplicitChar2
+    })),
     public=ECPoint
-)
+))
 
-ServerKeyExchangeECDH = Struct(
+ServerKeyExchangeECDH = CompiledOnce(Struct(
     param=ServerECDHParams,
     signed_params=Default(GreedyBytes, b'')
-)
+))
 
-ServerKeyExchangeECDHPSK = Struct(
+ServerKeyExchangeECDHPSK = CompiledOnce(Struct(
     psk_identity_hint=Prefixed(Int16ub, GreedyBytes),  # rfc4279
     param=ServerECDHParams
-)
+))
 
-ServerKeyExchange = Switch(this._params.key_exchange_algorithm, {
+ServerKeyExchange = CompiledOnce(Switch(this._params.key_exchange_algorithm, {
     'ec_diffie_hellman': ServerKeyExchangeECDH,
     'ec_diffie_hellman_psk': ServerKeyExchangeECDHPSK
-}, default=GreedyBytes)
+}, default=GreedyBytes))
 
-ClientDiffieHellmanPublic = Struct(
+ClientDiffieHellmanPublic = CompiledOnce(Struct(
     dh_public=Struct(
         dh_Yc=Prefixed(Int8ub, GreedyBytes)
     )
-)
+))
 
-ClientKeyExchangeECDH = Struct(
+ClientKeyExchangeECDH = CompiledOnce(Struct(
     exchange_keys=ClientDiffieHellmanPublic,
-)
+))
 
-ClientKeyExchangeECDHPSK = Struct(
+ClientKeyExchangeECDHPSK = CompiledOnce(Struct(
     psk_identity=Struct(
         dh_public_Yc=Prefixed(Int16ub, GreedyBytes),
         psk=Prefixed(Int16ub, GreedyBytes)
     )
-)
+))
 
-ClientKeyExchange = Switch(this._params.key_exchange_algorithm, {
+ClientKeyExchange = CompiledOnce(Switch(this._params.key_exchange_algorithm, {
     'ec_diffie_hellman': ClientKeyExchangeECDH,
     'ec_diffie_hellman_psk': ClientKeyExchangeECDHPSK
-}, default=GreedyBytes)
+}, default=GreedyBytes))
@@ -1,9 +1,8 @@
-from .handshake_ecdh_anon import EcdhAnon
-from .handshake_ecdhe_psk import EcdhePsk
 from .helper import Helper
 from ..connection_manager.connection import Connection
 from ..connection_manager.connection_manager import ConnectionManager
 from ..const import tls as const_tls
+from ..const.handshake import ConnectionState
 from ..constructs import dtls
 from ..tls.handshake import Handshake as TlsHandshake
 
@@ -11,9 +10,22 @@ from ..tls.handshake import Handshake as TlsHandshake
 class Handshake(TlsHandshake):
     tls = dtls
     helper = Helper
+    handshake_header_size = 12
+    client_hello_cookie = True
     handlers = {
-        'ECDH_ANON': EcdhAnon,
-        'ECDHE_PSK': EcdhePsk
+        'ECDH_ANON': f'{__package__}.handshake_ecdh_anon.EcdhAnon',
+        'ECDHE_PSK': f'{__package__}.handshake_ecdhe_psk.EcdhePsk',
+    }
+    transitions = {
+        **TlsHandshake.transitions,
+        const_tls.ConnectionEnd.client: {
+            **TlsHandshake.transitions[const_tls.ConnectionEnd.client],
+            ConnectionState.HELLO_REQUEST: {
+                const_tls.HandshakeType.HELLO_VERIFY_REQUEST: (
+                    'received_hello_verify_request', ConnectionState.HELLO_REQUEST),
+                const_tls.HandshakeType.SERVER_HELLO: ('received_server_hello', ConnectionState.SERVER_HELLO),
+            },
+        },
     }
 
     @classmethod
@@ -50,12 +62,14 @@ class Handshake(TlsHandshake):
     @classmethod
     def received_client_hello(cls, connection_manager: ConnectionManager, connection: Connection, record):
         cls.received_client_hello_prepare(connection_manager, connection, record)
-        cookie = record.fragment.fragment.cookie
-        trust_cookie = connection_manager.get_cookie(connection)
+        with connection_manager.timed(connection, 'cookie_check'):
+            cookie = record.fragment.fragment.cookie
+            trust_cookie = connection_manager.get_cookie(connection)
+            cookie_valid = cookie == trust_cookie
 
         client_hello_data = record.fragment.fragment
 
-        if cookie == trust_cookie:
+        if cookie_valid:
             pass
         else:
             # если пришел запрос без или неправильным cookie возвращаем hello_verify_request
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from .. import math
 from ..connection_manager.connection import Connection
@@ -13,16 +13,20 @@ logger = logging.getLogger(__name__)
 class Helper(TlsHelper):
 
     @classmethod
-    def build_plaintext(cls, connection: Connection, records_data: List[dtls.AnswerRecord]):
+    def build_plaintext(cls, connection: Connection, records_data: List[dtls.AnswerRecord], trace=None):
         records = []
         for record in records_data:
+            sequence_number = connection.get_sequence_number(record.epoch)
             records.append({
                 "type": record.content_type,
                 "version": connection.ssl_version.value,
                 "epoch": record.epoch,
-                "sequence_number": connection.get_sequence_number(record.epoch),
+                "sequence_number": sequence_number,
                 "fragment": record.fragment
             })
+            if trace is not None:
+                trace.record(trace.SENT, connection.address, record.content_type, record.epoch, sequence_number,
+                             len(record.fragment))
 
         plaintext = dtls.RawDatagram.build(records)
         return plaintext
@@ -30,10 +34,14 @@ class Helper(TlsHelper):
     @classmethod
     def build_application_record(cls, connection: Connection, fragments):
         records = []
-        logger.debug(f'prepare {len(fragments)} application data for send')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'prepare {len(fragments)} application data for send')
+        # records get consecutive sequence numbers in build_plaintext, the MAC must use the same ones
+        sequence_number = connection.sequence_number
         for fragment in fragments:
             encrypted_data = cls.encrypt_ciphertext_fragment(
-                connection, const_tls.ContentType.APPLICATION_DATA, fragment)
+                connection, const_tls.ContentType.APPLICATION_DATA, fragment, sequence_number)
+            sequence_number += 1
             records.append(dtls.AnswerRecord(
                 content_type=const_tls.ContentType.APPLICATION_DATA.value,
                 epoch=connection.epoch,
@@ -42,10 +50,13 @@ class Helper(TlsHelper):
         return records
 
     @classmethod
-    def build_mac(cls, connection: Connection, record: dtls.RawPlaintext, mac_func, content_type: int, fragment: bytes):
+    def build_mac(cls, connection: Connection, record: dtls.RawPlaintext, mac_func, content_type: int, fragment: bytes,
+                  sequence_number: Optional[int] = None):
         if record is None:
             version = connection.ssl_version.value
-            seq_num = connection.epoch.to_bytes(2, 'big') + connection.sequence_number.to_bytes(6, 'big')
+            if sequence_number is None:
+                sequence_number = connection.sequence_number
+            seq_num = connection.epoch.to_bytes(2, 'big') + sequence_number.to_bytes(6, 'big')
         else:
             version = int(record.version)
             seq_num = record.epoch.to_bytes(2, 'big') + record.sequence_number.to_bytes(6, 'big')
@@ -94,6 +105,7 @@ class Helper(TlsHelper):
             "description": description.value
 
         })
+        connection.alert = description.name
         if connection.state.value == const_handshake.ConnectionState.HANDSHAKE_OVER:
             fragment = Helper.encrypt_ciphertext_fragment(
                 connection, const_tls.ContentType.ALERT, fragment)
@@ -112,7 +124,9 @@ class Helper(TlsHelper):
         )
 
     @classmethod
-    def send_records(cls, connection: Connection, answers, writer):
-        logger.debug(f'dtls send ({len(answers)})')
-        plaintext = cls.build_plaintext(connection, answers)
+    def send_records(cls, connection: Connection, answers, writer, trace=None):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'dtls send ({len(answers)})')
+        plaintext = cls.build_plaintext(connection, answers, trace)
+        connection.bytes_sent += len(plaintext)
         writer(plaintext, connection.address)
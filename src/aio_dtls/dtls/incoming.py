@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IncomingQueue:
+    """
+    Decrypted application data as an async iterator of (payload, peer), see DtlsSocket.incoming().
+
+    Takes the place of the app protocol. At high_water queued payloads reading from the transport is
+    paused until the consumer brings the queue down to low_water. Payloads beyond maxsize, already read
+    from the socket, are dropped by the overflow policy.
+    """
+    overflow_policies = ('drop_newest', 'drop_oldest')
+
+    def __init__(self, maxsize: int = 1024, *, overflow: str = 'drop_newest', high_water: Optional[int] = None,
+                 low_water: Optional[int] = None, transport=None):
+        if overflow not in self.overflow_policies:
+            raise ValueError(f'overflow {overflow} not in {self.overflow_policies}')
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.high_water = maxsize if high_water is None else high_water
+        self.low_water = self.high_water // 2 if low_water is None else low_water
+        self.transport = transport
+        self.dropped = 0
+        self.reading_paused = False
+        self._queue = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._closed = False
+        self._exception: Optional[BaseException] = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def datagram_received(self, data: bytes, address: tuple):
+        if self._closed:
+            return
+        queue = self._queue
+        if len(queue) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == 'drop_newest':
+                return
+            queue.popleft()
+        queue.append((data, address))
+        if not self.reading_paused and len(queue) >= self.high_water and self.transport is not None:
+            self.reading_paused = True
+            self.transport.pause_reading()
+        self._wakeup()
+
+    def error_received(self, exc, address=None):
+        # an alert from one peer does not end the stream of the others
+        logger.debug(f'{exc} from {address}')
+
+    def close(self, exc: Optional[BaseException] = None):
+        """Queued payloads are still returned, then iteration stops or raises exc"""
+        self._closed = True
+        self._exception = exc
+        self._wakeup()
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tuple[bytes, tuple]:
+        queue = self._queue
+        while not queue:
+            if self._closed:
+                if self._exception is not None:
+                    raise self._exception
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        item = queue.popleft()
+        if self.reading_paused and len(queue) <= self.low_water:
+            self.reading_paused = False
+            self.transport.resume_reading()
+        return item
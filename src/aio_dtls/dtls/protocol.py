@@ -20,24 +20,80 @@ class DTLSProtocol(DatagramProtocol, Protocol2):
                  server,
                  connection_manager: ConnectionManager,
                  endpoint,
-                 protocol_factory
+                 protocol_factory, *,
+                 dtls_socket=None
                  ):
         Protocol2.__init__(self, server, connection_manager, endpoint, protocol_factory)
         self.sender_address = None
+        # flow control of the transport is handled by the socket send queue
+        self.dtls_socket = dtls_socket
 
     def datagram_received(self, data, sender_address):
+        rate_limit = self.connection_manager.handshake_rate_limit
+        if rate_limit is not None:
+            for _ in range(self.count_client_hellos(data)):
+                if not rate_limit.allow(sender_address):
+                    logger.debug(f'client hello from {sender_address} over the rate limit')
+                    self.connection_manager.metrics.inc('records_dropped', label=('reason', 'rate_limit'))
+                    return
         self.sender_address = sender_address
         self._data_received(data, self.endpoint.raw_sendto)
 
+    @staticmethod
+    def count_client_hellos(data) -> int:
+        """plaintext handshake records of epoch 0 starting with a ClientHello, counted on the raw headers"""
+        # type(1) version(2) epoch(2) sequence number(6) length(2), then the handshake type
+        count = 0
+        offset = 0
+        size = len(data)
+        while offset + 13 < size:
+            if data[offset] == 22 and data[offset + 3] == 0 and data[offset + 4] == 0 and data[offset + 13] == 1:
+                count += 1
+            offset += 13 + (data[offset + 11] << 8 | data[offset + 12])
+        return count
+
+    def pause_writing(self):
+        if self.dtls_socket is not None:
+            self.dtls_socket.pause_writing()
+
+    def resume_writing(self):
+        if self.dtls_socket is not None:
+            self.dtls_socket.resume_writing()
+
+    def connection_lost(self, exc):
+        if self.dtls_socket is not None:
+            self.dtls_socket.connection_lost(exc)
+
+    def check_records(self, records) -> bool:
+        if len(records) > self.connection_manager.max_records_per_datagram:
+            logger.info(f'{len(records)} records in a datagram from {self.sender_address}, drop it')
+            self.connection_manager.limit_exceeded('records_per_datagram')
+            return False
+        return True
+
+    def check_answers(self, answers, request_size: int) -> bool:
+        """Until the cookie is verified the connection is not registered, do not amplify spoofed requests"""
+        connection_manager = self.connection_manager
+        if connection_manager.connections.get(self.connection.id) is self.connection:
+            return True
+        # record header: type(1) version(2) epoch(2) sequence number(6) length(2)
+        size = sum(13 + len(answer.fragment) for answer in answers)
+        if size > request_size * connection_manager.max_unverified_amplification:
+            logger.info(f'{size} bytes answer to {request_size} bytes from unverified {self.sender_address}, drop it')
+            connection_manager.limit_exceeded('amplification')
+            return False
+        return True
+
     def check_message_number(self, record):
         if record.sequence_number == 0 and record.epoch == 0 and self.connection.next_receive_epoch:  # новая сессия
             self.connection_manager.close_connection(self.connection)
-            self.connection = self.connection_manager.get_connection(self.sender_address)
+            self.connection = self.get_connection(self.sender_address)
             return False
         if (record.sequence_number < self.connection.next_receive_seq
             and record.epoch == self.connection.next_receive_epoch) \
                 or record.epoch < self.connection.next_receive_epoch:
-            logger.debug(f'skip record')
+            logger.debug('skip record')
+            self.connection_manager.metrics.inc('records_dropped', label=('reason', 'replay'))
             return True
         return False
 
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .socket import DtlsSocket, DtlsSession
+from ..connection_manager.connection import Connection
+
+logger = logging.getLogger(__name__)
+
+
+class ClientSessionPool:
+    """
+    Established client sessions per server on top of DtlsSocket.connect().
+
+    Sessions idle longer than idle_timeout are closed, above max_size the least recently used one is
+    evicted. Payloads sent while the handshake with a peer is in flight are queued and leave together in
+    the first datagram after it.
+    """
+
+    def __init__(self, dtls_socket: DtlsSocket, *, max_size: int = 1024, idle_timeout: Optional[float] = 300,
+                 connect_timeout: Optional[float] = None):
+        self.dtls_socket = dtls_socket
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self._sessions: 'OrderedDict[tuple, DtlsSession]' = OrderedDict()
+        self._last_used: Dict[tuple, float] = {}
+        self._pending: Dict[tuple, asyncio.Future] = {}
+        self._queued: Dict[tuple, List[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.handshakes = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'size': len(self._sessions),
+            'pending': len(self._pending),
+            'hits': self.hits,
+            'misses': self.misses,
+            'handshakes': self.handshakes,
+            'evictions': self.evictions,
+            'expired': self.expired,
+        }
+
+    def _lookup(self, key: tuple, now: float) -> Optional[DtlsSession]:
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        if session.closed:
+            self._remove(key)
+            return None
+        if self.idle_timeout is not None and now - self._last_used[key] > self.idle_timeout:
+            self.expired += 1
+            self._evict(self._remove(key), 'idle')
+            return None
+        self._sessions.move_to_end(key)
+        self._last_used[key] = now
+        return session
+
+    def _remove(self, key: tuple) -> DtlsSession:
+        del self._last_used[key]
+        return self._sessions.pop(key)
+
+    def _evict(self, session: DtlsSession, reason: str):
+        connection = session.connection
+        if connection is not None:
+            self.dtls_socket.connection_manager.connection_evicted(connection, reason)
+        session.close()
+
+    @staticmethod
+    def _consume_result(future: asyncio.Future):
+        # callers of get() and send() may be gone, retrieve the outcome so asyncio does not log it as unhandled
+        if not future.cancelled():
+            future.exception()
+
+    def _start(self, address: tuple, key: tuple) -> asyncio.Future:
+        pending = self._pending.get(key)
+        if pending is None:
+            self.handshakes += 1
+            pending = self._pending[key] = asyncio.ensure_future(self._connect(address, key))
+        return pending
+
+    async def _connect(self, address: tuple, key: tuple) -> DtlsSession:
+        try:
+            session = await self.dtls_socket.connect(address, self.connect_timeout)
+        except BaseException:
+            self._queued.pop(key, None)
+            raise
+        finally:
+            del self._pending[key]
+        self._sessions[key] = session
+        self._last_used[key] = time.monotonic()
+        while len(self._sessions) > self.max_size:
+            evicted_key, evicted = self._sessions.popitem(last=False)
+            del self._last_used[evicted_key]
+            self.evictions += 1
+            self._evict(evicted, 'max_size')
+        queued = self._queued.pop(key, None)
+        if queued:
+            session.send(*queued)
+        return session
+
+    async def get(self, address: tuple) -> DtlsSession:
+        key = Connection.get_id(address)
+        session = self._lookup(key, time.monotonic())
+        if session is not None:
+            self.hits += 1
+            return session
+        self.misses += 1
+        return await asyncio.shield(self._start(address, key))
+
+    async def send(self, data: bytes, address: tuple):
+        key = Connection.get_id(address)
+        session = self._lookup(key, time.monotonic())
+        if session is not None:
+            self.hits += 1
+            session.send(data)
+            return
+        self.misses += 1
+        self._queued.setdefault(key, []).append(data)
+        await asyncio.shield(self._start(address, key))
+
+    def expire(self):
+        """Close sessions idle longer than idle_timeout"""
+        if self.idle_timeout is None:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        for key in [key for key, last_used in self._last_used.items() if last_used < deadline]:
+            self.expired += 1
+            self._evict(self._remove(key), 'idle')
+
+    def close(self):
+        for pending in list(self._pending.values()):
+            pending.add_done_callback(self._consume_result)
+            pending.cancel()
+        self._queued.clear()
+        self._last_used.clear()
+        while self._sessions:
+            self._sessions.popitem()[1].close()
@@ -1,18 +1,25 @@
 import asyncio
 import logging
+from collections import deque
 from typing import Optional
 
 from .helper import Helper
+from .incoming import IncomingQueue
 from ..connection_manager.connection import Connection
 from ..connection_manager.connection_manager import ConnectionManager
+from ..const import handshake as const_handshake
 from ..const import tls as const_tls
 from ..dtls.handshake import Handshake
 from ..dtls.protocol import DTLSProtocol
+from ..metrics import Metrics
+from ..rate_limit import HandshakeRateLimiter
 
 logger = logging.getLogger(__name__)
 
 
 class DtlsSocket:
+    send_overflow_policies = ('drop_newest', 'drop_oldest')
+
     def __init__(self, sock, *,
                  # server=None,
                  endpoint=None,
@@ -23,7 +30,12 @@ class DtlsSocket:
                  ciphers: Optional[list] = None,
                  elliptic_curves: Optional[list] = None,
                  identity_hint: Optional[dict] = None,
-                 psk: Optional[str] = None
+                 psk: Optional[str] = None,
+                 max_handshakes: Optional[int] = None,
+                 max_send_queue: int = 1024,
+                 send_overflow: str = 'drop_newest',
+                 metrics: Optional[Metrics] = None,
+                 handshake_rate_limit: Optional[HandshakeRateLimiter] = None
                  ):
         # self.server = server
         self.endpoint = endpoint
@@ -38,12 +50,58 @@ class DtlsSocket:
             elliptic_curves=elliptic_curves,
             psk=psk,
             ciphers=ciphers,
+            metrics=metrics,
+            handshake_rate_limit=handshake_rate_limit,
         ) if connection_manager is None else connection_manager
         # self.dtls_protocol = DTLSProtocol(
         #     connection_manager=connection_manager,
         # )
+        # bounds client handshakes in flight, see connect()
+        self._handshake_slots = asyncio.Semaphore(max_handshakes) if max_handshakes else None
+        # datagrams held back while the transport is paused, see pause_writing()
+        if send_overflow not in self.send_overflow_policies:
+            raise ValueError(f'send_overflow {send_overflow} not in {self.send_overflow_policies}')
+        self.max_send_queue = max_send_queue
+        self.send_overflow = send_overflow
+        self._send_queue = deque()
+        self._writing_paused = False
+        self._drain_waiters = []
+        self.datagrams_queued = 0
+        self.datagrams_dropped = 0
+        self._incoming: Optional[IncomingQueue] = None
 
-        pass
+    async def connect(self, address: tuple, timeout: Optional[float] = None, **kwargs) -> 'DtlsSession':
+        """Handshake with the server if there is no session yet, returns the established session"""
+        if self._handshake_slots is None:
+            return await self._connect(address, timeout, **kwargs)
+        async with self._handshake_slots:
+            return await self._connect(address, timeout, **kwargs)
+
+    async def _connect(self, address: tuple, timeout: Optional[float], **kwargs) -> 'DtlsSession':
+        connection = self.connection_manager.get_connection(address, **kwargs)
+        if not connection:
+            self.do_handshake(connection)
+        if connection.handshake_waiter is None \
+                and connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
+            connection.handshake_waiter = asyncio.get_running_loop().create_future()
+        waiter = connection.handshake_waiter
+        if waiter is not None:
+            # shielded, a caller that times out must not cancel the handshake other callers are joined to
+            connection.handshake_joiners += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except (Exception, asyncio.CancelledError):
+                if waiter.done():
+                    if waiter.cancelled() or waiter.exception() is not None:
+                        self.connection_manager.close_connection(connection)
+                elif connection.handshake_joiners == 1:
+                    # the last caller gave up, nobody is left to retrieve the result
+                    waiter.cancel()
+                    self.connection_manager.close_connection(connection)
+                raise
+            finally:
+                connection.handshake_joiners -= 1
+        return DtlsSession(self, address)
 
     def sendto(self, data: bytes, address: tuple, **kwargs):
         connection = self.connection_manager.get_connection(address, **kwargs)
@@ -59,11 +117,15 @@ class DtlsSocket:
                         'params': new_connection,
                         'data': data
                     }
-                    Helper.send_records(connection, [record, record], self._sock.sendto)
+                    Helper.send_records(connection, [record, record], self._sendto,
+                                        self.connection_manager.trace)
                     return
         if connection:
+            if self._drop_before_encrypt():
+                return
             records = Helper.build_application_record(connection, [data])
-            Helper.send_records(connection, records, self._sock.sendto)
+            self.connection_manager.metrics.inc('records_sent', len(records))
+            Helper.send_records(connection, records, self._sendto, self.connection_manager.trace)
         else:
             connection.flight_buffer.append(data)
             self.do_handshake(connection)
@@ -80,11 +142,110 @@ class DtlsSocket:
     def do_handshake(self, connection: Connection):
         self.connection_manager.new_client_connection(connection)
         client_hello = Handshake.build_client_hello(self.connection_manager, connection)
-        self._sock.sendto(client_hello, connection.address)
+        self.connection_manager.metrics.inc('records_sent')
+        connection.bytes_sent += len(client_hello)
+        self._sendto(client_hello, connection.address)
         pass
 
     def raw_sendto(self, data: bytes, address: tuple):
-        self._sock.sendto(data, address)
+        self._sendto(data, address)
+
+    @property
+    def send_queue_size(self) -> int:
+        return len(self._send_queue)
+
+    def _sendto(self, data: bytes, address: tuple):
+        """Write one datagram, or queue it while the transport is paused"""
+        if self._writing_paused or self._send_queue:
+            self._queue_datagram(data, address)
+        elif self._transport is not None:
+            self._transport_sendto(data, address)
+        else:
+            self._count_sent(data)
+            self._sock.sendto(data, address)
+
+    def _transport_sendto(self, data: bytes, address: tuple):
+        self._count_sent(data)
+        self._transport.sendto(data, address)
+
+    def _count_sent(self, data: bytes):
+        metrics = self.connection_manager.metrics
+        if metrics.enabled:
+            metrics.inc('datagrams_sent')
+            metrics.inc('bytes_sent', len(data))
+
+    def _count_dropped(self, count: int = 1):
+        self.datagrams_dropped += count
+        self.connection_manager.metrics.inc('datagrams_dropped', count)
+
+    def _queue_datagram(self, data: bytes, address: tuple):
+        if len(self._send_queue) >= self.max_send_queue:
+            self._count_dropped()
+            if self.send_overflow == 'drop_newest':
+                return
+            self._send_queue.popleft()
+        self._send_queue.append((data, address))
+        self.datagrams_queued += 1
+
+    def _drop_before_encrypt(self) -> bool:
+        """A datagram that would be dropped from a full queue is not worth encrypting"""
+        if self.send_overflow == 'drop_newest' and len(self._send_queue) >= self.max_send_queue:
+            self._count_dropped()
+            return True
+        return False
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        queue = self._send_queue
+        while queue and not self._writing_paused:
+            self._transport_sendto(*queue.popleft())
+        if not queue and not self._writing_paused:
+            self._wake_drain_waiters()
+
+    async def drain(self):
+        """Wait until the datagrams queued by a paused transport are handed to it"""
+        if not self._writing_paused and not self._send_queue:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    def _wake_drain_waiters(self, exc: Optional[BaseException] = None):
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+    def connection_lost(self, exc):
+        if self._send_queue:
+            self._count_dropped(len(self._send_queue))
+            self._send_queue.clear()
+        self._writing_paused = False
+        self._wake_drain_waiters(exc or ConnectionError('transport closed'))
+        if self._incoming is not None:
+            self._incoming.close(exc)
+
+    def incoming(self, maxsize: int = 1024, *, overflow: str = 'drop_newest', high_water: Optional[int] = None,
+                 low_water: Optional[int] = None) -> IncomingQueue:
+        """
+        Received application data for ``async for payload, peer in dtls_socket.incoming()``
+
+        Call after listen(), the queue replaces the app protocol given to it.
+        """
+        if self._protocol is None:
+            raise ConnectionError('socket is not listening')
+        if self._incoming is None:
+            self._incoming = IncomingQueue(maxsize, overflow=overflow, high_water=high_water,
+                                           low_water=low_water, transport=self._transport)
+            self._protocol.set_app_protocol(self._incoming)
+        return self._incoming
 
     @property
     def address(self):
@@ -103,7 +264,8 @@ class DtlsSocket:
                 server,
                 self.connection_manager,
                 self.endpoint,
-                protocol_factory
+                protocol_factory,
+                dtls_socket=self
             ), sock=self._sock)
         _address = self._transport.get_extra_info('socket').getsockname()
         source_port = self._address[1]
@@ -119,6 +281,48 @@ class DtlsSocket:
             if connection:
                 record = Helper.build_alert(
                     connection, const_tls.AlertLevel.WARNING, const_tls.AlertDescription.CLOSE_NOTIFY)
-                Helper.send_records(connection, [record], self._sock.sendto)
+                Helper.send_records(connection, [record], self._sendto, self.connection_manager.trace)
         else:
             self._sock.close()
+            if self._incoming is not None:
+                self._incoming.close()
+
+
+class DtlsSession:
+    """Client session with one server, see DtlsSocket.connect()"""
+
+    def __init__(self, dtls_socket: DtlsSocket, address: tuple):
+        self.dtls_socket = dtls_socket
+        self.address = address
+        self.id = Connection.get_id(address)
+
+    @property
+    def connection(self) -> Optional[Connection]:
+        return self.dtls_socket.connection_manager.connections.get(self.id)
+
+    @property
+    def closed(self) -> bool:
+        return self.connection is None
+
+    def send(self, *data: bytes):
+        """Send the payloads, several of them go out as records of one datagram"""
+        connection = self.connection
+        if connection is None:
+            raise ConnectionError(f'session {self.id} closed')
+        if self.dtls_socket._drop_before_encrypt():
+            return
+        records = Helper.build_application_record(connection, data)
+        self.dtls_socket.connection_manager.metrics.inc('records_sent', len(records))
+        Helper.send_records(connection, records, self.dtls_socket._sendto,
+                            self.dtls_socket.connection_manager.trace)
+
+    async def drain(self):
+        """Wait for the socket send queue to empty, see DtlsSocket.drain()"""
+        await self.dtls_socket.drain()
+
+    def close(self):
+        connection = self.connection
+        if connection is None:
+            return
+        self.dtls_socket.close(self.address)
+        self.dtls_socket.connection_manager.close_connection(connection)
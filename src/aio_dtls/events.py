@@ -0,0 +1,21 @@
+from collections import namedtuple
+
+HANDSHAKE_STARTED = 'handshake_started'
+HANDSHAKE_COMPLETED = 'handshake_completed'
+HANDSHAKE_FAILED = 'handshake_failed'
+CONNECTION_CLOSED = 'connection_closed'
+CONNECTION_EVICTED = 'connection_evicted'
+EVENTS = (HANDSHAKE_STARTED, HANDSHAKE_COMPLETED, HANDSHAKE_FAILED, CONNECTION_CLOSED, CONNECTION_EVICTED)
+
+# passed to the callbacks of ConnectionManager.subscribe(), fields that do not apply to the event are None
+#   timestamp    time.monotonic_ns() of the event
+#   role         'client' or 'server'
+#   suite        cipher suite name once negotiated
+#   duration_us  handshake_completed and connection_closed: since handshake_started
+#   resumed      handshake_completed: abbreviated handshake, always False as sessions are not resumed
+#   alert        handshake_failed: last alert sent or received on the connection
+#   stage        handshake_failed: handshake state the connection was in
+#   reason       connection_evicted: why the owner dropped the connection
+LifecycleEvent = namedtuple('LifecycleEvent', ('event', 'timestamp', 'address', 'role', 'suite', 'duration_us',
+                                               'resumed', 'alert', 'stage', 'reason'),
+                            defaults=(None,) * 6)
@@ -35,3 +35,19 @@ class BadMAC(TLSException):
 
 class TLSCloseNotify(TLSException):
     pass
+
+
+class UnexpectedMessage(TLSException):
+    pass
+
+
+class RecordOverflow(TLSException):
+    pass
+
+
+class LimitExceeded(TLSException):
+    """A DoS limit of ConnectionManager was hit, the message is dropped without an answer"""
+
+    def __init__(self, limit: str, message: str = ''):
+        super().__init__(f'{limit} limit exceeded {message}'.rstrip())
+        self.limit = limit
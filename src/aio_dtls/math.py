@@ -42,7 +42,8 @@ def create_hmac(k, hash_function="sha1"):
 
 
 def build_mac(mac_func, seq_num, content_type: int, ssl_version: int, fragment: bytes):
-    logger.debug(f'build mac {seq_num} {content_type:x} {ssl_version:x} {fragment.hex(" ")}')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'build mac {seq_num} {content_type:x} {ssl_version:x} {fragment.hex(" ")}')
     fragment_len = len(fragment)
     _mac_func = mac_func.copy()
     _mac_func.update(seq_num)
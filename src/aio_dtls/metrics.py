@@ -0,0 +1,181 @@
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+
+Label = Optional[Tuple[str, str]]
+
+
+class Metrics:
+    """
+    Metrics hooks called by ConnectionManager, the protocols and the handshake handlers.
+
+    This base class does nothing and is the default, CollectingMetrics keeps the numbers. Every metric
+    takes at most one label as a (name, value) pair, values are integers.
+    """
+    enabled = False
+
+    def inc(self, name: str, value: int = 1, label: Label = None):
+        pass
+
+    def observe(self, name: str, value: int, label: Label = None):
+        pass
+
+    def gauge(self, name: str, callback: Callable[[], int]):
+        """register a value read by snapshot()"""
+        pass
+
+    def snapshot(self) -> dict:
+        return {'counters': {}, 'gauges': {}, 'histograms': {}}
+
+
+NULL_METRICS = Metrics()
+# returned by ConnectionManager.timed() while metrics are disabled
+NULL_TIMER = nullcontext()
+
+
+def metric_key(name: str, label: Label) -> str:
+    return name if label is None else f'{name}{{{label[0]}="{label[1]}"}}'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[int, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: int):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, the last bound is '+Inf'"""
+        total = 0
+        for bound, count in zip([*self.buckets, '+Inf'], self.counts):
+            total += count
+            yield bound, total
+
+
+class Timeline:
+    """
+    Handshake stages of one connection, see ConnectionManager.timed().
+
+    stages holds (name, start, duration) in monotonic nanoseconds, start relative to the first stage
+    or handshake_started(). A stage entered twice, e.g. calc_pending_states, appears twice.
+    """
+    __slots__ = ('start', 'stages')
+
+    def __init__(self):
+        self.start = time.monotonic_ns()
+        self.stages: List[Tuple[str, int, int]] = []
+
+    def stage(self, name: str) -> '_Stage':
+        return _Stage(self, name)
+
+    def durations(self) -> Dict[str, int]:
+        """nanoseconds spent in each stage"""
+        result = {}
+        for name, _, duration in self.stages:
+            result[name] = result.get(name, 0) + duration
+        return result
+
+    def elapsed(self) -> int:
+        return time.monotonic_ns() - self.start
+
+    def as_dict(self) -> dict:
+        return {
+            'elapsed_us': self.elapsed() // 1000,
+            'stages': [{'name': name, 'start_us': start // 1000, 'duration_us': duration // 1000}
+                       for name, start, duration in self.stages],
+        }
+
+
+class _Stage:
+    __slots__ = ('timeline', 'name', 'begin')
+
+    def __init__(self, timeline: Timeline, name: str):
+        self.timeline = timeline
+        self.name = name
+        self.begin = 0
+
+    def __enter__(self):
+        self.begin = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        timeline = self.timeline
+        timeline.stages.append((self.name, self.begin - timeline.start, time.monotonic_ns() - self.begin))
+        return False
+
+
+class CollectingMetrics(Metrics):
+    """In-memory counters, gauges and histograms with snapshot() and an OpenMetrics text renderer"""
+    enabled = True
+    # microseconds, used by histograms without buckets of their own
+    default_buckets = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+    def __init__(self, buckets: Optional[Dict[str, Tuple[int, ...]]] = None):
+        self.buckets = buckets or {}
+        self._counters: Dict[str, Dict[Label, int]] = {}
+        self._histograms: Dict[str, Dict[Label, Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], int]] = {}
+
+    def inc(self, name: str, value: int = 1, label: Label = None):
+        family = self._counters.get(name)
+        if family is None:
+            family = self._counters[name] = {}
+        family[label] = family.get(label, 0) + value
+
+    def observe(self, name: str, value: int, label: Label = None):
+        family = self._histograms.get(name)
+        if family is None:
+            family = self._histograms[name] = {}
+        histogram = family.get(label)
+        if histogram is None:
+            histogram = family[label] = Histogram(self.buckets.get(name, self.default_buckets))
+        histogram.observe(value)
+
+    def gauge(self, name: str, callback: Callable[[], int]):
+        self._gauges[name] = callback
+
+    def snapshot(self) -> dict:
+        return {
+            'counters': {
+                metric_key(name, label): value
+                for name, family in self._counters.items() for label, value in family.items()
+            },
+            'gauges': {name: callback() for name, callback in self._gauges.items()},
+            'histograms': {
+                metric_key(name, label): {
+                    'buckets': dict(histogram.cumulative()), 'sum': histogram.sum, 'count': histogram.count}
+                for name, family in self._histograms.items() for label, histogram in family.items()
+            },
+        }
+
+    def render_openmetrics(self, prefix: str = 'aio_dtls') -> str:
+        lines = []
+        for name, family in sorted(self._counters.items()):
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for label, value in family.items():
+                lines.append(f'{prefix}_{name}_total{self._labels(label)} {value}')
+        for name, callback in sorted(self._gauges.items()):
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {callback()}')
+        for name, family in sorted(self._histograms.items()):
+            lines.append(f'# TYPE {prefix}_{name} histogram')
+            for label, histogram in family.items():
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{prefix}_{name}_bucket{self._labels(label, ("le", str(bound)))} {count}')
+                lines.append(f'{prefix}_{name}_sum{self._labels(label)} {histogram.sum}')
+                lines.append(f'{prefix}_{name}_count{self._labels(label)} {histogram.count}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(*labels: Label) -> str:
+        pairs = [f'{key}="{value}"' for key, value in filter(None, labels)]
+        return f'{{{",".join(pairs)}}}' if pairs else ''
@@ -1,12 +1,13 @@
 import logging
-from typing import Optional
+from typing import List, Optional
 
 from .connection_manager.connection import Connection
 from .connection_manager.connection_manager import ConnectionManager
 from .const import handshake as const_handshake
 from .const import tls as const_tls
 from .constructs import tls
-from .exceptions import BadMAC, TLSException, UnsupportedCipher, UnsupportedSslVersion
+from .exceptions import (BadMAC, LimitExceeded, TLSException, UnexpectedMessage, UnsupportedCipher,
+                         UnsupportedSslVersion)
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,12 @@ class Protocol2:
     protocol_construct = None
     protocol_helper = None
     handshake_handler = None
+    record_handlers = {
+        const_tls.ContentType.CHANGE_CIPHER_SPEC.value: 'received_change_cipher_spec',
+        const_tls.ContentType.ALERT.value: 'received_alert',
+        const_tls.ContentType.HANDSHAKE.value: 'received_handshake',
+        const_tls.ContentType.APPLICATION_DATA.value: 'received_application_data',
+    }
 
     def __init__(self,
                  server,
@@ -26,82 +33,162 @@ class Protocol2:
         self.connection_manager = connection_manager
         self.endpoint = endpoint
         self.app_protocol = protocol_factory(server, endpoint) if protocol_factory else None
+        # app protocols with payloads_received() get all application data of a datagram in one call
+        self._batch_delivery = hasattr(self.app_protocol, 'payloads_received')
+        self._app_batch: Optional[list] = None
         self.connection: Optional[Connection] = None
         self.sender_address: Optional[tuple] = None
         self.writer = None
+        self._last_address = None
+        self._last_connection: Optional[Connection] = None
+        self._last_generation = None
+        self._record_dispatch = {
+            content_type: getattr(self, name) for content_type, name in self.record_handlers.items()
+        }
+        self._handshake_dispatch = self.handshake_handler.get_dispatch_table()
+
+    def set_app_protocol(self, app_protocol):
+        self.app_protocol = app_protocol
+        self._batch_delivery = hasattr(app_protocol, 'payloads_received')
+
+    def get_connection(self, address) -> Connection:
+        """Connection lookup with a one-entry cache for the last registered peer."""
+        if address == self._last_address and self._last_generation == self.connection_manager.generation:
+            return self._last_connection
+        connection = self.connection_manager.get_connection(address)
+        if self.connection_manager.connections.get(connection.id) is connection:
+            self._last_address = address
+            self._last_connection = connection
+            self._last_generation = self.connection_manager.generation
+        return connection
 
     def _data_received(self, data, writer):
-        logger.debug(f'received from {self.sender_address} {data}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'received from {self.sender_address} {data}')
         self.writer = writer
-        self.connection = self.connection_manager.get_connection(self.sender_address)
+        self.connection = self.get_connection(self.sender_address)
+        self.connection.bytes_received += len(data)
 
         records = self.protocol_construct.RawDatagram.parse(data)
         answers = []
+        trace = self.connection_manager.trace
+        metrics = self.connection_manager.metrics
+        if metrics.enabled:
+            metrics.inc('datagrams_received')
+            metrics.inc('bytes_received', len(data))
+            metrics.inc('records_received', len(records))
+        if not self.check_records(records):
+            return []
+        batch = self._app_batch = [] if self._batch_delivery else None
         for record in records:
+            if trace is not None:
+                trace.record(trace.RECEIVED, self.sender_address, int(record.type), record.get('epoch', 0),
+                             record.get('sequence_number', 0), len(record.fragment))
             if self.check_message_number(record):
                 continue
-            handler = f'received_{str(record.type).lower()}'
-            logger.debug(f'processed {handler}')
-
             try:
-                answer = getattr(self, handler)(record)
+                handler = self._record_dispatch.get(int(record.type))
+                if handler is None:
+                    raise UnexpectedMessage(record.type)
+                answer = handler(record)
                 if answer:
                     answers.extend(answer)
+            except UnexpectedMessage as err:
+                logger.info(f'unexpected message {err} from {self.sender_address}')
+                if self.connection.ssl_version is None:  # nothing negotiated with the peer, just drop it
+                    continue
+                answers.append(self.build_alert(const_tls.AlertLevel.FATAL,
+                                                const_tls.AlertDescription.UNEXPECTED_MESSAGE))
+                self.connection_manager.close_connection(self.connection)
             except (UnsupportedCipher, UnsupportedSslVersion):
-                answer = [
-                    self.protocol_helper.build_alert(self.connection, const_tls.AlertLevel.FATAL,
-                                                     const_tls.AlertDescription.HANDSHAKE_FAILURE)]
+                answer = [self.build_alert(const_tls.AlertLevel.FATAL, const_tls.AlertDescription.HANDSHAKE_FAILURE)]
                 self.connection_manager.close_connection(self.connection)
                 logger.info('terminate connection')
                 answers.extend(answer)
-
-        # todo как минимум надо проверять размер ответа
+            except LimitExceeded as err:
+                logger.info(f'{err} from {self.sender_address}, drop datagram')
+                self.connection_manager.limit_exceeded(err.limit)
+                if self.connection_manager.connections.get(self.connection.id) is self.connection:
+                    self.connection_manager.close_connection(self.connection)
+                answers = []
+                break
+        self._app_batch = None
+        if batch:
+            self.app_process_received_batch(batch)
+
+        if answers and not self.check_answers(answers, len(data)):
+            answers = []
         if answers:
-            self.protocol_helper.send_records(self.connection, answers, writer)
+            metrics.inc('records_sent', len(answers))
+            self.protocol_helper.send_records(self.connection, answers, writer, trace)
         return answers
 
+    def build_alert(self, level: const_tls.AlertLevel, description: const_tls.AlertDescription):
+        self.connection_manager.metrics.inc('alerts_sent', label=('description', description.name))
+        return self.protocol_helper.build_alert(self.connection, level, description)
+
     def check_message_number(self, record):
         pass
 
+    def check_records(self, records) -> bool:
+        """False drops the received datagram before its records are handled"""
+        return True
+
+    def check_answers(self, answers, request_size: int) -> bool:
+        """False drops the answers to the received datagram"""
+        return True
+
     def received_handshake(self, record):
-        self.connection.next_receive_seq += 1
-        if self.connection.state.value == const_handshake.ConnectionState.HANDSHAKE_OVER:
-            if self.connection.security_params.entity == const_tls.ConnectionEnd.server:
-                return self.handshake_handler.received_client_finished(self.connection_manager, self.connection, record)
-            else:
-                return self.handshake_handler.received_server_finished(self.connection_manager, self.connection, record)
-            pass
-        else:
-            _handler = f'received_{const_tls.HandshakeType(record.fragment[0], None).name.lower()}'
-            logger.debug(_handler)
-            if hasattr(self.handshake_handler, _handler):
-                return getattr(self.handshake_handler, _handler)(self.connection_manager, self.connection, record)
-            else:
-                raise Exception(f'Not implemented {_handler}')
-            pass
+        connection = self.connection
+        connection.next_receive_seq += 1
+        state = connection.state.value
+        try:
+            messages = self._handshake_dispatch[connection.security_params.entity][state]
+            handler, next_state = messages[
+                None if state == const_handshake.ConnectionState.HANDSHAKE_OVER else record.fragment[0]]
+        except (KeyError, IndexError):
+            raise UnexpectedMessage(f'handshake {record.fragment[:1].hex()} in state {state}')
+        answer = handler(self.connection_manager, connection, record)
+        if next_state is not None:
+            connection.state.value = next_state
+        return answer
 
     def received_application_data(self, record):
+        if self.connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
+            raise UnexpectedMessage('application data before handshake')
         self.connection.next_receive_seq += 1
         try:
             data = self.protocol_helper.decrypt_ciphertext_fragment(self.connection, record)
         except BadMAC:
-            answer = [
-                self.protocol_helper.build_alert(self.connection, const_tls.AlertLevel.FATAL,
-                                                 const_tls.AlertDescription.BAD_RECORD_MAC)]
+            self.connection_manager.metrics.inc('bad_mac')
+            answer = [self.build_alert(const_tls.AlertLevel.FATAL, const_tls.AlertDescription.BAD_RECORD_MAC)]
             self.connection_manager.close_connection(self.connection)
             logger.info('terminate connection')
             return answer
 
-        logger.info(f'dtls receive seq={record.sequence_number} data {data.block_ciphered.content.hex()}')
-        if self.app_protocol:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'receive seq={record.get("sequence_number")} data {data.block_ciphered.content.hex()}')
+        if self._app_batch is not None:
+            self._app_batch.append(memoryview(data.block_ciphered.content))
+        elif self.app_protocol is not None:
             self.app_process_received_data(data.block_ciphered.content)
 
     def app_process_received_data(self, data: bytes):
         raise NotImplemented()
 
+    def app_process_received_batch(self, payloads: List[memoryview]):
+        self.app_protocol.payloads_received(payloads, self.sender_address)
+
     def app_process_error(self, message):
         raise NotImplemented()
 
+    def app_process_eof(self, exception):
+        """close_notify from the peer, reported like any other alert unless the protocol has a stream to end"""
+        self.app_process_error(exception)
+
+    def app_process_warning(self, exception):
+        self.app_process_error(exception)
+
     def received_alert(self, record):
         if self.connection.state.value == const_handshake.ConnectionState.HANDSHAKE_OVER:
             self.connection.next_receive_seq += 1
@@ -120,13 +207,13 @@ class Protocol2:
                 else:
                     record = self.protocol_helper.build_alert(
                         self.connection, const_tls.AlertLevel.WARNING, const_tls.AlertDescription.CLOSE_NOTIFY)
-                    self.protocol_helper.send_records(self.connection, [record], self.writer)
-            else:
-                raise NotImplemented()
+                    self.protocol_helper.send_records(self.connection, [record], self.writer,
+                                                      self.connection_manager.trace)
         else:
             if len(record.fragment) > 2:  # encrypted alert
                 # получено после закрытия соединения
                 logger.info(f'Receive TLS encrypted alert')
+                self.connection_manager.metrics.inc('alerts_received', label=('description', 'encrypted'))
                 return
                 # self.app_process_error(TLSException('TLS encrypted alert'))
                 # self.connection_manager.close_connection(self.connection)
@@ -135,7 +222,16 @@ class Protocol2:
                 self.connection.next_receive_seq += 1
                 alert = tls.Alert.parse(record.fragment)
         logger.info(f'Receive TLS Alert {alert.level} {alert.description}')
-        self.app_process_error(TLSException(alert.description))
+        self.connection_manager.metrics.inc('alerts_received', label=('description', str(alert.description)))
+        self.connection.alert = str(alert.description)
+        exception = TLSException(alert.description)
+        if int(alert.level) == const_tls.AlertLevel.FATAL.value:
+            self.connection.handshake_done(exception)
+            self.app_process_error(exception)
+        elif int(alert.description) == const_tls.AlertDescription.CLOSE_NOTIFY.value:
+            self.app_process_eof(exception)
+        else:
+            self.app_process_warning(exception)
         # self.connection_manager.close_connection(self.connection)
 
     def received_change_cipher_spec(self, record: tls.RawPlaintext):
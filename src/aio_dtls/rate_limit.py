@@ -0,0 +1,113 @@
+import ipaddress
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+
+class HandshakeRateLimiter:
+    """
+    Token buckets for ClientHellos per source IP and per subnet, see DTLSProtocol.datagram_received.
+
+    Every ClientHello takes a token from the bucket of its source and of its subnet, a full handshake
+    with cookie exchange takes two. A bucket holds at most burst tokens and gets rate tokens per second.
+    Buckets are (tokens, timestamp) tuples, a bucket refilled to burst is the same as no bucket and is
+    dropped by the periodic sweep; at max_entries the least recently used bucket is dropped too.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 10, *,
+                 subnet_rate: Optional[float] = None, subnet_burst: Optional[int] = None,
+                 ipv4_prefix: int = 24, ipv6_prefix: int = 64,
+                 max_entries: int = 65536, sweep_interval: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param subnet_rate: tokens per second shared by a subnet, no subnet limit if None
+        :param ipv4_prefix: subnet size of IPv4 sources, ipv6_prefix of IPv6 ones
+        :param max_entries: buckets kept per kind
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst at least 1')
+        self.rate = rate
+        self.burst = burst
+        self.subnet_rate = subnet_rate
+        self.subnet_burst = burst * 10 if subnet_burst is None else subnet_burst
+        self.ipv4_prefix = ipv4_prefix
+        self.ipv6_prefix = ipv6_prefix
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._sources: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._subnets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._next_sweep = clock() + sweep_interval
+        self.allowed = 0
+        self.rejected_source = 0
+        self.rejected_subnet = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'allowed': self.allowed,
+            'rejected_source': self.rejected_source,
+            'rejected_subnet': self.rejected_subnet,
+            'source_buckets': len(self._sources),
+            'subnet_buckets': len(self._subnets),
+        }
+
+    def subnet(self, host: str) -> str:
+        if ':' in host:
+            address = ipaddress.IPv6Address(host.partition('%')[0])
+            if address.ipv4_mapped is None:
+                return str(ipaddress.IPv6Network((address, self.ipv6_prefix), strict=False))
+            # IPv4 peer of a dual-stack socket, ::ffff:a.b.c.d
+            host = str(address.ipv4_mapped)
+        if self.ipv4_prefix == 24:
+            return host.rpartition('.')[0]
+        return str(ipaddress.IPv4Network((host, self.ipv4_prefix), strict=False))
+
+    def allow(self, address: tuple) -> bool:
+        """Take a token for a ClientHello from address, False if its source or subnet is over the limit"""
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        host = address[0]
+        source_tokens = self._refill(self._sources.get(host), self.rate, self.burst, now)
+        if source_tokens < 1:
+            self._store(self._sources, host, source_tokens, now)
+            self.rejected_source += 1
+            return False
+        if self.subnet_rate is not None:
+            subnet = self.subnet(host)
+            subnet_tokens = self._refill(self._subnets.get(subnet), self.subnet_rate, self.subnet_burst, now)
+            if subnet_tokens < 1:
+                self._store(self._subnets, subnet, subnet_tokens, now)
+                self.rejected_subnet += 1
+                return False
+            self._store(self._subnets, subnet, subnet_tokens - 1, now)
+        self._store(self._sources, host, source_tokens - 1, now)
+        self.allowed += 1
+        return True
+
+    @staticmethod
+    def _refill(bucket: Optional[Tuple[float, float]], rate: float, burst: int, now: float) -> float:
+        if bucket is None:
+            return burst
+        tokens, timestamp = bucket
+        return min(burst, tokens + (now - timestamp) * rate)
+
+    def _store(self, buckets: OrderedDict, key: str, tokens: float, now: float):
+        if key in buckets:
+            buckets.move_to_end(key)
+        elif len(buckets) >= self.max_entries:
+            buckets.popitem(last=False)
+        buckets[key] = (tokens, now)
+
+    def sweep(self, now: Optional[float] = None):
+        """Drop buckets refilled to burst"""
+        now = self.clock() if now is None else now
+        self._next_sweep = now + self.sweep_interval
+        for buckets, rate, burst in ((self._sources, self.rate, self.burst),
+                                     (self._subnets, self.subnet_rate, self.subnet_burst)):
+            if rate is None:
+                continue
+            full = [key for key, (tokens, timestamp) in buckets.items() if tokens + (now - timestamp) * rate >= burst]
+            for key in full:
+                del buckets[key]
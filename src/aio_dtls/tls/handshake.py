@@ -1,15 +1,15 @@
+import importlib
 import logging
 
-from .handshake_ecdh_anon import EcdhAnon
-from .handshake_ecdhe_ecdsa import EcdheEcdsa
 from .helper import Helper
 from ..connection_manager import CipherSuites as CipherSuitesHandler
 from ..connection_manager.connection import Connection
 from ..connection_manager.connection_manager import ConnectionManager
 from ..const import tls as const_tls
+from ..const.handshake import ConnectionState
 from ..const.cipher_suites import CipherSuite, CipherSuites
 from ..constructs import tls
-from ..exceptions import BadMAC, UnsupportedCipher, UnsupportedSslVersion
+from ..exceptions import BadMAC, LimitExceeded, UnsupportedCipher, UnsupportedSslVersion
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +17,80 @@ logger = logging.getLogger(__name__)
 class Handshake:
     tls = tls
     helper = Helper
+    # layout of the raw ClientHello, see check_client_hello_limits
+    handshake_header_size = 4
+    client_hello_cookie = False
+    # key exchange -> handler class or its 'module.Class' path, imported on first use
     handlers = {
-        'ECDH_ANON': EcdhAnon,
-        'ECDHE_ECDSA': EcdheEcdsa,
+        'ECDH_ANON': f'{__package__}.handshake_ecdh_anon.EcdhAnon',
+        'ECDHE_ECDSA': f'{__package__}.handshake_ecdhe_ecdsa.EcdheEcdsa',
     }
+    # allowed handshake messages:
+    #   entity -> connection state -> handshake type -> (handler name, next connection state)
+    # after HANDSHAKE_OVER messages are encrypted, they are keyed by None instead of the handshake type
+    transitions = {
+        None: {
+            None: {
+                const_tls.HandshakeType.CLIENT_HELLO: ('received_client_hello', ConnectionState.CLIENT_HELLO),
+            },
+        },
+        const_tls.ConnectionEnd.server: {
+            ConnectionState.CLIENT_HELLO: {
+                const_tls.HandshakeType.CLIENT_HELLO: ('received_client_hello', ConnectionState.CLIENT_HELLO),
+                const_tls.HandshakeType.CLIENT_KEY_EXCHANGE: (
+                    'received_client_key_exchange', ConnectionState.CLIENT_KEY_EXCHANGE),
+            },
+            ConnectionState.HANDSHAKE_OVER: {
+                None: ('received_client_finished', None),
+            },
+        },
+        const_tls.ConnectionEnd.client: {
+            ConnectionState.HELLO_REQUEST: {
+                const_tls.HandshakeType.SERVER_HELLO: ('received_server_hello', ConnectionState.SERVER_HELLO),
+            },
+            ConnectionState.SERVER_HELLO: {
+                const_tls.HandshakeType.SERVER_KEY_EXCHANGE: (
+                    'received_server_key_exchange', ConnectionState.SERVER_KEY_EXCHANGE),
+            },
+            ConnectionState.SERVER_KEY_EXCHANGE: {
+                const_tls.HandshakeType.SERVER_HELLO_DONE: (
+                    'received_server_hello_done', ConnectionState.SERVER_HELLO_DONE),
+            },
+            ConnectionState.HANDSHAKE_OVER: {
+                None: ('received_server_finished', None),
+            },
+        },
+    }
+
+    @classmethod
+    def get_dispatch_table(cls):
+        """transitions with handler names resolved and handshake types replaced by their wire values"""
+        table = cls.__dict__.get('_dispatch_table')
+        if table is None:
+            table = {
+                entity: {
+                    state: {
+                        (None if handshake_type is None else handshake_type.value): (getattr(cls, name), next_state)
+                        for handshake_type, (name, next_state) in messages.items()
+                    }
+                    for state, messages in states.items()
+                }
+                for entity, states in cls.transitions.items()
+            }
+            cls._dispatch_table = table
+        return table
 
     @classmethod
     def get_handshake_handler(cls, cipher: CipherSuite):
         try:
             _name = f'{cipher.key_exchange}'.upper()
-            return cls.handlers[_name]
+            handler = cls.handlers[_name]
         except KeyError:
             raise Exception(f'{cipher.name} not supported')
+        if isinstance(handler, str):
+            module, _, name = handler.rpartition('.')
+            handler = getattr(importlib.import_module(module), name)
+        return handler
 
     @classmethod
     def build_client_hello_fragment_data(cls, connection_manager: ConnectionManager, connection: Connection):
@@ -36,7 +98,7 @@ class Handshake:
         ciphers = connection_manager.ciphers.available_values
         if connection.user_props:
             if 'ciphers' in connection.user_props:
-                ciphers = CipherSuitesHandler(connection.user_props['ciphers']).available_values
+                ciphers = CipherSuitesHandler.cached(connection.user_props['ciphers']).available_values
 
         return {
             "cipher_suites": ciphers,
@@ -95,10 +157,37 @@ class Handshake:
         cls.received_client_hello_prepare(connection_manager, connection, record)
         return cls.received_client_hello_init_session(connection_manager, connection, record)
 
+    @classmethod
+    def check_client_hello_limits(cls, connection_manager: ConnectionManager, fragment: bytes):
+        """Walk the extensions of the raw ClientHello, raise LimitExceeded before the parser builds them"""
+        # client_version(2) random(32) session_id<1> [cookie<1>] cipher_suites<2> compression_methods<1>
+        offset = cls.handshake_header_size + 34
+        try:
+            offset += 1 + fragment[offset]
+            if cls.client_hello_cookie:
+                offset += 1 + fragment[offset]
+            offset += 2 + int.from_bytes(fragment[offset:offset + 2], 'big')
+            offset += 1 + fragment[offset]
+        except IndexError:
+            return  # malformed, left to the parser
+        end = min(len(fragment), offset + 2 + int.from_bytes(fragment[offset:offset + 2], 'big'))
+        offset += 2
+        count = 0
+        while offset + 4 <= end:
+            count += 1
+            if count > connection_manager.max_extensions:
+                raise LimitExceeded('extensions', f'more than {connection_manager.max_extensions}')
+            length = int.from_bytes(fragment[offset + 2:offset + 4], 'big')
+            if length > connection_manager.max_extension_length:
+                raise LimitExceeded('extension_length', f'{length} bytes')
+            offset += 4 + length
+
     @classmethod
     def received_client_hello_prepare(cls, connection_manager: ConnectionManager, connection: Connection, record):
+        cls.check_client_hello_limits(connection_manager, record.fragment)
         connection.update_handshake_hash(record.fragment, clear=True, name='client hello')
-        record.fragment = cls.tls.Handshake.parse(record.fragment)
+        with connection_manager.timed(connection, 'client_hello_parse'):
+            record.fragment = cls.tls.Handshake.parse(record.fragment)
 
     pass
 
@@ -106,7 +195,7 @@ class Handshake:
     def received_client_hello_init_session(cls, connection_manager: ConnectionManager, connection: Connection, record):
         client_hello_data = record.fragment.fragment
         if connection.id not in connection_manager.connections:
-            connection_manager.connections[connection.id] = connection
+            connection_manager.add_half_open(connection)
 
         connection_manager.new_server_connection(connection, record)
 
@@ -163,15 +252,18 @@ class Handshake:
         handler = cls.get_handshake_handler(connection.cipher)
         answer = handler.received_server_hello_done(connection_manager, connection, record)
 
-        connection.security_params.master_secret = cls.helper.generate_master_secret(connection)
+        with connection_manager.timed(connection, 'master_secret'):
+            connection.security_params.master_secret = cls.helper.generate_master_secret(connection)
 
-        cls.helper.calc_pending_states(connection)
+        with connection_manager.timed(connection, 'pending_states'):
+            cls.helper.calc_pending_states(connection)
         fragment_client_finished = cls.build_handshake_fragment_finished(connection)
         connection.update_handshake_hash(fragment_client_finished, name='client finished')
         fragment_client_finished = cls.helper.encrypt_ciphertext_fragment(
             connection, const_tls.ContentType.HANDSHAKE, fragment_client_finished)
 
-        logger.debug(f'fragment_client_finished {fragment_client_finished.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'fragment_client_finished {fragment_client_finished.hex(" ")}')
 
         logger.debug('build client finished')
         answer.append(cls.helper.build_handshake_answer(connection, fragment_client_finished))
@@ -187,24 +279,32 @@ class Handshake:
 
     @classmethod
     def received_client_finished(cls, connection_manager: ConnectionManager, connection: Connection, record):
-        cls.helper.calc_pending_states(connection)
-        logger.debug(f'receive encrypted client finished {record.fragment.hex(" ")}')
-        try:
-            block_cipher = cls.helper.decrypt_ciphertext_fragment(connection, record)
-        except BadMAC:
+        with connection_manager.timed(connection, 'pending_states'):
+            cls.helper.calc_pending_states(connection)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'receive encrypted client finished {record.fragment.hex(" ")}')
+        with connection_manager.timed(connection, 'finished_verify'):
+            try:
+                block_cipher = cls.helper.decrypt_ciphertext_fragment(connection, record)
+            except BadMAC:
+                block_cipher = None
+            else:
+                handshake_data = cls.tls.Handshake.parse(block_cipher.block_ciphered.content)
+                incoming_verify_data = handshake_data.fragment.verify_data
+                verify_data = cls.helper.generate_finished_verify_data(connection, b'client finished')
+        if block_cipher is None:
+            connection_manager.metrics.inc('bad_mac')
             answer = [cls.helper.build_alert(connection, const_tls.AlertLevel.FATAL,
                                              const_tls.AlertDescription.BAD_RECORD_MAC)]
             connection_manager.close_connection(connection)
             return answer
-        logger.debug(f'receive client finished {block_cipher.block_ciphered.content.hex(" ")}')
-        handshake_data = cls.tls.Handshake.parse(block_cipher.block_ciphered.content)
-        incoming_verify_data = handshake_data.fragment.verify_data
-
-        verify_data = cls.helper.generate_finished_verify_data(connection, b'client finished')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'receive client finished {block_cipher.block_ciphered.content.hex(" ")}')
 
         if incoming_verify_data != verify_data:
-            logger.debug(f'verify data {verify_data.hex(" ")}')
-            logger.debug(f'incoming verify data {incoming_verify_data.hex(" ")}')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'verify data {verify_data.hex(" ")}')
+                logger.debug(f'incoming verify data {incoming_verify_data.hex(" ")}')
             answer = [
                 cls.helper.build_alert(connection, const_tls.AlertLevel.ALERT_MESSAGE,
                                        const_tls.AlertDescription.ENCRYPTED_ALERT)]
@@ -221,6 +321,7 @@ class Handshake:
             connection, const_tls.ContentType.HANDSHAKE, fragment_server_finished)
 
         answer.append(cls.helper.build_handshake_answer(connection, fragment_server_finished))
+        connection_manager.handshake_completed(connection)
 
         return answer
 
@@ -232,32 +333,41 @@ class Handshake:
 
         verify_data = cls.helper.generate_finished_verify_data(connection, label)
 
-        logger.debug(f'verify data: {verify_data.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'verify data: {verify_data.hex(" ")}')
 
         fragment = cls.helper.build_handshake_fragment(connection, const_tls.HandshakeType.FINISHED,
                                                        tls.Finished.build({'verify_data': verify_data}))
 
-        logger.debug(f'finished: {fragment.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'finished: {fragment.hex(" ")}')
         return fragment
 
     @classmethod
     def received_server_finished(cls, connection_manager: ConnectionManager, connection: Connection, record):
-        block_cipher = cls.helper.decrypt_ciphertext_fragment(connection, record)
-        handshake_data = cls.tls.Handshake.parse(block_cipher.block_ciphered.content)
-        incoming_verify_data = handshake_data.fragment.verify_data
-        logger.debug(f'handshake msg server finished {connection.handshake_params.full_handshake_messages.hex(" ")}')
-        verify_data = cls.helper.generate_finished_verify_data(connection, b'server finished')
+        with connection_manager.timed(connection, 'finished_verify'):
+            block_cipher = cls.helper.decrypt_ciphertext_fragment(connection, record)
+            handshake_data = cls.tls.Handshake.parse(block_cipher.block_ciphered.content)
+            incoming_verify_data = handshake_data.fragment.verify_data
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f'handshake msg server finished {connection.handshake_params.full_handshake_messages.hex(" ")}')
+            verify_data = cls.helper.generate_finished_verify_data(connection, b'server finished')
 
-        if incoming_verify_data != verify_data:
-            raise Exception('wrong verify data')  # todo return Alert
+            if incoming_verify_data != verify_data:
+                raise Exception('wrong verify data')  # todo return Alert
 
-        mac = cls.helper.build_mac(connection, record, connection.server_mac_func,
-                                   const_tls.ContentType.HANDSHAKE.value, block_cipher.block_ciphered.content)
+            mac = cls.helper.build_mac(connection, record, connection.server_mac_func,
+                                       const_tls.ContentType.HANDSHAKE.value, block_cipher.block_ciphered.content)
 
         if block_cipher.block_ciphered.MAC != mac:
+            connection_manager.metrics.inc('bad_mac')
             answer = [cls.helper.build_alert(connection, const_tls.AlertLevel.FATAL,
                                              const_tls.AlertDescription.BAD_RECORD_MAC)]
             connection_manager.close_connection(connection)
             return answer
 
-        return cls.helper.build_application_record(connection, connection.flight_buffer)
+        connection_manager.handshake_completed(connection)
+        connection.handshake_done()
+        flight_buffer, connection.flight_buffer = connection.flight_buffer, []
+        return cls.helper.build_application_record(connection, flight_buffer)
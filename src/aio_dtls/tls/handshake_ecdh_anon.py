@@ -10,23 +10,40 @@ from ..connection_manager.connection_manager import ConnectionManager
 from ..const.tls import NamedCurve, ExtensionType, HandshakeType, CompressionMethod, ECCurveType
 from ..constructs import tls
 from ..constructs import tls_ecc
+from ..exceptions import UnsupportedCipher
 
 logger = logging.getLogger(__name__)
 
 
 class EcdhAnon:
     key_exchange_algorithm = 'ec_diffie_hellman'
+    server_key_exchange_construct = tls_ecc.ServerKeyExchangeECDH
     tls_construct = tls
     helper = Helper
 
     @classmethod
     def build_handshake_fragment_server_hello(cls, connection_manager: ConnectionManager, connection: Connection):
         connection.security_params.server_random = connection_manager.generate_tls_random()
+        session_id = connection.uid
+        key = ('server_hello', cls, connection.ssl_version.value, hash(connection.cipher), len(session_id),
+               connection.handshake_params.extended_master_secret)
+        template = connection_manager.handshake_templates.get(key)
+        if template is None:
+            template = tls.ServerHello.build(cls.server_hello_data(connection_manager, connection))
+            connection_manager.handshake_templates[key] = template
+        # server_version(2) random(32) session_id length(1) session_id
+        fragment = bytearray(template)
+        fragment[2:34] = connection.security_params.server_random
+        fragment[35:35 + len(session_id)] = session_id
+        return bytes(fragment)
+
+    @classmethod
+    def server_hello_data(cls, connection_manager: ConnectionManager, connection: Connection):
+        """ServerHello template, random and session id are zeroed and patched per connection"""
         data = {
             "server_version": connection.ssl_version.value,
-            "random": connection.security_params.server_random,
-            "cookie": connection.cookie,  # for dtls only
-            "session_id": connection.uid,
+            "random": bytes(32),
+            "session_id": bytes(len(connection.uid)),
             "cipher_suite": hash(connection.cipher),
             "compression_method": CompressionMethod.NULL.value,
             "extension": [
@@ -47,15 +64,14 @@ class EcdhAnon:
                 "type": ExtensionType.EXTENDED_MASTER_SECRET.value,
                 "data": b''
             })
-
-        handshake_fragment_server_hello = tls.ServerHello.build(data)
-        return handshake_fragment_server_hello
+        return data
 
     @classmethod
     def generate_server_private_key(cls, connection_manager: ConnectionManager, connection: Connection):
         connection_ec = getattr(ec, connection.ec.name.upper())()
 
-        connection.server_private_key = connection_manager.get_ec_private_key(connection_ec)
+        with connection_manager.timed(connection, 'keygen'):
+            connection.server_private_key = connection_manager.get_ec_private_key(connection_ec)
 
         server_public_key = connection.server_private_key.public_key()
 
@@ -63,7 +79,8 @@ class EcdhAnon:
             encoding=serialization.Encoding.X962,
             format=serialization.PublicFormat.UncompressedPoint
         )
-        logger.debug(f'server public key {server_public_key_raw.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'server public key {server_public_key_raw.hex(" ")}')
         return server_public_key_raw
 
     @classmethod
@@ -74,7 +91,8 @@ class EcdhAnon:
             encoding=serialization.Encoding.X962,
             format=serialization.PublicFormat.UncompressedPoint
         )
-        logger.debug(f'client public key {client_public_key_raw.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'client public key {client_public_key_raw.hex(" ")}')
         return client_public_key_raw
 
     @classmethod
@@ -82,17 +100,31 @@ class EcdhAnon:
                                                      connection: Connection,
                                                      record):
         server_public_key_raw = cls.generate_server_private_key(connection_manager, connection)
-        handshake_fragment_server_key_exchange = tls_ecc.ServerKeyExchangeECDH.build({
+        with connection_manager.timed(connection, 'server_key_exchange'):
+            key = ('server_key_exchange', cls, connection.ec.value, len(server_public_key_raw),
+                   connection_manager.identity_hint)
+            template = connection_manager.handshake_templates.get(key)
+            if template is None:
+                template = cls.server_key_exchange_construct.build(
+                    cls.server_key_exchange_data(connection_manager, connection, bytes(len(server_public_key_raw))))
+                connection_manager.handshake_templates[key] = template
+            # the public point closes the message
+            fragment = bytearray(template)
+            fragment[-len(server_public_key_raw):] = server_public_key_raw
+        return bytes(fragment)
+
+    @classmethod
+    def server_key_exchange_data(cls, connection_manager: ConnectionManager, connection: Connection, point: bytes):
+        return {
             "param": {
                 "curve_type": ECCurveType.named_curve.value,
                 "curve_params": {
                     "curve_type": ECCurveType.named_curve.value,
                     "namedcurve": connection.ec.value  # NamedCurve.secp256r1.value
                 },
-                "public": {"point": server_public_key_raw}
+                "public": {"point": point}
             },
-        })
-        return handshake_fragment_server_key_exchange
+        }
 
     @classmethod
     def build_handshake_fragment_client_key_exchange(cls, connection_manager: ConnectionManager,
@@ -119,12 +151,14 @@ class EcdhAnon:
         connection_ec = getattr(ec, connection.ec.name.upper())()
         connection.server_public_key = EllipticCurvePublicKey.from_encoded_point(connection_ec, server_public_key_raw)
 
-        connection.client_private_key = connection_manager.get_ec_private_key(connection_ec)
-        key = connection.client_private_key.exchange(ec.ECDH(),
-                                                     connection.server_public_key)
-        logger.debug(f'ec {connection.ec.name}')
-        logger.debug(f'server public key {server_public_key_raw.hex(" ")}')
-        logger.debug(f'shared key {key.hex(" ")}')
+        with connection_manager.timed(connection, 'keygen'):
+            connection.client_private_key = connection_manager.get_ec_private_key(connection_ec)
+        with connection_manager.timed(connection, 'ecdh'):
+            key = connection.client_private_key.exchange(ec.ECDH(), connection.server_public_key)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'ec {connection.ec.name}')
+            logger.debug(f'server public key {server_public_key_raw.hex(" ")}')
+            logger.debug(f'shared key {key.hex(" ")}')
         return key
 
     @classmethod
@@ -137,9 +171,10 @@ class EcdhAnon:
 
         key = connection.server_private_key.exchange(ec.ECDH(),
                                                      connection.client_public_key)
-        logger.debug(f'ec {connection.ec.name}')
-        logger.debug(f'client public key {client_public_key_raw.hex(" ")}')
-        logger.debug(f'shared key {key.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'ec {connection.ec.name}')
+            logger.debug(f'client public key {client_public_key_raw.hex(" ")}')
+            logger.debug(f'shared key {key.hex(" ")}')
         return key
 
     # @classmethod
@@ -168,8 +203,10 @@ class EcdhAnon:
         if ExtensionType.EC_POINT_FORMATS.name in extensions \
                 or ExtensionType.ELLIPTIC_CURVES.name in extensions:  # rfc-4492
             ext_ec_data = extensions[ExtensionType.ELLIPTIC_CURVES.name][0].data
-            # todo выбирать ec среди поддерживаемых
-            connection.ec = NamedCurve(int(ext_ec_data.elliptic_curve_list[0]))
+            connection.ec = connection_manager.elliptic_curves.get_best(ext_ec_data.elliptic_curve_list)
+            if connection.ec is None:
+                # no common curve, Protocol2 answers with a handshake_failure alert
+                raise UnsupportedCipher(ext_ec_data.elliptic_curve_list)
             answer = []
             fragment = cls.build_handshake_fragment_server_hello(connection_manager, connection)
             answer.append(cls.helper.build_handshake_record(connection, HandshakeType.SERVER_HELLO, fragment))
@@ -220,5 +257,7 @@ class EcdhAnon:
 
     @classmethod
     def received_client_key_exchange(cls, connection_manager: ConnectionManager, connection: Connection, record):
-        connection.premaster_secret = cls.generate_server_shared_key(connection, record)
-        connection.security_params.master_secret = cls.helper.generate_master_secret(connection)
+        with connection_manager.timed(connection, 'ecdh'):
+            connection.premaster_secret = cls.generate_server_shared_key(connection, record)
+        with connection_manager.timed(connection, 'master_secret'):
+            connection.security_params.master_secret = cls.helper.generate_master_secret(connection)
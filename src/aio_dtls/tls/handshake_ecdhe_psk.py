@@ -3,7 +3,6 @@ import logging
 from .helper import Helper
 from ..connection_manager.connection import Connection
 from ..connection_manager.connection_manager import ConnectionManager
-from ..const.tls import ECCurveType
 from ..constructs import tls
 from ..constructs import tls_ecc
 from ..tls.handshake_ecdh_anon import EcdhAnon as TlsEcdhAnon
@@ -15,6 +14,7 @@ logger = logging.getLogger(__name__)
 
 class EcdhePsk(TlsEcdhAnon):
     key_exchange_algorithm = 'ec_diffie_hellman_psk'
+    server_key_exchange_construct = tls_ecc.ServerKeyExchangeECDHPSK
     tls_construct = tls
     helper = Helper
 
@@ -28,23 +28,10 @@ class EcdhePsk(TlsEcdhAnon):
         pass
 
     @classmethod
-    def build_handshake_fragment_server_key_exchange(cls, connection_manager: ConnectionManager,
-                                                     connection: Connection,
-                                                     record):
-        server_public_key_raw = cls.generate_server_private_key(connection_manager, connection)
-        handshake_fragment_server_key_exchange = tls_ecc.ServerKeyExchangeECDHPSK.build({
-            "param": {
-                "curve_type": ECCurveType.named_curve.value,
-                "curve_params": {
-                    "curve_type": ECCurveType.named_curve.value,
-                    "namedcurve": connection.ec.value  # NamedCurve.secp256r1.value
-                },
-                "public": {"point": server_public_key_raw}
-            },
-            "psk_identity_hint": connection_manager.identity_hint
-        })
-        print("identity_hint", connection_manager.identity_hint.hex(" "))
-        return handshake_fragment_server_key_exchange
+    def server_key_exchange_data(cls, connection_manager: ConnectionManager, connection: Connection, point: bytes):
+        data = super().server_key_exchange_data(connection_manager, connection, point)
+        data["psk_identity_hint"] = connection_manager.identity_hint
+        return data
 
     @classmethod
     def build_handshake_fragment_client_key_exchange(cls, connection_manager: ConnectionManager,
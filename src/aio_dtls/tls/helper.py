@@ -1,20 +1,25 @@
 import logging
 import secrets
-from typing import List
+from typing import List, Optional
 
 from cryptography.hazmat.primitives import hashes
 
 from .. import math
 from ..connection_manager.connection import Connection
+from ..const import handshake as const_handshake
 from ..const import tls as const_tls
 from ..constructs import tls
+from ..exceptions import BadMAC
 
 logger = logging.getLogger(__name__)
 
 
 class Helper:
+    # TLSPlaintext.length limit, rfc5246 6.2.1
+    max_fragment_length = 2 ** 14
+
     @classmethod
-    def build_plaintext(cls, connection: Connection, records_data: List[tls.AnswerRecord]):
+    def build_plaintext(cls, connection: Connection, records_data: List[tls.AnswerRecord], trace=None):
         records = []
         for record in records_data:
             records.append({
@@ -22,12 +27,17 @@ class Helper:
                 "version": connection.ssl_version.value,
                 "fragment": record.fragment
             })
+            if trace is not None:
+                trace.record(trace.SENT, connection.address, record.content_type, 0, 0, len(record.fragment))
         plaintext = tls.RawDatagram.build(records)
         return plaintext
 
     @classmethod
-    def encrypt_ciphertext_fragment(cls, connection: Connection, content_type: const_tls.ContentType, fragment: bytes):
-        logger.debug(f'encrypted fragment {fragment.hex(" ")}')
+    def encrypt_ciphertext_fragment(cls, connection: Connection, content_type: const_tls.ContentType, fragment: bytes,
+                                    sequence_number: Optional[int] = None):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f'encrypted fragment {fragment.hex(" ")}')
         is_client = connection.security_params.entity == const_tls.ConnectionEnd.client
 
         if is_client:
@@ -39,15 +49,17 @@ class Helper:
 
         data = bytearray(fragment)
         if mac_func:
-            mac = cls.build_mac(connection, None, mac_func, content_type.value, fragment)
-            logger.debug(f'mac {mac.hex(" ")}')
+            mac = cls.build_mac(connection, None, mac_func, content_type.value, fragment, sequence_number)
+            if debug:
+                logger.debug(f'mac {mac.hex(" ")}')
             data += mac
         if connection.cipher.is_block_cipher():
             if cipher_func:
                 data = connection.fixed_iv_block + data
                 data = cls.add_padding(connection, data)
 
-                logger.debug(f'encrypted message {data.hex(" ")}')
+                if debug:
+                    logger.debug(f'encrypted message {data.hex(" ")}')
 
                 encryptor = cipher_func.encryptor()
                 return encryptor.update(data) + encryptor.finalize()
@@ -64,11 +76,14 @@ class Helper:
             cipher_func = connection.client_cipher_func
             mac_func = connection.client_mac_func
 
-        logger.debug(f'ecrypted data {record.fragment.hex(" ")}')
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f'ecrypted data {record.fragment.hex(" ")}')
 
         decryptor = cipher_func.decryptor()
         data = decryptor.update(record.fragment) + decryptor.finalize()
-        logger.debug(f'decrypted data {data.hex(" ")}')
+        if debug:
+            logger.debug(f'decrypted data {data.hex(" ")}')
         data_length = len(data)
         record_iv_length = connection.security_params.record_iv_length
         mac_length = connection.security_params.mac_length
@@ -86,14 +101,16 @@ class Helper:
 
         if cipher_text.block_ciphered.MAC != mac:
             logger.error('bad mac')
-            logger.debug(f'mac {mac.hex(" ")}')
-            logger.debug(f'incoming mac {cipher_text.block_ciphered.MAC.hex(" ")}')
+            if debug:
+                logger.debug(f'mac {mac.hex(" ")}')
+                logger.debug(f'incoming mac {cipher_text.block_ciphered.MAC.hex(" ")}')
             raise BadMAC()
 
         return cipher_text
 
     @classmethod
-    def build_mac(cls, connection: Connection, record, mac_func, content_type: int, fragment: bytes):
+    def build_mac(cls, connection: Connection, record, mac_func, content_type: int, fragment: bytes,
+                  sequence_number: Optional[int] = None):
         version = connection.ssl_version.value if record is None else int(record.version)
         return math.build_mac(mac_func, int(0).to_bytes(8, 'big'), content_type, version, fragment)
 
@@ -126,8 +143,9 @@ class Helper:
     def generate_finished_verify_data(cls, connection: Connection, label: bytes):
         seed = cls.get_seed_by_handshake_messages(connection)
 
-        logger.debug(f'digestmod {connection.digestmod} label {label}')
-        logger.debug(f'verify data seed {seed.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'digestmod {connection.digestmod} label {label}')
+            logger.debug(f'verify data seed {seed.hex(" ")}')
         return math.prf(
             connection.digestmod, connection.security_params.master_secret, label, seed, 12)
 
@@ -136,21 +154,24 @@ class Helper:
         if connection.handshake_params.extended_master_secret:
             seed = cls.get_seed_by_handshake_messages(connection)
             label = b"extended master secret"  # rfc7627
-            logger.debug(
-                f'generate extended master secret {connection.handshake_params.full_handshake_messages.hex(" ")}')
         else:
             seed = connection.security_params.client_random + connection.security_params.server_random
             label = b"master secret"
-        logger.debug(f'premaster secret {connection.premaster_secret.hex(" ")}')
-        logger.debug(f'digestmod {connection.digestmod} label {label}')
-        logger.debug(f'seed {seed.hex(" ")}')
+        if logger.isEnabledFor(logging.DEBUG):
+            if connection.handshake_params.extended_master_secret:
+                logger.debug(
+                    f'generate extended master secret {connection.handshake_params.full_handshake_messages.hex(" ")}')
+            logger.debug(f'premaster secret {connection.premaster_secret.hex(" ")}')
+            logger.debug(f'digestmod {connection.digestmod} label {label}')
+            logger.debug(f'seed {seed.hex(" ")}')
 
         master_secret = math.prf(connection.digestmod, connection.premaster_secret, label, seed, 48)
-        logger.info(f'master secret {master_secret.hex(" ")}')
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'master secret {master_secret.hex(" ")}')
 
-        # logger.error(f'master secret {bytes(master_secret)}')
-        logger.info(f'client random {connection.security_params.client_random.hex(" ")}')
-        logger.info(f'server random {connection.security_params.server_random.hex(" ")}')
+            # logger.error(f'master secret {bytes(master_secret)}')
+            logger.info(f'client random {connection.security_params.client_random.hex(" ")}')
+            logger.info(f'server random {connection.security_params.server_random.hex(" ")}')
         connection.premaster_secret = b''
         return master_secret
 
@@ -209,9 +230,11 @@ class Helper:
         # Calculate Keying Material from Master Secret
         seed = connection.security_params.server_random + connection.security_params.client_random
         key_block = math.prf("sha256", connection.security_params.master_secret, b"key expansion", seed, output_length)
-        logger.debug(f'server random: {connection.security_params.server_random.hex(" ")}')
-        logger.debug(f'client random: {connection.security_params.client_random.hex(" ")}')
-        logger.debug(f'key block ({len(key_block)}): {key_block.hex(" ")}')
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f'server random: {connection.security_params.server_random.hex(" ")}')
+            logger.debug(f'client random: {connection.security_params.client_random.hex(" ")}')
+            logger.debug(f'key block ({len(key_block)}): {key_block.hex(" ")}')
         # key_block = bytearray(key_block)
         # Slice up Keying Material
         connection.client_write_MAC_key, i = _get_fixed_bytes(key_block, mac_length, 0)
@@ -223,14 +246,15 @@ class Helper:
 
         if digestmod:
             #     # Legacy cipher
-            logger.debug(f'client_write_MAC_key ({mac_length}) {connection.client_write_MAC_key.hex(" ")}')
-            logger.debug(f'server_write_MAC_key ({mac_length}) {connection.server_write_MAC_key.hex(" ")}')
-            logger.debug(
-                f'client_write_encryption_key ({key_length}) {connection.client_write_encryption_key.hex(" ")}')
-            logger.debug(
-                f'server_write_encryption_key ({key_length}) {connection.server_write_encryption_key.hex(" ")}')
-            logger.debug(f'client_write_iv ({iv_length}) {connection.client_write_iv.hex(" ")}')
-            logger.debug(f'server_write_iv ({iv_length}) {connection.server_write_iv.hex(" ")}')
+            if debug:
+                logger.debug(f'client_write_MAC_key ({mac_length}) {connection.client_write_MAC_key.hex(" ")}')
+                logger.debug(f'server_write_MAC_key ({mac_length}) {connection.server_write_MAC_key.hex(" ")}')
+                logger.debug(
+                    f'client_write_encryption_key ({key_length}) {connection.client_write_encryption_key.hex(" ")}')
+                logger.debug(
+                    f'server_write_encryption_key ({key_length}) {connection.server_write_encryption_key.hex(" ")}')
+                logger.debug(f'client_write_iv ({iv_length}) {connection.client_write_iv.hex(" ")}')
+                logger.debug(f'server_write_iv ({iv_length}) {connection.server_write_iv.hex(" ")}')
 
             connection.client_mac_func = math.create_hmac(connection.client_write_MAC_key, digestmod)
             connection.server_mac_func = math.create_hmac(connection.server_write_MAC_key, digestmod)
@@ -276,13 +300,17 @@ class Helper:
 
     @classmethod
     def build_alert(cls, connection: Connection, level: const_tls.AlertLevel, description: const_tls.AlertDescription):
+        fragment = tls.Alert.build({
+            "level": level.value,
+            "description": description.value
+
+        })
+        connection.alert = description.name
+        if connection.state.value == const_handshake.ConnectionState.HANDSHAKE_OVER:
+            fragment = cls.encrypt_ciphertext_fragment(connection, const_tls.ContentType.ALERT, fragment)
         return tls.AnswerRecord(
             content_type=const_tls.ContentType.ALERT.value,
-            fragment=tls.Alert.build({
-                "level": level.value,
-                "description": description.value
-
-            })
+            fragment=fragment
         )
 
     @classmethod
@@ -306,17 +334,22 @@ class Helper:
     @classmethod
     def build_application_record(cls, connection: Connection, fragments):
         records = []
-        logger.debug(f'prepare {len(fragments)} application data for send')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'prepare {len(fragments)} application data for send')
+        max_length = cls.max_fragment_length
         for fragment in fragments:
-            encrypted_data = cls.encrypt_ciphertext_fragment(
-                connection, const_tls.ContentType.APPLICATION_DATA, fragment)
-            records.append(tls.AnswerRecord(
-                content_type=const_tls.ContentType.APPLICATION_DATA.value,
-                fragment=encrypted_data
-            ))
+            # payloads longer than a record are sent as several full-size records
+            for offset in range(0, len(fragment) or 1, max_length):
+                encrypted_data = cls.encrypt_ciphertext_fragment(
+                    connection, const_tls.ContentType.APPLICATION_DATA, fragment[offset:offset + max_length])
+                records.append(tls.AnswerRecord(
+                    content_type=const_tls.ContentType.APPLICATION_DATA.value,
+                    fragment=encrypted_data
+                ))
         return records
 
     @classmethod
-    def send_records(cls, connection: Connection, answers, writer):
-        plaintext = cls.build_plaintext(connection, answers)
+    def send_records(cls, connection: Connection, answers, writer, trace=None):
+        plaintext = cls.build_plaintext(connection, answers, trace)
+        connection.bytes_sent += len(plaintext)
         writer(plaintext)
@@ -1,12 +1,16 @@
+import asyncio
 import logging
 from asyncio import Protocol
 from typing import Optional
 
 from .handshake import Handshake
 from .helper import Helper
+from .record_layer import RecordLayer
 from ..connection_manager.connection_manager import ConnectionManager
 from ..const import handshake as const_handshake
+from ..const import tls as const_tls
 from ..constructs import tls
+from ..exceptions import RecordOverflow
 from ..protocol import Protocol2
 
 logger = logging.getLogger(__name__)
@@ -27,13 +31,102 @@ class TLSProtocol(Protocol, Protocol2):
         Protocol2.__init__(self, server, connection_manager, endpoint, protocol_factory)
         self.sender_address: Optional[tuple] = address
         self.transport = None
+        self.record_layer = RecordLayer()
+        self._write_buffer = []
+        self._flush_handle = None
+        self._paused = False
+        self._drain_waiters = []
 
     def connection_made(self, transport):
         self.transport = transport
         self.sender_address = self.transport.get_extra_info('peername')
 
     def data_received(self, data):
-        self._data_received(data, self.transport.write)
+        try:
+            records = self.record_layer.feed(data)
+        except RecordOverflow as err:
+            logger.info(f'{err} from {self.sender_address}')
+            self.connection = self.get_connection(self.sender_address)
+            self.protocol_helper.send_records(
+                self.connection,
+                [self.build_alert(const_tls.AlertLevel.FATAL, const_tls.AlertDescription.RECORD_OVERFLOW)],
+                self.write, self.connection_manager.trace)
+            self.flush()
+            self.connection_manager.close_connection(self.connection)
+            self.record_layer.clear()
+            self.transport.close()
+            return
+        if records is None:
+            return
+        with records:
+            self._data_received(records, self.write)
+
+    def write(self, data: bytes):
+        """Queue data for the transport, writes made in one loop iteration go out in one writelines()"""
+        self._write_buffer.append(data)
+        if self._paused or self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._paused or not self._write_buffer:
+            return
+        buffer, self._write_buffer = self._write_buffer, []
+        metrics = self.connection_manager.metrics
+        if metrics.enabled:
+            metrics.inc('bytes_sent', sum(len(data) for data in buffer))
+        if len(buffer) == 1:
+            self.transport.write(buffer[0])
+        else:
+            self.transport.writelines(buffer)
+
+    def connection_lost(self, exc):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._write_buffer = []
+        self._wake_drain_waiters(exc or ConnectionResetError('connection lost'))
+        if self.connection is not None and \
+                self.connection_manager.connections.get(self.connection.id) is self.connection:
+            self.connection_manager.close_connection(self.connection)
+        if self.app_protocol is not None and hasattr(self.app_protocol, 'connection_lost'):
+            self.app_protocol.connection_lost(exc)
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        self.flush()
+        self._wake_drain_waiters()
+
+    async def drain(self):
+        """Wait until the transport takes more data, like StreamWriter.drain()"""
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionResetError('connection lost')
+        if not self._paused:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    def _wake_drain_waiters(self, exc: Optional[BaseException] = None):
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
 
     def check_message_number(self, record):
         pass
@@ -41,6 +134,18 @@ class TLSProtocol(Protocol, Protocol2):
     def app_process_received_data(self, data):
         self.app_protocol.data_received(data)
 
+    def app_process_error(self, exception):
+        if self.app_protocol is not None and hasattr(self.app_protocol, 'error_received'):
+            self.app_protocol.error_received(exception, self.sender_address)
+
+    def app_process_eof(self, exception):
+        if self.app_protocol is not None and hasattr(self.app_protocol, 'eof_received'):
+            self.app_protocol.eof_received()
+
+    def app_process_warning(self, exception):
+        # a warning leaves the stream usable, received_alert has already logged and counted it
+        pass
+
     def received_change_cipher_spec(self, record: tls.RawPlaintext):
         if self.connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
             self.connection.state.value = const_handshake.ConnectionState.HANDSHAKE_OVER
@@ -1,2 +1,55 @@
+import struct
+from typing import Optional
+
+from ..exceptions import RecordOverflow
+
+
 class RecordLayer:
-    pass
+    """
+    Frames a TCP byte stream into TLS records.
+
+    Incoming data is appended to one bytearray, feed() returns the complete records received so far as a
+    single memoryview over it. The view must be released before the next feed(). Consumed bytes are cut
+    off only once they make up half of the buffer, so a large transfer is not copied once per record.
+    """
+    # content type, protocol version, fragment length
+    header = struct.Struct('>BHH')
+    # TLSCiphertext fragment limit, rfc5246 6.2.3
+    max_fragment_length = 2 ** 14 + 2048
+
+    def __init__(self, max_fragment_length: Optional[int] = None):
+        if max_fragment_length is not None:
+            self.max_fragment_length = max_fragment_length
+        self._buffer = bytearray()
+        self._position = 0
+
+    def __len__(self):
+        """bytes of incomplete records waiting for more data"""
+        return len(self._buffer) - self._position
+
+    def feed(self, data: bytes) -> Optional[memoryview]:
+        buffer = self._buffer
+        position = self._position
+        if position and position * 2 >= len(buffer):
+            del buffer[:position]
+            position = 0
+        buffer += data
+
+        begin = end = position
+        size = len(buffer)
+        header_size = self.header.size
+        while size - end >= header_size:
+            length = self.header.unpack_from(buffer, end)[2]
+            if length > self.max_fragment_length:
+                raise RecordOverflow(f'record fragment {length} bytes')
+            if end + header_size + length > size:
+                break
+            end += header_size + length
+        self._position = end
+        if end == begin:
+            return None
+        return memoryview(buffer)[begin:end]
+
+    def clear(self):
+        self._buffer = bytearray()
+        self._position = 0
@@ -2,8 +2,13 @@ import asyncio
 import logging
 from typing import Optional
 
+from .helper import Helper
+from ..connection_manager.connection import Connection
 from ..connection_manager.connection_manager import ConnectionManager
+from ..const import handshake as const_handshake
+from ..const import tls as const_tls
 from ..tls.handshake import Handshake
+from ..metrics import Metrics
 from ..tls.protocol import TLSProtocol
 
 logger = logging.getLogger(__name__)
@@ -20,7 +25,8 @@ class TlsSocket:
                  ciphers: Optional[list] = None,
                  elliptic_curves: Optional[list] = None,
                  identity_hint: Optional[str] = None,
-                 psk: Optional[str] = None
+                 psk: Optional[str] = None,
+                 metrics: Optional[Metrics] = None
                  ):
         self.endpoint = endpoint
         self._server = None
@@ -28,53 +34,75 @@ class TlsSocket:
         self._writer = None
         self._sock = None
         self._address = None
+        self._protocol: Optional[TLSProtocol] = None
         self.connection_manager = ConnectionManager(
             identity_hint=identity_hint,
             elliptic_curves=elliptic_curves,
             psk=psk,
             ciphers=ciphers,
-            is_dtls=False
+            is_dtls=False,
+            metrics=metrics,
         ) if connection_manager is None else connection_manager
 
         pass
 
-    async def connect(self, address):
-        self._reader, self._writer = await asyncio.open_connection(address[0], address[1])
-        self._address = address
-        pass
-
-    async def send(self, data: bytes, **kwargs):
-        if not self._address or not self._writer:
-            raise Exception('dest not found')
+    async def connect(self, address, timeout: Optional[float] = None, *, limit: int = 2 ** 16, **kwargs):
+        """Open the TCP connection and finish the handshake, then use read/write/drain"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=limit, loop=loop)
+        transport, protocol = await loop.create_connection(
+            lambda: TLSProtocol(None, self.connection_manager, self.endpoint,
+                                lambda server, endpoint: StreamAppProtocol(reader)),
+            address[0], address[1])
+        reader.set_transport(transport)
+        self._reader = reader
+        self._protocol = protocol
+        self._writer = transport
+        # the protocol looks connections up by the peer name reported by the transport
+        self._address = protocol.sender_address
         connection = self.connection_manager.get_connection(self._address, **kwargs)
-        if not connection:
-            connection.flight_buffer.append(data)
-            await self.do_handshake(connection)
-            pass
-        pass
+        try:
+            await asyncio.wait_for(self.do_handshake(connection), timeout)
+        except (Exception, asyncio.CancelledError):
+            self.connection_manager.close_connection(connection)
+            transport.close()
+            raise
 
     async def do_handshake(self, connection):
         self.connection_manager.new_client_connection(connection)
+        self._protocol.connection = connection
+        connection.handshake_waiter = asyncio.get_running_loop().create_future()
+        self._protocol.write(Handshake.build_client_hello(self.connection_manager, connection))
+        await connection.handshake_waiter
+
+    def _get_connection(self):
+        connection = self.connection_manager.connections.get(Connection.get_id(self._address)) \
+            if self._address else None
+        if not connection or connection.state.value != const_handshake.ConnectionState.HANDSHAKE_OVER:
+            raise ConnectionError('not connected')
+        return connection
+
+    def write(self, data: bytes):
+        connection = self._get_connection()
+        records = Helper.build_application_record(connection, [data])
+        self.connection_manager.metrics.inc('records_sent', len(records))
+        Helper.send_records(connection, records, self._protocol.write, self.connection_manager.trace)
+
+    async def drain(self):
+        await self._protocol.drain()
+
+    async def send(self, data: bytes):
+        self.write(data)
+        await self.drain()
+
+    async def read(self, n: int = -1) -> bytes:
+        return await self._reader.read(n)
 
-        client_hello = Handshake.build_client_hello(self.connection_manager, connection)
-
-        self._writer.write(client_hello)
-        protocol = TLSProtocol(
-            None,
-            self.connection_manager,
-            self.endpoint,
-            None,
-            address=self._address
-        )
-        protocol.transport = self._writer
-        while True:
-            data = await self._reader.read(4096)
-            send_data = protocol.data_received(data)
-            # self._writer.write(send_data)
-            pass
+    async def readexactly(self, n: int) -> bytes:
+        return await self._reader.readexactly(n)
 
     def raw_send(self, data: bytes):
-        self._writer.write(data)
+        self._protocol.write(data)
 
     @property
     def address(self):
@@ -95,4 +123,38 @@ class TlsSocket:
         self._sock = self._server.sockets[0]
 
     def close(self):
-        self._sock.close()
+        if self._protocol is not None:
+            connection = self.connection_manager.connections.get(Connection.get_id(self._address))
+            if connection:
+                record = Helper.build_alert(
+                    connection, const_tls.AlertLevel.WARNING, const_tls.AlertDescription.CLOSE_NOTIFY)
+                Helper.send_records(connection, [record], self._protocol.write, self.connection_manager.trace)
+                self.connection_manager.close_connection(connection)
+            self._protocol.flush()
+            self._writer.close()
+            self._protocol = None
+        if self._server is not None:
+            self._server.close()
+
+
+class StreamAppProtocol:
+    """Feeds decrypted application data of a client connection to its StreamReader"""
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self.reader = reader
+
+    def data_received(self, data: bytes):
+        self.reader.feed_data(data)
+
+    def error_received(self, exc, address=None):
+        # only fatal alerts get here, see TLSProtocol.app_process_warning
+        self.reader.set_exception(exc)
+
+    def eof_received(self):
+        self.reader.feed_eof()
+
+    def connection_lost(self, exc):
+        if exc is None:
+            self.reader.feed_eof()
+        else:
+            self.reader.set_exception(exc)
@@ -0,0 +1,58 @@
+import struct
+import time
+from collections import namedtuple
+
+TraceEvent = namedtuple('TraceEvent', ('timestamp', 'direction', 'peer', 'content_type', 'epoch', 'sequence_number',
+                                       'length'))
+
+
+class TraceBuffer:
+    """
+    Fixed-size ring buffer of per-record events.
+
+    Events are packed into a preallocated bytearray, only the peer address is kept as an object reference,
+    so recording costs one struct.pack_into and does not grow memory. The buffer is decoded by dump().
+    """
+    RECEIVED = 0
+    SENT = 1
+    # monotonic_ns, direction, content type, epoch, sequence number, length
+    _event = struct.Struct('<QBBHQH')
+
+    def __init__(self, size: int = 4096):
+        if size <= 0:
+            raise ValueError('trace buffer size must be positive')
+        self.size = size
+        self._buffer = bytearray(self._event.size * size)
+        self._peers = [None] * size
+        self._position = 0
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    def record(self, direction: int, peer, content_type: int, epoch: int, sequence_number: int, length: int):
+        index = self._position
+        self._event.pack_into(self._buffer, index * self._event.size,
+                              time.monotonic_ns(), direction, content_type, epoch, sequence_number, length)
+        self._peers[index] = peer
+        self._position = 0 if index + 1 == self.size else index + 1
+        self._count += 1
+
+    def dump(self):
+        """Return recorded events, oldest first."""
+        if self._count < self.size:
+            indexes = range(self._count)
+        else:
+            indexes = [*range(self._position, self.size), *range(self._position)]
+        events = []
+        for index in indexes:
+            timestamp, direction, content_type, epoch, sequence_number, length = self._event.unpack_from(
+                self._buffer, index * self._event.size)
+            events.append(TraceEvent(timestamp, direction, self._peers[index], content_type, epoch,
+                                     sequence_number, length))
+        return events
+
+    def clear(self):
+        self._peers = [None] * self.size
+        self._position = 0
+        self._count = 0
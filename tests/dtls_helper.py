@@ -36,3 +36,17 @@ class DtlsHelper(unittest.TestCase):
         _answer2 = Datagram.parse(trust_answer)
         self.assertEqual(trust_answer, answer, f'{_request.type} {_request.fragment.handshake_type}')
         return answer
+
+    def pump(self):
+        """deliver datagrams between the demo endpoints until both are quiet"""
+        endpoints = ((self.client_endpoint, self.server_endpoint, self.client_address),
+                     (self.server_endpoint, self.client_endpoint, self.server_address))
+        moved = True
+        while moved:
+            moved = False
+            for source, destination, source_address in endpoints:
+                queue = source._sock._sock.sending_data
+                while queue:
+                    data, address = queue.pop(0)
+                    destination._sock.protocol.datagram_received(data, source_address)
+                    moved = True
@@ -9,11 +9,15 @@ class DemoProtocolClass:
     def __init__(self, server=None, endpoint=None):
         self.last_data = None
         self.last_client_address = None
+        self.last_error = None
 
     def datagram_received(self, data, client_address):
         self.last_data = data
         self.last_client_address = client_address
 
+    def error_received(self, exc, address=None):
+        self.last_error = exc
+
 
 class DemoSocket:
     def __init__(self):
@@ -22,6 +26,9 @@ class DemoSocket:
     def sendto(self, data, address):
         self.sending_data.append((data, address))
 
+    def close(self):
+        pass
+
 
 class DemoDtlsEndpoint:
     def __init__(self, *, address=None, **kwargs):
@@ -0,0 +1,39 @@
+import unittest
+
+from construct import Struct, Int8ub, Int16ub, this, Switch, Bytes, GreedyRange
+
+from aio_dtls.const import tls as const_tls
+from aio_dtls.constructs import dtls
+from aio_dtls.constructs.compiler import CompiledOnce, enum_cases
+from tests.data import iotivity_simple_server as iotivity_simple
+
+
+class TestCompiledOnce(unittest.TestCase):
+    def test_compiled_equals_interpreted(self):
+        record = Struct(
+            "type" / Int8ub,
+            "length" / Int16ub,
+            "fragment" / Bytes(this.length)
+        )
+        compiled = CompiledOnce(record)
+        data = b'\x16\x00\x03abc'
+        self.assertEqual(record.parse(data), compiled.parse(data))
+        self.assertEqual(data, compiled.build(compiled.parse(data)))
+        self.assertIsNot(record, compiled.compiled)
+        self.assertEqual(record.parse(data * 2), GreedyRange(compiled).parse(data * 2)[0])
+
+    def test_fallback_to_interpreted(self):
+        record = CompiledOnce(Struct("length" / Int8ub, "fragment" / Bytes(lambda ctx: ctx.length)))
+        self.assertEqual(b'ab', record.parse(b'\x02ab').fragment)
+        self.assertIs(record.subcon, record.compiled)
+
+    def test_enum_cases(self):
+        fragment = Switch(this.type, enum_cases({
+            const_tls.ContentType.ALERT: Int16ub,
+        }), default=Bytes(1))
+        self.assertEqual(fragment.build(1, type=const_tls.ContentType.ALERT.value),
+                         fragment.build(1, type=const_tls.ContentType.ALERT.name))
+
+    def test_datagram_round_trip(self):
+        for data in (iotivity_simple.client_hello_with_cookie, iotivity_simple.server_hello):
+            self.assertEqual(data, dtls.Datagram.build(dtls.Datagram.parse(data)))
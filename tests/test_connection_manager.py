@@ -0,0 +1,35 @@
+import unittest
+
+from aio_dtls import ConnectionManager, Connection
+from aio_dtls.dtls.protocol import DTLSProtocol
+from tests.dtls_test_obj import DemoProtocolClass
+
+
+class TestConnectionManager(unittest.TestCase):
+    def test_ipv6_address_key(self):
+        connection_manager = ConnectionManager()
+        connection = connection_manager.get_connection(('::1', 5684, 0, 0))
+        connection_manager.new_client_connection(connection)
+        self.assertEqual(('::1', 5684), connection.id)
+        self.assertIs(connection, connection_manager.get_connection(('::1', 5684)))
+        self.assertIs(connection, connection_manager.get_connection(('::1', 5684, 0, 0)))
+
+        connection_manager.close_connection(connection)
+        self.assertFalse(connection_manager.connections)
+
+    def test_protocol_last_address_cache(self):
+        connection_manager = ConnectionManager()
+        protocol = DTLSProtocol(None, connection_manager, None, DemoProtocolClass)
+        address = ('192.168.1.18', 20102)
+
+        self.assertIsNot(protocol.get_connection(address), protocol.get_connection(address), 'unknown peer')
+
+        connection = connection_manager.get_connection(address)
+        connection_manager.new_client_connection(connection)
+        self.assertIs(connection, protocol.get_connection(address))
+        self.assertIs(connection, protocol._last_connection)
+        self.assertIs(connection, protocol.get_connection(address))
+
+        connection_manager.close_connection(connection)
+        self.assertIsInstance(protocol.get_connection(address), Connection)
+        self.assertIsNot(connection, protocol.get_connection(address))
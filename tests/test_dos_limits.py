@@ -0,0 +1,102 @@
+import unittest
+
+from aio_dtls.metrics import CollectingMetrics
+from tests.data import iotivity_simple_server as iotivity_simple
+from tests.dtls_helper import DtlsHelper
+from tests.dtls_test_obj import DemoDtlsEndpoint, DemoProtocolClass
+
+CIPHER = 'TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'
+
+
+class TestDosLimits(DtlsHelper):
+    def setUp(self) -> None:
+        super().setUp()
+        self.metrics = CollectingMetrics()
+        self.server_connection_manager.metrics = self.metrics
+        self.sending = self.server_endpoint._sock._sock.sending_data
+
+    def receive(self, data, address=None):
+        self.server_endpoint._sock.protocol.datagram_received(data, address or self.client_address)
+
+    def limits(self):
+        return {key: value for key, value in self.metrics.snapshot()['counters'].items()
+                if key.startswith('limits_exceeded')}
+
+    def test_hello_verify_request_not_larger_than_request(self):
+        self.receive(iotivity_simple.client_hello_empty_cookie)
+        self.assertLessEqual(len(self.sending.pop()[0]), len(iotivity_simple.client_hello_empty_cookie))
+
+        self.server_connection_manager.max_unverified_amplification = 0.5
+        self.receive(iotivity_simple.client_hello_empty_cookie)
+        self.assertEqual([], self.sending)
+        self.assertEqual({'limits_exceeded{limit="amplification"}': 1}, self.limits())
+
+    def test_records_per_datagram(self):
+        self.server_connection_manager.max_records_per_datagram = 1
+        self.receive(iotivity_simple.client_hello_empty_cookie * 2)
+        self.assertEqual([], self.sending)
+        self.assertEqual({'limits_exceeded{limit="records_per_datagram"}': 1}, self.limits())
+
+    def test_extensions(self):
+        self.server_connection_manager.max_extensions = 1
+        self.receive(iotivity_simple.client_hello_empty_cookie)
+        self.server_connection_manager.max_extensions = 32
+        self.server_connection_manager.max_extension_length = 1
+        self.receive(iotivity_simple.client_hello_empty_cookie)
+        self.assertEqual([], self.sending)
+        self.assertEqual({'limits_exceeded{limit="extensions"}': 1, 'limits_exceeded{limit="extension_length"}': 1},
+                         self.limits())
+
+    def half_open(self, address):
+        """handshake of a new client stopped after the ClientHello with cookie"""
+        client = DemoDtlsEndpoint(address=address, ciphers=[CIPHER])
+        client.listen(DemoProtocolClass)
+        client.sendto(b'hello', self.server_address)
+        self.receive(client._sock._sock.sending_data.pop(0)[0], address)
+        client._sock.protocol.datagram_received(self.sending.pop()[0], self.server_address)
+        self.receive(client._sock._sock.sending_data.pop(0)[0], address)
+
+    def test_half_open(self):
+        self.server_connection_manager.max_half_open = 1
+        for address in (self.client_address, ('192.168.1.19', 20102)):
+            self.half_open(address)
+
+        self.assertEqual([self.client_address], list(self.server_connection_manager.connections))
+        self.assertEqual(1, len(self.sending), 'ServerHello flight to the first client only')
+        self.assertEqual({'limits_exceeded{limit="half_open"}': 1}, self.limits())
+
+    def test_stale_half_open_expires(self):
+        other_address = ('192.168.1.19', 20102)
+        self.server_connection_manager.max_half_open = 1
+        self.half_open(self.client_address)
+        stale = self.server_connection_manager.connections[self.client_address]
+        stale.handshake_started_ns -= int(self.server_connection_manager.half_open_timeout * 1e9)
+        self.sending.clear()
+
+        self.half_open(other_address)
+        self.assertEqual([other_address], list(self.server_connection_manager.connections))
+        self.assertEqual(1, len(self.sending), 'ServerHello flight to the second client')
+        self.assertEqual({}, self.limits())
+        self.assertEqual(1, self.metrics.snapshot()['counters']['connections_evicted{reason="half_open_timeout"}'])
+
+    def test_client_connections_not_half_open(self):
+        self.server_connection_manager.max_half_open = 1
+        self.server_connection_manager.new_client_connection(
+            self.server_connection_manager.get_connection(('192.168.1.20', 20103)))
+        self.half_open(self.client_address)
+        self.assertIn(self.client_address, self.server_connection_manager.connections)
+        self.assertEqual({}, self.limits())
+
+    def test_established_not_half_open(self):
+        self.server_connection_manager.max_half_open = 1
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+        self.assertEqual((1, 0), (self.server_connection_manager.count_connections(True),
+                                  self.server_connection_manager.count_connections(False)))
+        self.server_connection_manager.close_connection(
+            self.server_connection_manager.get_connection(self.client_address))
+        self.assertEqual(0, self.server_connection_manager.established_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from aio_dtls.metrics import CollectingMetrics
+from tests.dtls_helper import DtlsHelper
+
+
+class DemoTransport:
+    """datagram transport writing into the demo socket of the endpoint"""
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def sendto(self, data, address):
+        self.sock.sendto(data, address)
+
+
+class TestDtlsBackpressure(DtlsHelper, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client_socket = self.client_endpoint._sock
+        self.client_socket._transport = DemoTransport(self.client_socket._sock)
+        task = asyncio.create_task(self.client_socket.connect(self.server_address, timeout=1))
+        await asyncio.sleep(0)
+        self.pump()
+        self.session = await task
+
+    async def test_queue_while_paused(self):
+        self.client_socket.pause_writing()
+        self.session.send(b'one')
+        self.session.send(b'two')
+        self.assertEqual(2, self.client_socket.send_queue_size)
+        self.assertEqual([], self.client_socket._sock.sending_data)
+
+        drain = asyncio.create_task(self.session.drain())
+        await asyncio.sleep(0)
+        self.assertFalse(drain.done())
+        self.client_socket.resume_writing()
+        await drain
+        self.assertEqual(0, self.client_socket.send_queue_size)
+        self.assertEqual(2, self.client_socket.datagrams_queued)
+        self.pump()
+        self.assertEqual(b'two', self.server_endpoint._sock.protocol.app_protocol.last_data)
+
+    async def test_drop_newest(self):
+        self.client_socket.max_send_queue = 1
+        self.client_socket.pause_writing()
+        self.session.send(b'one')
+        self.session.send(b'two')
+        self.assertEqual(1, self.client_socket.datagrams_dropped)
+        self.client_socket.resume_writing()
+        self.pump()
+        self.assertEqual(b'one', self.server_endpoint._sock.protocol.app_protocol.last_data)
+
+    async def test_drop_oldest(self):
+        self.client_socket.max_send_queue = 1
+        self.client_socket.send_overflow = 'drop_oldest'
+        self.client_socket.pause_writing()
+        self.session.send(b'one')
+        self.session.send(b'two')
+        self.assertEqual(1, self.client_socket.datagrams_dropped)
+        self.client_socket.resume_writing()
+        self.pump()
+        self.assertEqual(b'two', self.server_endpoint._sock.protocol.app_protocol.last_data)
+
+    async def test_metrics_count_handed_to_transport(self):
+        metrics = self.client_connection_manager.metrics = CollectingMetrics()
+        self.client_socket.max_send_queue = 1
+        self.client_socket.pause_writing()
+        self.session.send(b'one')
+        self.session.send(b'two')
+        counters = metrics.snapshot()['counters']
+        self.assertNotIn('datagrams_sent', counters)
+        self.assertEqual(1, counters['datagrams_dropped'])
+
+        self.client_socket.resume_writing()
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(1, counters['datagrams_sent'])
+        self.assertEqual(len(self.client_socket._sock.sending_data[0][0]), counters['bytes_sent'])
+
+    async def test_connection_lost(self):
+        self.client_socket.pause_writing()
+        self.session.send(b'one')
+        drain = asyncio.create_task(self.session.drain())
+        await asyncio.sleep(0)
+        self.client_socket.connection_lost(None)
+        with self.assertRaises(ConnectionError):
+            await drain
+        self.assertEqual(0, self.client_socket.send_queue_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from aio_dtls import DtlsSession
+from tests.dtls_helper import DtlsHelper
+from tests.dtls_test_obj import DemoProtocolClass
+
+
+class BatchProtocolClass(DemoProtocolClass):
+    def __init__(self, server=None, endpoint=None):
+        super().__init__(server, endpoint)
+        self.batches = []
+
+    def payloads_received(self, payloads, client_address):
+        self.batches.append([bytes(payload) for payload in payloads])
+        self.last_client_address = client_address
+
+
+class TestBatchDelivery(DtlsHelper):
+    def setUp(self) -> None:
+        super().setUp()
+        self.server_endpoint.listen(BatchProtocolClass)
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+        self.app_protocol = self.server_endpoint._sock.protocol.app_protocol
+
+    def test_one_call_per_datagram(self):
+        DtlsSession(self.client_endpoint._sock, self.server_address).send(b'one', b'two', b'three')
+        self.pump()
+        self.assertEqual([[b'hello'], [b'one', b'two', b'three']], self.app_protocol.batches)
+        self.assertEqual(self.client_address, self.app_protocol.last_client_address)
+        self.assertIsNone(self.app_protocol.last_data, 'datagram_received not called')
+
+    def test_no_call_for_handshake_datagrams(self):
+        self.assertEqual(1, len(self.app_protocol.batches))
+
+
+if __name__ == '__main__':
+    unittest.main()
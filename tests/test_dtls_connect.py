@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+
+from aio_dtls import DtlsSession
+from aio_dtls.exceptions import TLSException
+from tests.dtls_helper import DtlsHelper
+
+
+class TestDtlsConnect(DtlsHelper, unittest.IsolatedAsyncioTestCase):
+    async def connect(self, **kwargs):
+        task = asyncio.create_task(self.client_endpoint._sock.connect(self.server_address, **kwargs))
+        await asyncio.sleep(0)
+        self.pump()
+        return await task
+
+    async def test_connect(self):
+        session = await self.connect(timeout=1)
+        self.assertIsInstance(session, DtlsSession)
+        self.assertFalse(session.closed)
+
+        session.send(b'hello')
+        self.pump()
+        self.assertEqual(b'hello', self.server_endpoint._sock.protocol.app_protocol.last_data)
+        self.assertIs(session.connection, (await self.connect()).connection, 'session reused')
+
+        session.close()
+        self.assertTrue(session.closed)
+        with self.assertRaises(ConnectionError):
+            session.send(b'hello')
+
+    async def test_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client_endpoint._sock.connect(self.server_address, timeout=0.01)
+        self.assertEqual(0, len(self.client_connection_manager.connections))
+
+    async def test_handshake_failure(self):
+        self.server_connection_manager.ciphers = type(self.server_connection_manager.ciphers)(
+            ['TLS_ECDHE_PSK_WITH_AES_128_CBC_SHA256'], psk=b'secret')
+        with self.assertRaises(TLSException):
+            await self.connect(timeout=1)
+        self.assertEqual(0, len(self.client_connection_manager.connections))
+
+    async def test_no_common_curve(self):
+        self.server_connection_manager.elliptic_curves = type(self.server_connection_manager.elliptic_curves)(
+            ['secp384r1'])
+        with self.assertRaises(TLSException):
+            await self.connect(timeout=1)
+        self.assertEqual(0, len(self.client_connection_manager.connections))
+
+    async def test_max_handshakes(self):
+        self.client_endpoint._sock._handshake_slots = asyncio.Semaphore(1)
+        other_address = ('192.168.1.14', 20103)
+        first = asyncio.create_task(self.client_endpoint._sock.connect(self.server_address))
+        second = asyncio.create_task(self.client_endpoint._sock.connect(other_address, timeout=1))
+        await asyncio.sleep(0)
+        self.assertEqual(1, len(self.client_connection_manager.connections))
+        self.pump()
+        await first
+        await asyncio.sleep(0)
+        self.assertEqual(2, len(self.client_connection_manager.connections))
+        second.cancel()
+
+    async def test_joiner_timeout(self):
+        impatient = asyncio.create_task(self.client_endpoint._sock.connect(self.server_address, timeout=0.01))
+        patient = asyncio.create_task(self.client_endpoint._sock.connect(self.server_address, timeout=5))
+        with self.assertRaises(asyncio.TimeoutError):
+            await impatient
+        self.assertEqual(1, len(self.client_connection_manager.connections), 'handshake kept for the other caller')
+
+        self.pump()
+        session = await patient
+        self.assertFalse(session.closed)
+        self.assertTrue(session.connection.established)
+        self.assertEqual(0, session.connection.handshake_joiners)
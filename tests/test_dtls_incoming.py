@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from aio_dtls.dtls.incoming import IncomingQueue
+from tests.dtls_helper import DtlsHelper
+
+
+class DemoTransport:
+    def __init__(self):
+        self.paused = False
+
+    def pause_reading(self):
+        self.paused = True
+
+    def resume_reading(self):
+        self.paused = False
+
+
+class TestIncomingQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_high_water(self):
+        transport = DemoTransport()
+        queue = IncomingQueue(4, high_water=3, low_water=1, transport=transport)
+        for i in range(3):
+            queue.datagram_received(bytes([i]), ('127.0.0.1', 5684))
+        self.assertTrue(transport.paused)
+        self.assertEqual((b'\x00', ('127.0.0.1', 5684)), await queue.__anext__())
+        self.assertTrue(transport.paused)
+        await queue.__anext__()
+        self.assertFalse(transport.paused)
+
+    async def test_overflow(self):
+        for overflow, expected in (('drop_newest', [b'1', b'2']), ('drop_oldest', [b'2', b'3'])):
+            queue = IncomingQueue(2, overflow=overflow)
+            for data in (b'1', b'2', b'3'):
+                queue.datagram_received(data, None)
+            queue.close()
+            self.assertEqual(expected, [data async for data, peer in queue])
+            self.assertEqual(1, queue.dropped)
+
+    async def test_wait_and_close(self):
+        queue = IncomingQueue()
+        received = asyncio.create_task(queue.__anext__())
+        await asyncio.sleep(0)
+        queue.datagram_received(b'data', None)
+        self.assertEqual((b'data', None), await received)
+        queue.close(ConnectionError('lost'))
+        with self.assertRaises(ConnectionError):
+            await queue.__anext__()
+
+
+class TestDtlsSocketIncoming(DtlsHelper, unittest.IsolatedAsyncioTestCase):
+    async def test_incoming(self):
+        server_socket = self.server_endpoint._sock
+        server_socket._protocol = server_socket.protocol
+        incoming = server_socket.incoming()
+        self.assertIs(incoming, server_socket.incoming())
+
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+        async for payload, peer in incoming:
+            self.assertEqual((b'hello', self.client_address), (payload, peer))
+            break
+        server_socket.close()
+        self.assertEqual([], [item async for item in incoming])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from construct import EnumIntegerString
+
+from aio_dtls.connection_manager import CipherSuites, EllipticCurves, SSlVersions
+from aio_dtls.const import dtls as const_dtls
+from aio_dtls.const.cipher_suites import CipherSuites as EnumCipherSuites
+from aio_dtls.const.tls import NamedCurve
+from aio_dtls.constructs import tls
+
+
+class TestEnumProps(unittest.TestCase):
+    def test_get_best_by_priority(self):
+        ciphers = CipherSuites(psk=b'secret')
+        offer = tls.CipherSuites.parse(tls.CipherSuites.build([
+            0x1301,  # unknown to the server
+            EnumCipherSuites.TLS_ECDH_anon_WITH_AES_128_CBC_SHA256.value.value,
+            EnumCipherSuites.TLS_ECDHE_PSK_WITH_AES_128_CBC_SHA256.value.value,
+        ]))
+        expected = EnumCipherSuites[ciphers._available[0][0]]
+        self.assertIs(expected, ciphers.get_best(offer))
+        self.assertEqual(1, len(ciphers._negotiated))
+        self.assertIs(expected, ciphers.get_best(list(offer)))
+        self.assertEqual(1, len(ciphers._negotiated))
+
+    def test_get_best_not_supported(self):
+        curves = EllipticCurves()
+        self.assertIsNone(curves.get_best([NamedCurve.secp384r1.value]))
+        self.assertIs(NamedCurve.secp256r1, curves.get_best(
+            [NamedCurve.secp384r1.value, EnumIntegerString.new(NamedCurve.secp256r1.value, 'secp256r1')]))
+
+    def test_get_best_by_name(self):
+        self.assertIs(const_dtls.ProtocolVersion.DTLS_1_2, SSlVersions().get_best(['DTLS_1_2']))
+
+    def test_cached(self):
+        wish_list = ['TLS_ECDH_anon_WITH_AES_128_CBC_SHA256']
+        self.assertIs(CipherSuites.cached(wish_list), CipherSuites.cached(list(wish_list)))
+        self.assertIsNot(CipherSuites.cached(wish_list), CipherSuites.cached(wish_list, psk=b'secret'))
+        self.assertIs(CipherSuites.cached(wish_list, psk=b'secret'), CipherSuites.cached(wish_list, psk=b'other'))
+        self.assertNotIn('secret', repr(list(CipherSuites._instances)))
+        self.assertIsInstance(CipherSuites.cached(wish_list).available_values, tuple)
+
+    def test_cached_bounded(self):
+        for i in range(CipherSuites.instances_cache_size + 1):
+            CipherSuites.cached(['TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'] * (i + 1))
+        self.assertLessEqual(len(CipherSuites._instances), CipherSuites.instances_cache_size)
@@ -0,0 +1,74 @@
+import unittest
+
+from aio_dtls.events import EVENTS
+from tests.dtls_helper import DtlsHelper
+from tests.dtls_test_obj import DemoDtlsEndpoint, DemoProtocolClass
+
+CIPHER = 'TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'
+
+
+class TestLifecycleEvents(DtlsHelper):
+    def subscribe(self, connection_manager):
+        events = []
+        for event in EVENTS:
+            connection_manager.subscribe(event, events.append)
+        return events
+
+    def test_handshake_and_close(self):
+        client_events = self.subscribe(self.client_connection_manager)
+        server_events = self.subscribe(self.server_connection_manager)
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+
+        self.assertEqual(['handshake_started', 'handshake_completed'], [event.event for event in client_events])
+        self.assertEqual(['handshake_started', 'handshake_completed'], [event.event for event in server_events])
+        completed = server_events[-1]
+        self.assertEqual(('server', CIPHER, False, self.client_address),
+                         (completed.role, completed.suite, completed.resumed, completed.address))
+        self.assertGreaterEqual(completed.duration_us, 0)
+
+        self.client_connection_manager.connection_evicted(
+            self.client_connection_manager.get_connection(self.server_address), 'idle')
+        self.client_connection_manager.close_connection(
+            self.client_connection_manager.get_connection(self.server_address))
+        self.assertEqual(['connection_evicted', 'connection_closed'], [event.event for event in client_events[2:]])
+        self.assertEqual('idle', client_events[2].reason)
+
+    def test_handshake_failed(self):
+        self.server_endpoint = DemoDtlsEndpoint(address=self.server_address, psk='secret',
+                                                ciphers=['TLS_ECDHE_PSK_WITH_AES_128_CBC_SHA256'])
+        self.server_endpoint.listen(DemoProtocolClass)
+        server_events = self.subscribe(self.server_endpoint._sock.connection_manager)
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+
+        failed = [event for event in server_events if event.event == 'handshake_failed']
+        self.assertEqual(1, len(failed))
+        self.assertEqual('HANDSHAKE_FAILURE', failed[0].alert)
+        self.assertEqual('HELLO_REQUEST', failed[0].stage)
+        self.assertEqual('connection_closed', server_events[-1].event)
+
+    def test_unsubscribe(self):
+        events = []
+        self.server_connection_manager.subscribe('handshake_started', events.append)
+        self.server_connection_manager.unsubscribe('handshake_started', events.append)
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+        self.assertEqual([], events)
+        self.assertEqual({}, self.server_connection_manager._subscribers)
+        with self.assertRaises(ValueError):
+            self.server_connection_manager.subscribe('connection_opened', events.append)
+
+    def test_failing_subscriber(self):
+        def fail(event):
+            raise RuntimeError(event.event)
+
+        self.server_connection_manager.subscribe('handshake_completed', fail)
+        with self.assertLogs('aio_dtls.connection_manager.connection_manager', 'ERROR'):
+            self.client_endpoint.sendto(b'hello', self.server_address)
+            self.pump()
+        self.assertEqual(b'hello', self.server_endpoint._sock.protocol.app_protocol.last_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
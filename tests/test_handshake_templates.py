@@ -0,0 +1,44 @@
+import secrets
+import unittest
+
+from cryptography.hazmat.primitives import serialization
+
+from aio_dtls import ConnectionManager, Connection
+from aio_dtls.const.cipher_suites import CipherSuites
+from aio_dtls.const.tls import NamedCurve
+from aio_dtls.constructs import tls, tls_ecc
+from aio_dtls.dtls.handshake_ecdh_anon import EcdhAnon
+from aio_dtls.dtls.handshake_ecdhe_psk import EcdhePsk
+
+
+class TestHandshakeTemplates(unittest.TestCase):
+    def setUp(self):
+        self.connection_manager = ConnectionManager(psk=b'secret', identity_hint=b'hint')
+        self.connection = Connection(('192.168.1.18', 20102))
+        self.connection.ssl_version = self.connection_manager.ssl_versions.default
+        self.connection.cipher = CipherSuites.TLS_ECDH_anon_WITH_AES_128_CBC_SHA256
+        self.connection.ec = NamedCurve.secp256r1
+        self.connection.handshake_params.extended_master_secret = True
+
+    def test_server_hello(self):
+        for _ in range(2):
+            self.connection.uid = secrets.token_bytes(32)
+            fragment = EcdhAnon.build_handshake_fragment_server_hello(self.connection_manager, self.connection)
+            server_hello = tls.ServerHello.parse(fragment)
+            self.assertEqual(self.connection.security_params.server_random, server_hello.random)
+            self.assertEqual(self.connection.uid, server_hello.session_id)
+            self.assertEqual(fragment, tls.ServerHello.build(server_hello))
+        self.assertEqual(1, len(self.connection_manager.handshake_templates))
+
+    def test_server_key_exchange(self):
+        for handler, construct in ((EcdhAnon, tls_ecc.ServerKeyExchangeECDH),
+                                   (EcdhePsk, tls_ecc.ServerKeyExchangeECDHPSK)):
+            for _ in range(2):
+                fragment = handler.build_handshake_fragment_server_key_exchange(
+                    self.connection_manager, self.connection, None)
+                point = self.connection.server_private_key.public_key().public_bytes(
+                    encoding=serialization.Encoding.X962, format=serialization.PublicFormat.UncompressedPoint)
+                self.assertEqual(construct.build(handler.server_key_exchange_data(
+                    self.connection_manager, self.connection, point)), fragment)
+        self.assertEqual(2, len(self.connection_manager.handshake_templates))
+
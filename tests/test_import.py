@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from aio_dtls.const.cipher_suites import CipherSuites
+from aio_dtls.dtls.handshake import Handshake
+from aio_dtls.dtls.handshake_ecdhe_psk import EcdhePsk
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_handlers_not_imported(self):
+        code = (
+            'import sys, aio_dtls\n'
+            'from aio_dtls import DtlsSocket\n'
+            'print(",".join(sorted(m for m in sys.modules if "handshake_ecdh" in m or m.endswith(".tls_ecc")'
+            ' or m.startswith("aio_dtls.cipher") or m.startswith("cryptography.hazmat.primitives.asymmetric"))))'
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)})
+        self.assertEqual('', result.stdout.strip())
+
+    def test_handler_resolved_by_name(self):
+        self.assertIs(EcdhePsk, Handshake.get_handshake_handler(CipherSuites.TLS_ECDHE_PSK_WITH_AES_128_CBC_SHA256))
+
+    def test_cipher_suite_metadata(self):
+        suite = CipherSuites.TLS_ECDH_anon_WITH_AES_128_CBC_SHA256
+        self.assertEqual('ECDH_anon', suite.key_exchange)
+        self.assertEqual('sha256', suite.mac.hash_func.name)
+        self.assertEqual('block', suite.cipher_type)
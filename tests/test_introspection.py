@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+from tests.dtls_helper import DtlsHelper
+from tests.dtls_test_obj import DemoDtlsEndpoint, DemoProtocolClass
+
+CIPHER = 'TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'
+
+
+class TestIntrospection(DtlsHelper, unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+        # a second client stops after the ClientHello with cookie, its server connection stays half-open
+        self.other_address = ('192.168.1.19', 20102)
+        other = DemoDtlsEndpoint(address=self.other_address, ciphers=[CIPHER])
+        other.listen(DemoProtocolClass)
+        other.sendto(b'hello', self.server_address)
+        server = self.server_endpoint._sock
+        server.protocol.datagram_received(other._sock._sock.sending_data.pop(0)[0], self.other_address)
+        other._sock.protocol.datagram_received(server._sock.sending_data.pop(0)[0], self.server_address)
+        server.protocol.datagram_received(other._sock._sock.sending_data.pop(0)[0], self.other_address)
+
+    def test_connection_snapshot(self):
+        connection = self.server_connection_manager.get_connection(self.client_address)
+        snapshot = self.server_connection_manager.connection_snapshot(connection)
+        self.assertEqual(self.client_address, snapshot['address'])
+        self.assertEqual(('server', 'HANDSHAKE_OVER', True, CIPHER, 1, 1),
+                         (snapshot['role'], snapshot['state'], snapshot['established'], snapshot['suite'],
+                          snapshot['epoch'], snapshot['receive_epoch']))
+        self.assertGreater(snapshot['bytes_received'], 0)
+        self.assertGreater(snapshot['bytes_sent'], 0)
+        self.assertEqual(0, snapshot['pending_flight'])
+        self.assertGreaterEqual(snapshot['age_s'], 0)
+
+    async def test_snapshots_in_chunks(self):
+        ticks = []
+        loop_task = asyncio.ensure_future(self.count_ticks(ticks))
+        snapshots = await self.server_connection_manager.snapshots(chunk_size=1)
+        loop_task.cancel()
+        self.assertEqual(2, len(snapshots))
+        self.assertGreaterEqual(len(ticks), 1, 'event loop ran between chunks')
+
+        established = await self.server_connection_manager.snapshots(lambda connection: connection.established)
+        self.assertEqual([self.client_address], [snapshot['address'] for snapshot in established])
+
+    async def test_summary(self):
+        summary = await self.server_connection_manager.summary()
+        self.assertEqual(2, summary['connections'])
+        self.assertEqual({'HANDSHAKE_OVER': 1, 'CLIENT_HELLO': 1}, summary['by_state'])
+        self.assertEqual({CIPHER: 2}, summary['by_suite'])
+        self.assertEqual(2, summary['by_age_s']['<=1'])
+        self.assertEqual(0, summary['by_age_s']['>3600'])
+
+    @staticmethod
+    async def count_ticks(ticks):
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+
+from aio_dtls.metrics import CollectingMetrics, Histogram, NULL_METRICS
+from tests.dtls_helper import DtlsHelper
+from tests.dtls_test_obj import DemoDtlsEndpoint, DemoProtocolClass
+
+
+class TestCollectingMetrics(unittest.TestCase):
+    def test_counters_and_histograms(self):
+        metrics = CollectingMetrics(buckets={'latency_us': (10, 100)})
+        metrics.inc('alerts_sent', label=('description', 'BAD_RECORD_MAC'))
+        metrics.inc('bytes_sent', 5)
+        metrics.inc('bytes_sent', 7)
+        for value in (5, 10, 50, 500):
+            metrics.observe('latency_us', value)
+        metrics.gauge('connections', lambda: 3)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(12, snapshot['counters']['bytes_sent'])
+        self.assertEqual(1, snapshot['counters']['alerts_sent{description="BAD_RECORD_MAC"}'])
+        self.assertEqual(3, snapshot['gauges']['connections'])
+        self.assertEqual({10: 2, 100: 3, '+Inf': 4}, snapshot['histograms']['latency_us']['buckets'])
+        self.assertEqual(565, snapshot['histograms']['latency_us']['sum'])
+
+        text = metrics.render_openmetrics()
+        self.assertIn('# TYPE aio_dtls_bytes_sent counter\naio_dtls_bytes_sent_total 12\n', text)
+        self.assertIn('aio_dtls_alerts_sent_total{description="BAD_RECORD_MAC"} 1\n', text)
+        self.assertIn('aio_dtls_latency_us_bucket{le="+Inf"} 4\n', text)
+        self.assertIn('aio_dtls_connections 3\n', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def test_histogram_bounds(self):
+        histogram = Histogram((1, 2))
+        for value in (0, 1, 2, 3):
+            histogram.observe(value)
+        self.assertEqual([(1, 2), (2, 3), ('+Inf', 4)], list(histogram.cumulative()))
+
+    def test_null_metrics(self):
+        self.assertFalse(NULL_METRICS.enabled)
+        NULL_METRICS.inc('records_sent')
+        self.assertEqual({}, NULL_METRICS.snapshot()['counters'])
+
+
+class TestHandshakeMetrics(DtlsHelper):
+    def setUp(self) -> None:
+        super().setUp()
+        self.client_metrics = CollectingMetrics()
+        self.server_metrics = CollectingMetrics()
+        self.server_endpoint = DemoDtlsEndpoint(address=self.server_address, metrics=self.server_metrics)
+        self.client_endpoint = DemoDtlsEndpoint(address=self.client_address, metrics=self.client_metrics,
+                                                ciphers=['TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'])
+        self.server_endpoint.listen(DemoProtocolClass)
+        self.client_endpoint.listen(DemoProtocolClass)
+
+    def test_handshake(self):
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+
+        client = self.client_metrics.snapshot()
+        server = self.server_metrics.snapshot()
+        self.assertEqual(1, client['counters']['handshakes_completed{role="client"}'])
+        self.assertEqual(1, server['counters']['handshakes_completed{role="server"}'])
+        self.assertEqual(1, server['histograms']['handshake_duration_us{role="server"}']['count'])
+        self.assertEqual({'connections_established': 1, 'connections_half_open': 0}, server['gauges'])
+        self.assertNotIn('handshakes_failed', server['counters'])
+        self.assertEqual(server['counters']['records_received'], client['counters']['records_sent'])
+        self.assertEqual(server['counters']['datagrams_received'], client['counters']['datagrams_sent'])
+        self.assertEqual(server['counters']['bytes_received'], client['counters']['bytes_sent'])
+
+    def test_stage_timeline(self):
+        self.server_endpoint._sock.connection_manager.slow_handshake_us = 0
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+
+        connection_manager = self.server_endpoint._sock.connection_manager
+        timeline = connection_manager.get_connection(self.client_address).timeline
+        self.assertEqual(['client_hello_parse', 'cookie_check', 'keygen', 'server_key_exchange', 'ecdh',
+                          'master_secret', 'pending_states', 'finished_verify'],
+                         [name for name, _, _ in timeline.stages])
+        self.assertEqual(sorted(start for _, start, _ in timeline.stages), [start for _, start, _ in timeline.stages])
+        self.assertEqual(1, len(connection_manager.slow_handshakes))
+
+        cipher = 'cipher="TLS_ECDH_anon_WITH_AES_128_CBC_SHA256"'
+        server = self.server_metrics.snapshot()['histograms']
+        self.assertEqual(1, server[f'handshake_ecdh_us{{{cipher}}}']['count'])
+        client = self.client_metrics.snapshot()['histograms']
+        self.assertEqual(1, client[f'handshake_finished_verify_us{{{cipher}}}']['count'])
+
+    def test_retransmitted_client_hello(self):
+        client_sending = self.client_endpoint._sock._sock.sending_data
+        server_protocol = self.server_endpoint._sock.protocol
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        server_protocol.datagram_received(client_sending.pop(0)[0], self.client_address)
+        self.client_endpoint._sock.protocol.datagram_received(
+            self.server_endpoint._sock._sock.sending_data.pop(0)[0], self.server_address)
+        client_hello = client_sending.pop(0)[0]
+
+        server_protocol.datagram_received(client_hello, self.client_address)
+        connection = self.server_endpoint._sock.connection_manager.connections[self.client_address]
+        started_ns = connection.handshake_started_ns
+        server_protocol.datagram_received(client_hello, self.client_address)
+        self.assertEqual(started_ns, connection.handshake_started_ns)
+        self.assertEqual(1, self.server_metrics.snapshot()['counters']['handshakes_started{role="server"}'])
+
+    def test_timer_disabled(self):
+        connection_manager = self.server_endpoint._sock.connection_manager
+        connection_manager.metrics = NULL_METRICS
+        connection = connection_manager.get_connection(self.client_address)
+        with connection_manager.timed(connection, 'ecdh'):
+            pass
+        self.assertIsNone(connection.timeline)
+
+    def test_close_half_open(self):
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        connection_manager = self.client_endpoint._sock.connection_manager
+        connection_manager.close_connection(connection_manager.get_connection(self.server_address))
+
+        counters = self.client_metrics.snapshot()['counters']
+        self.assertEqual(1, counters['handshakes_failed'])
+        self.assertEqual(1, counters['connections_closed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+from aio_dtls.const import tls as const_tls
+from aio_dtls.constructs import dtls
+from tests.data import iotivity_simple_server as iotivity_simple
+from tests.dtls_helper import DtlsHelper
+
+
+class TestProtocolDispatch(DtlsHelper):
+    def test_unknown_content_type_from_new_peer(self):
+        record = dtls.RawDatagram.build([{
+            "type": 99, "version": 0xfefd, "epoch": 0, "sequence_number": 0, "fragment": b'\x00'}])
+        answers = self.server_endpoint._sock.protocol.datagram_received(record, self.client_address)
+        self.assertIsNone(answers)
+        self.assertEqual(0, len(self.server_endpoint._sock._sock.sending_data))
+
+    def test_unexpected_handshake_message(self):
+        connection = self.client_connection_manager.get_connection(self.server_address)
+        self.client_connection_manager.new_client_connection(connection)
+
+        # the client is waiting for ServerHello or HelloVerifyRequest, not ClientHello
+        self.client_endpoint._sock.protocol.datagram_received(
+            iotivity_simple.client_hello_empty_cookie, self.server_address)
+
+        answer = dtls.Datagram.parse(self.client_endpoint._sock._sock.sending_data[-1][0])
+        self.assertEqual(const_tls.ContentType.ALERT.name, answer[0].type)
+        self.assertEqual(const_tls.AlertDescription.UNEXPECTED_MESSAGE.name, answer[0].fragment.description)
+        self.assertEqual(0, len(self.client_connection_manager.connections))
+
+    def test_hello_verify_request(self):
+        self.server_endpoint._sock.protocol.datagram_received(
+            iotivity_simple.client_hello_empty_cookie, self.client_address)
+        answer = dtls.Datagram.parse(self.server_endpoint._sock._sock.sending_data[-1][0])
+        self.assertEqual(const_tls.HandshakeType.HELLO_VERIFY_REQUEST.name, answer[0].fragment.handshake_type)
+        self.assertEqual(0, len(self.server_connection_manager.connections))
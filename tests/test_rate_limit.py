@@ -0,0 +1,100 @@
+import unittest
+
+from aio_dtls.metrics import CollectingMetrics
+from aio_dtls.rate_limit import HandshakeRateLimiter
+from tests.data import iotivity_simple_server as iotivity_simple
+from tests.dtls_helper import DtlsHelper
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHandshakeRateLimiter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = Clock()
+
+    def test_source_bucket(self):
+        limiter = HandshakeRateLimiter(rate=1, burst=2, clock=self.clock)
+        self.assertEqual([True, True, False], [limiter.allow(('10.0.0.1', 5684)) for _ in range(3)])
+        self.assertTrue(limiter.allow(('10.0.0.2', 5684)), 'other source has its own bucket')
+        self.clock.now = 1.0
+        self.assertEqual([True, False], [limiter.allow(('10.0.0.1', 5684)) for _ in range(2)])
+        self.assertEqual({'allowed': 4, 'rejected_source': 2, 'rejected_subnet': 0, 'source_buckets': 2,
+                          'subnet_buckets': 0}, limiter.stats)
+
+    def test_subnet_bucket(self):
+        limiter = HandshakeRateLimiter(rate=1, burst=1, subnet_rate=1, subnet_burst=2, clock=self.clock)
+        results = [limiter.allow((f'10.0.0.{i}', 5684)) for i in range(3)]
+        self.assertEqual([True, True, False], results)
+        self.assertTrue(limiter.allow(('10.0.1.1', 5684)))
+        self.assertEqual(1, limiter.rejected_subnet)
+        self.clock.now = 0.5
+        self.assertFalse(limiter.allow(('10.0.0.2', 5684)))
+        self.assertEqual((2, 0), (limiter.rejected_subnet, limiter.rejected_source),
+                         'a subnet rejection takes no token of the source')
+
+    def test_subnet_prefix(self):
+        limiter = HandshakeRateLimiter(ipv4_prefix=16)
+        self.assertEqual('10.1.0.0/16', limiter.subnet('10.1.2.3'))
+        self.assertEqual('10.1.2', HandshakeRateLimiter().subnet('10.1.2.3'))
+        self.assertEqual('fe80::/64', limiter.subnet('fe80::1%eth0'))
+        self.assertEqual('10.1.0.0/16', limiter.subnet('::ffff:10.1.2.3'))
+        self.assertEqual('10.1.2', HandshakeRateLimiter().subnet('::ffff:10.1.2.3'))
+        self.assertNotEqual(limiter.subnet('::ffff:10.1.2.3'), limiter.subnet('::ffff:10.2.2.3'))
+
+    def test_buckets_expire(self):
+        limiter = HandshakeRateLimiter(rate=1, burst=2, max_entries=16, sweep_interval=5, clock=self.clock)
+        for i in range(40):
+            limiter.allow((f'10.0.{i}.1', 5684))
+        self.assertLessEqual(limiter.stats['source_buckets'], 16)
+        self.clock.now = 10.0
+        limiter.allow(('10.9.9.9', 5684))
+        self.assertEqual(1, limiter.stats['source_buckets'])
+
+    def test_least_recently_used_dropped(self):
+        limiter = HandshakeRateLimiter(rate=1, burst=2, max_entries=2, clock=self.clock)
+        for host in ('10.0.0.1', '10.0.0.2', '10.0.0.1', '10.0.0.3'):
+            limiter.allow((host, 5684))
+        self.assertEqual(['10.0.0.1', '10.0.0.3'], sorted(limiter._sources))
+        self.assertFalse(limiter.allow(('10.0.0.1', 5684)), 'an active source keeps its exhausted bucket')
+
+
+class TestProtocolRateLimit(DtlsHelper):
+    def test_client_hello_dropped(self):
+        metrics = CollectingMetrics()
+        self.server_connection_manager.metrics = metrics
+        self.server_connection_manager.handshake_rate_limit = HandshakeRateLimiter(rate=1, burst=1,
+                                                                                   clock=Clock())
+        sending = self.server_endpoint._sock._sock.sending_data
+        for _ in range(3):
+            self.server_endpoint._sock.protocol.datagram_received(
+                iotivity_simple.client_hello_empty_cookie, self.client_address)
+        self.assertEqual(1, len(sending), 'only the first ClientHello is answered')
+        self.assertEqual(2, metrics.snapshot()['counters']['records_dropped{reason="rate_limit"}'])
+
+    def test_client_hello_behind_other_record(self):
+        self.server_connection_manager.handshake_rate_limit = HandshakeRateLimiter(rate=1, burst=1,
+                                                                                   clock=Clock())
+        sending = self.server_endpoint._sock._sock.sending_data
+        # plaintext warning alert of epoch 0, sequence number 10
+        alert = bytes.fromhex('15 fefd 0000 00000000000a 0002 010a')
+        for data in (iotivity_simple.client_hello_empty_cookie, alert + iotivity_simple.client_hello_empty_cookie):
+            self.server_endpoint._sock.protocol.datagram_received(data, self.client_address)
+        self.assertEqual(1, len(sending))
+        self.assertEqual(1, self.server_connection_manager.handshake_rate_limit.rejected_source)
+
+    def test_handshake_within_limit(self):
+        self.server_connection_manager.handshake_rate_limit = HandshakeRateLimiter(rate=1, burst=2)
+        self.client_endpoint.sendto(b'hello', self.server_address)
+        self.pump()
+        self.assertEqual(b'hello', self.server_endpoint._sock.protocol.app_protocol.last_data)
+        self.assertEqual(2, self.server_connection_manager.handshake_rate_limit.allowed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from aio_dtls import ConnectionManager
+from aio_dtls.constructs import tls
+from aio_dtls.exceptions import RecordOverflow
+from aio_dtls.tls.handshake import Handshake
+from aio_dtls.tls.protocol import TLSProtocol
+from aio_dtls.tls.record_layer import RecordLayer
+from tests.tls_test_obj import DemoTransport
+
+
+def build_records(*fragments):
+    return tls.RawDatagram.build([{'type': 23, 'version': 0x0303, 'fragment': fragment} for fragment in fragments])
+
+
+class TestRecordLayer(unittest.TestCase):
+    def test_split_records(self):
+        stream = build_records(b'first', b'x' * 300, b'')
+        record_layer = RecordLayer()
+        received = []
+        for i in range(len(stream)):
+            records = record_layer.feed(stream[i:i + 1])
+            if records is not None:
+                with records:
+                    received.extend(record.fragment for record in tls.RawDatagram.parse(records))
+        self.assertEqual([b'first', b'x' * 300, b''], received)
+        self.assertEqual(0, len(record_layer))
+
+    def test_several_records_in_one_view(self):
+        stream = build_records(b'a', b'b', b'c')
+        record_layer = RecordLayer()
+        with record_layer.feed(stream + stream[:4]) as records:
+            self.assertEqual(stream, bytes(records))
+        self.assertEqual(4, len(record_layer))
+        with record_layer.feed(stream[4:]) as records:
+            self.assertEqual(stream, bytes(records))
+
+    def test_compaction(self):
+        record = build_records(b'y' * 100)
+        record_layer = RecordLayer()
+        for _ in range(100):
+            with record_layer.feed(record + record[:50]) as records:
+                self.assertEqual(record, bytes(records))
+            with record_layer.feed(record[50:]) as records:
+                self.assertEqual(record, bytes(records))
+        self.assertLess(len(record_layer._buffer), len(record) * 4)
+
+    def test_overflow(self):
+        record_layer = RecordLayer(max_fragment_length=16)
+        self.assertIsNotNone(record_layer.feed(build_records(b'z' * 16)))
+        with self.assertRaises(RecordOverflow):
+            record_layer.feed(build_records(b'z' * 17)[:5])
+
+
+class DemoAppProtocol:
+    def __init__(self, server=None, endpoint=None):
+        self.received = []
+
+    def data_received(self, data):
+        self.received.append(data)
+
+
+class TestTlsProtocolFraming(unittest.TestCase):
+    def test_handshake_over_split_stream(self):
+        client_address, server_address = ('192.168.1.18', 20102), ('192.168.1.13', 443)
+        client_connection_manager = ConnectionManager(is_dtls=False, ciphers=['TLS_ECDH_anon_WITH_AES_128_CBC_SHA256'])
+        server = TLSProtocol(None, ConnectionManager(is_dtls=False), None, DemoAppProtocol)
+        server.connection_made(DemoTransport(client_address))
+        client = TLSProtocol(None, client_connection_manager, None, DemoAppProtocol)
+        client.connection_made(DemoTransport(server_address))
+
+        connection = client_connection_manager.get_connection(server_address)
+        connection.flight_buffer.append(b'hello')
+        client_connection_manager.new_client_connection(connection)
+        client.transport.write(Handshake.build_client_hello(client_connection_manager, connection))
+
+        moved = True
+        while moved:
+            moved = False
+            for source, destination in ((client, server), (server, client)):
+                while source.transport.send_data:
+                    data = source.transport.send_data.pop(0)
+                    for i in range(0, len(data), 7):
+                        destination.data_received(data[i:i + 7])
+                    moved = True
+        self.assertEqual([b'hello'], server.app_protocol.received)
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from aio_dtls import ClientSessionPool
+from tests.dtls_helper import DtlsHelper
+
+
+class TestClientSessionPool(DtlsHelper, unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.pool = ClientSessionPool(self.client_endpoint._sock, max_size=1, idle_timeout=60, connect_timeout=1)
+
+    async def handshake(self, *awaitables):
+        tasks = [asyncio.ensure_future(item) for item in awaitables]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.pump()
+        result = await asyncio.gather(*tasks)
+        self.pump()
+        return result
+
+    async def test_coalesce_during_handshake(self):
+        await self.handshake(self.pool.send(b'one', self.server_address), self.pool.send(b'two', self.server_address))
+        self.assertEqual(b'two', self.server_endpoint._sock.protocol.app_protocol.last_data)
+        self.assertEqual(1, self.pool.handshakes)
+        self.assertEqual(0, len(self.client_endpoint._sock._sock.sending_data))
+
+        session = await self.pool.get(self.server_address)
+        self.assertEqual({'size': 1, 'pending': 0, 'hits': 1, 'misses': 2, 'handshakes': 1, 'evictions': 0,
+                          'expired': 0}, self.pool.stats)
+
+        self.pool.idle_timeout = 0
+        await asyncio.sleep(0.001)
+        self.pool.expire()
+        self.assertTrue(session.closed)
+        self.assertEqual(1, self.pool.expired)
+
+    async def test_evict(self):
+        other_address = ('192.168.1.13', 20104)
+        other_server = type(self.server_endpoint)(address=other_address)
+        other_server.listen(type(self.server_endpoint._sock.protocol.app_protocol))
+        first, = await self.handshake(self.pool.get(self.server_address))
+
+        task = asyncio.ensure_future(self.pool.get(other_address))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for data, address in self.client_endpoint._sock._sock.sending_data:
+            other_server._sock.protocol.datagram_received(data, self.client_address)
+        self.client_endpoint._sock._sock.sending_data.clear()
+        while other_server._sock._sock.sending_data:
+            data, address = other_server._sock._sock.sending_data.pop(0)
+            self.client_endpoint._sock.protocol.datagram_received(data, other_address)
+            for data, address in self.client_endpoint._sock._sock.sending_data:
+                other_server._sock.protocol.datagram_received(data, self.client_address)
+            self.client_endpoint._sock._sock.sending_data.clear()
+        second = await task
+
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.assertEqual(1, self.pool.evictions)
+        self.assertEqual(1, len(self.pool))
+
+    async def test_failed_handshake(self):
+        self.pool.connect_timeout = 0.01
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.pool.send(b'one', self.server_address)
+        self.assertEqual(0, len(self.pool))
+        self.assertEqual({}, self.pool._queued)
+
+    async def test_close_with_pending(self):
+        task = asyncio.ensure_future(self.pool.send(b'one', self.server_address))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        pending = self.pool._pending[self.server_address]
+        self.pool.close()
+        self.assertEqual({}, self.pool._queued)
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        self.assertTrue(pending.cancelled())
+        self.assertEqual({}, self.pool._pending)
+        self.assertEqual(0, len(self.client_connection_manager.connections))
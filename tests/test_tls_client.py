@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from aio_dtls import ConnectionManager, TlsSocket
+from aio_dtls.const.tls import AlertDescription, AlertLevel
+from aio_dtls.exceptions import TLSException
+from aio_dtls.tls.helper import Helper
+from aio_dtls.tls.protocol import TLSProtocol
+
+CIPHERS = ['TLS_ECDH_anon_WITH_AES_128_CBC_SHA256']
+
+
+class EchoProtocol(TLSProtocol):
+    def __init__(self, connection_manager):
+        super().__init__(None, connection_manager, None, lambda server, endpoint: EchoApp(self))
+
+
+class EchoApp:
+    def __init__(self, protocol: TLSProtocol):
+        self.protocol = protocol
+
+    def data_received(self, data):
+        connection = self.protocol.connection
+        records = Helper.build_application_record(connection, [data])
+        Helper.send_records(connection, records, self.protocol.write, self.protocol.connection_manager.trace)
+
+
+class TestTlsClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server_connection_manager = ConnectionManager(is_dtls=False, ciphers=CIPHERS)
+        self.server_protocols = []
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(self.server_protocol_factory, '127.0.0.1', 0)
+        self.address = self.server.sockets[0].getsockname()[:2]
+        self.client = TlsSocket(ciphers=CIPHERS)
+
+    def server_protocol_factory(self):
+        protocol = EchoProtocol(self.server_connection_manager)
+        self.server_protocols.append(protocol)
+        return protocol
+
+    async def asyncTearDown(self):
+        self.client.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_echo(self):
+        await self.client.connect(self.address, timeout=5)
+        self.client.write(b'hello ')
+        await self.client.send(b'world')
+        self.assertEqual(b'hello world', await asyncio.wait_for(self.client.readexactly(11), 5))
+
+    async def test_large_payload(self):
+        await self.client.connect(self.address, timeout=5)
+        payload = bytes(range(256)) * 256
+        await self.client.send(payload)
+        self.assertEqual(payload, await asyncio.wait_for(self.client.readexactly(len(payload)), 5))
+
+    async def test_write_before_connect(self):
+        with self.assertRaises(ConnectionError):
+            self.client.write(b'hello')
+
+    async def test_connection_lost(self):
+        await self.client.connect(self.address, timeout=5)
+        for protocol in self.server_protocols:
+            protocol.transport.close()
+        self.assertEqual(b'', await asyncio.wait_for(self.client.read(), 5))
+        self.assertEqual(0, len(self.client.connection_manager.connections))
+
+    async def test_close_notify(self):
+        await self.client.connect(self.address, timeout=5)
+        for protocol in self.server_protocols:
+            connection = protocol.connection
+            record = Helper.build_alert(connection, AlertLevel.WARNING, AlertDescription.CLOSE_NOTIFY)
+            Helper.send_records(connection, [record], protocol.write, protocol.connection_manager.trace)
+        self.assertEqual(b'', await asyncio.wait_for(self.client.read(), 5))
+
+    async def test_fatal_alert(self):
+        await self.client.connect(self.address, timeout=5)
+        for protocol in self.server_protocols:
+            connection = protocol.connection
+            record = Helper.build_alert(connection, AlertLevel.FATAL, AlertDescription.INTERNAL_ERROR)
+            Helper.send_records(connection, [record], protocol.write, protocol.connection_manager.trace)
+        with self.assertRaises(TLSException):
+            await asyncio.wait_for(self.client.read(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import unittest
+
+from aio_dtls import ConnectionManager
+from aio_dtls.const import tls as const_tls
+from aio_dtls.tls.helper import Helper
+from aio_dtls.tls.protocol import TLSProtocol
+from tests.tls_test_obj import DemoTransport
+
+
+class TestTlsWrite(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.protocol = TLSProtocol(None, ConnectionManager(is_dtls=False), None, None)
+        self.protocol.connection_made(DemoTransport(('192.168.1.13', 443)))
+
+    async def test_coalesce(self):
+        for data in (b'a', b'b', b'c'):
+            self.protocol.write(data)
+        self.assertEqual([], self.protocol.transport.send_data)
+        await asyncio.sleep(0)
+        self.assertEqual([b'abc'], self.protocol.transport.send_data)
+
+    async def test_pause_writing(self):
+        self.protocol.pause_writing()
+        self.protocol.write(b'a')
+        await asyncio.sleep(0)
+        self.protocol.write(b'b')
+        self.assertEqual([], self.protocol.transport.send_data)
+        self.protocol.resume_writing()
+        self.assertEqual([b'ab'], self.protocol.transport.send_data)
+        await asyncio.sleep(0)
+        self.assertEqual([b'ab'], self.protocol.transport.send_data)
+
+    def test_write_without_loop(self):
+        self.protocol.write(b'a')
+        self.assertEqual([b'a'], self.protocol.transport.send_data)
+
+
+class TestTlsChunking(unittest.TestCase):
+    def test_chunk_large_payload(self):
+        calls = []
+
+        class ChunkHelper(Helper):
+            @classmethod
+            def encrypt_ciphertext_fragment(cls, connection, content_type, fragment, sequence_number=None):
+                calls.append(len(fragment))
+                return fragment
+
+        records = ChunkHelper.build_application_record(None, [b'x' * 40000, b''])
+        self.assertEqual([16384, 16384, 7232, 0], calls)
+        self.assertEqual(4, len(records))
+        self.assertEqual({const_tls.ContentType.APPLICATION_DATA.value}, {record.content_type for record in records})
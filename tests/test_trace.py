@@ -0,0 +1,37 @@
+import unittest
+
+from aio_dtls.const import tls as const_tls
+from aio_dtls.trace import TraceBuffer
+from tests.data import iotivity_simple_server as iotivity_simple
+from tests.dtls_helper import DtlsHelper
+
+
+class TestTraceBuffer(unittest.TestCase):
+    def test_ring(self):
+        trace = TraceBuffer(3)
+        self.assertEqual([], trace.dump())
+        for i in range(5):
+            trace.record(trace.RECEIVED, ('127.0.0.1', i), 23, 1, i, 100 + i)
+        events = trace.dump()
+        self.assertEqual(3, len(trace))
+        self.assertEqual([2, 3, 4], [event.sequence_number for event in events])
+        self.assertEqual(('127.0.0.1', 4), events[-1].peer)
+        self.assertEqual(104, events[-1].length)
+        self.assertLessEqual(events[0].timestamp, events[-1].timestamp)
+
+        trace.clear()
+        self.assertEqual(0, len(trace))
+
+
+class TestProtocolTrace(DtlsHelper):
+    def test_hello_verify_request(self):
+        self.server_connection_manager.trace = TraceBuffer(16)
+        self.server_endpoint._sock.protocol.datagram_received(
+            iotivity_simple.client_hello_empty_cookie, self.client_address)
+
+        received, sent = self.server_connection_manager.trace.dump()
+        self.assertEqual(TraceBuffer.RECEIVED, received.direction)
+        self.assertEqual(const_tls.ContentType.HANDSHAKE.value, received.content_type)
+        self.assertEqual(len(iotivity_simple.client_hello_empty_cookie) - 13, received.length)
+        self.assertEqual(TraceBuffer.SENT, sent.direction)
+        self.assertEqual(self.client_address, sent.peer)
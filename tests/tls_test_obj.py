@@ -14,6 +14,9 @@ class DemoTransport:
     def write(self, data):
         self.send_data.append(data)
 
+    def writelines(self, data):
+        self.send_data.append(b''.join(data))
+
     def get_extra_info(self, key):
         return self.address
 